@@ -62,5 +62,5 @@ setup(
         "Programming Language :: Python :: 3.5",
     ],
     keywords="pandas excel writer table",
-    packages=["table_compositor"],
+    packages=["table_compositor", "table_compositor.benchmarks"],
 )
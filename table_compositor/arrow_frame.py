@@ -0,0 +1,145 @@
+"""
+Module that supports Arrow tables, and frames that can be exported to Arrow (for example polars DataFrames), as input for the presentation model without converting them to pandas.
+"""
+
+import numpy as np
+
+# the supported frame type of each library
+_ARROW_LIKE_TYPES = dict(pyarrow="Table", polars="DataFrame")
+
+
+def is_arrow_like(frame):
+    """
+    True if `frame` is a pyarrow.Table or a polars.DataFrame. The check is done without importing either library.
+
+    Raises:
+        TypeError: if `frame` is another pyarrow or polars object, like a polars.LazyFrame or a pyarrow.RecordBatch
+    """
+    frame_type = type(frame)
+    expected = _ARROW_LIKE_TYPES.get(frame_type.__module__.split(".")[0])
+    if expected is None:
+        return False
+    if frame_type.__name__ != expected:
+        raise TypeError(
+            "Expected a pyarrow.Table or a polars.DataFrame, got {}.{}".format(
+                frame_type.__module__, frame_type.__name__
+            )
+        )
+    return True
+
+
+def _read_only(values):
+    # static-frame only shares arrays that are immutable
+    values.flags.writeable = False
+    return values
+
+
+class ArrowFrame:
+    """
+    Wraps a pyarrow.Table or a polars.DataFrame, so that it can be used as the `df` argument of `build_presentation_model`.
+
+    Numeric columns without nulls that are stored in a single chunk are read from the Arrow buffers without copying. Other columns (strings, booleans, columns with nulls) are converted to numpy once, the first time they are read. The index and columns are static-frame indices, so the rest of the library handles them natively.
+
+    Args:
+        table: a pyarrow.Table, or a frame that provides `to_arrow()`, like polars.DataFrame
+        index_columns: name of the column, or a list of column names, used as the index. If more than one column is given, a hierarchical index is built from the dictionary encoding of each column, dictionary-encoded columns are used as-is. If not provided, the row position is used as the index.
+    """
+
+    def __init__(self, table, index_columns=None):
+        if is_arrow_like(table) and not hasattr(table, "column_names"):
+            # polars, which shares its buffers with the exported arrow table
+            table = table.to_arrow()
+        if isinstance(index_columns, str):
+            index_columns = [index_columns]
+        index_columns = list(index_columns or ())
+
+        missing = [c for c in index_columns if c not in table.column_names]
+        if missing:
+            raise ValueError("Index columns not found in table: {}".format(missing))
+
+        self._table = table
+        self._index_columns = index_columns
+        self._column_names = [c for c in table.column_names if c not in index_columns]
+        self._arrays = {}
+
+        # static-frame is only needed, and imported, once Arrow input is used
+        import static_frame as sf
+
+        self.index = self._build_index(sf)
+        self.columns = sf.Index(self._column_names)
+
+    @property
+    def table(self):
+        return self._table
+
+    def __len__(self):
+        return self._table.num_rows
+
+    def __getitem__(self, column):
+        """
+        Return the column as a static-frame Series, that shares the array returned by `column_values`
+        """
+        import static_frame as sf
+
+        return sf.Series(self._to_numpy(column), index=self.index, name=column)
+
+    def column_values(self, position):
+        """
+        Return the values of the column at `position` (excluding the index columns) as a read-only numpy array
+        """
+        return self._to_numpy(self._column_names[position])
+
+    def _to_numpy(self, name):
+        values = self._arrays.get(name)
+        if values is not None:
+            return values
+
+        column = self._table.column(name)
+        if column.num_chunks == 1:
+            try:
+                values = column.chunk(0).to_numpy(zero_copy_only=True)
+            except ValueError:
+                # the arrow layout can not be shared with numpy, eg. bit-packed
+                # booleans, strings or arrays with nulls
+                pass
+        if values is None:
+            values = _read_only(column.to_numpy())
+
+        self._arrays[name] = values
+        return values
+
+    def _build_index(self, sf):
+        if not self._index_columns:
+            return sf.Index(_read_only(np.arange(len(self))))
+
+        if len(self._index_columns) == 1:
+            name = self._index_columns[0]
+            return sf.Index(self._to_numpy(name), name=name)
+
+        indices = []
+        indexers = []
+        for name in self._index_columns:
+            levels, codes = self._dictionary_encoding(name)
+            indices.append(sf.Index(levels, name=name))
+            indexers.append(codes)
+        return sf.IndexHierarchy(
+            indices, indexers=_read_only(np.array(indexers, dtype=np.int64))
+        )
+
+    def _dictionary_encoding(self, name):
+        """
+        Return the (levels, codes) of the column, using the existing dictionary of dictionary-encoded columns
+        """
+        import pyarrow as pa
+
+        column = self._table.column(name)
+        if not pa.types.is_dictionary(column.type):
+            column = column.dictionary_encode()
+        # combining the chunks also unifies the dictionaries of each chunk
+        array = column.combine_chunks() if column.num_chunks != 1 else column.chunk(0)
+        if array.null_count:
+            raise ValueError("Index column {!r} contains nulls.".format(name))
+
+        levels = _read_only(array.dictionary.to_numpy(zero_copy_only=False))
+        codes = array.indices.to_numpy(zero_copy_only=False)
+        return levels, codes
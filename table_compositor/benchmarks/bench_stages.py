@@ -0,0 +1,23 @@
+"""
+pytest-benchmark entry point for the stages in `benchmark.py`. This module is not collected by the unit tests, run it explicitly:
+
+    pytest table_compositor/benchmarks/bench_stages.py --benchmark-json=results.json
+"""
+
+from pytest import importorskip, mark
+
+from table_compositor.benchmarks.benchmark import STAGES, clear_caches, scenarios
+
+importorskip("pytest_benchmark")
+
+# the number of runs of each stage, the caches are cleared before each run
+ROUNDS = 5
+
+
+@mark.parametrize("stage,layout,n_rows,n_cols", list(scenarios()))
+def test_stage(benchmark, stage, layout, n_rows, n_cols) -> None:
+    benchmark.group = stage
+    benchmark.extra_info.update(layout=layout, n_rows=n_rows, n_cols=n_cols)
+    benchmark.pedantic(
+        STAGES[stage](layout, n_rows, n_cols), setup=clear_caches, rounds=ROUNDS
+    )
@@ -1,238 +1,400 @@
 """
-Module that will benchmark performance of table compositor when used with different engines
+Module that benchmarks each stage of rendering a layout, for flat, multi-index, nested and multi-table layouts at different sizes.
+
+Each stage function prepares its inputs and returns a function without arguments that runs only the stage being timed. The stages can be run with pytest-benchmark:
+
+    pytest table_compositor/benchmarks/bench_stages.py --benchmark-json=results.json
+
+or without any extra dependency:
+
+    python -m table_compositor.benchmarks.benchmark results.json
+
+Both write the results as JSON, so that runs can be compared. With `--memory`, each stage is run under `tracemalloc` instead, and the peak and retained bytes (in total and per data cell) are reported, followed by a table of how the bytes per cell scale with the size of the table:
+
+    python -m table_compositor.benchmarks.benchmark --memory memory.json
 """
 
+import argparse
+import gc
+import json
 import os
+import statistics
 import tempfile
 import time
+import tracemalloc
 import typing as tp
+import warnings
 
 import numpy as np
 import pandas as pd
 
 import table_compositor.table_compositor as tbc
-import table_compositor.xlsx_writer as tcew
-from table_compositor.xlsx_styles import (
-    OpenPyxlStyleHelper,
-    XlsxWriterStyleHelper,
+from table_compositor.compiled_layout import CompiledLayout
+from table_compositor.html_writer import HTMLWriter
+from table_compositor.presentation_model import (
+    IndexNode,
+    PresentationLayoutManager,
+    StyleRegistry,
 )
+from table_compositor.xlsx_writer import OpenPyxlCompositor, XlsxWriterCompositor
 
 NUMBER_FORMAT = '_($* #,##0_);_($* (#,##0);_($* "-"??_);_(@_)'
 
+LAYOUTS = ("flat", "multi_index", "nested", "multi_table")
 
-class XlsxCallBackFuncOpenPyxl:
-    def __init__(self, df):
-        self.df = df
+# (n_rows, n_cols), the largest scale has more rows than the largest index that
+# is cached (`_MAX_CACHED_SIZE`), so that the uncached path is measured too
+SCALES = ((100, 10), (1000, 20), (10000, 50), (40000, 8))
 
-    def data_value_func(self, i, c):
-        return self.df.loc[i, c]
+StageT = tp.Callable[[str, int, int], tp.Callable[[], tp.Any]]
 
-    def data_style_func(self, i, c):
-        return OpenPyxlStyleHelper.get_style(
-            number_format=NUMBER_FORMAT,
-            border=OpenPyxlStyleHelper.CustomBorders.thin_black_border,
-        )
 
-    def data_style_func_column_level(self, c):
-        return OpenPyxlStyleHelper.get_style(
+def prepare_dataframe(n_rows, n_cols):
+    columns = ["col_" + str(i) for i in range(0, n_cols)]
+    data = np.random.default_rng(0).random((n_rows, n_cols))
+    return pd.DataFrame(data, columns=columns, index=range(0, n_rows))
+
+
+def prepare_multi_index_dataframe(n_rows, n_cols, n_groups=10):
+    """
+    Return a frame with a two level index and two level columns, where the first levels group the rows and columns in (at most) `n_groups` contiguous groups
+    """
+    df = prepare_dataframe(n_rows, n_cols)
+    df.index = pd.MultiIndex.from_arrays(
+        [np.arange(n_rows) * n_groups // n_rows, np.arange(n_rows)]
+    )
+    df.columns = pd.MultiIndex.from_arrays(
+        [
+            ["group_" + str(i * n_groups // n_cols) for i in range(n_cols)],
+            df.columns,
+        ]
+    )
+    return df
+
+
+def _style_func(engine):
+    if engine == "xlsxwriter":
+        from table_compositor.xlsx_styles import XlsxWriterStyleHelper
+
+        style = XlsxWriterStyleHelper.get_style(number_format=NUMBER_FORMAT)
+    else:
+        from table_compositor.xlsx_styles import OpenPyxlStyleHelper
+
+        style = OpenPyxlStyleHelper.get_style(
             number_format=NUMBER_FORMAT,
             border=OpenPyxlStyleHelper.CustomBorders.thin_black_border,
         )
+    return lambda c: style
 
-    def header_style_func(self, node):
-        color = "9BC2E6"
-        return OpenPyxlStyleHelper.get_style(
-            bg_color=color, border=OpenPyxlStyleHelper.CustomBorders.thin_black_border
-        )
 
-    def header_value_func(self, node):
-        return node.value
+def _build_presentation_model(df, engine):
+    if engine == "html":
+        return tbc.build_presentation_model(df=df, output_format="html")
+    return tbc.build_presentation_model(
+        df=df, column_style_func=_style_func(engine), engine=engine
+    )
 
-    def index_value_func(self, node):
-        return node.value
 
-    def index_style_func(self, node):
-        color = "FFFF00"
-        return OpenPyxlStyleHelper.get_style(
-            bg_color=color, border=OpenPyxlStyleHelper.CustomBorders.thin_black_border
-        )
+def prepare_frames(layout, n_rows, n_cols):
+    """
+    Return the frames of the tables of the layout built by `build_layout`, in the order `build_layout` reads them, so that they can be generated before a stage is timed or traced
+    """
+    if layout == "flat":
+        return [prepare_dataframe(n_rows, n_cols)]
 
-    def index_name_style_func(self, node):
-        color = "9BC2E6"
-        return OpenPyxlStyleHelper.get_style(
-            bg_color=color, border=OpenPyxlStyleHelper.CustomBorders.thin_black_border
-        )
+    if layout == "multi_index":
+        return [prepare_multi_index_dataframe(n_rows, n_cols)]
 
-    def index_name_value_func(self, value):
-        return value
+    if layout == "nested":
+        inner_rows, inner_cols = max(n_rows // 4, 1), max(n_cols // 4, 1)
+        return [
+            prepare_dataframe(inner_rows, inner_cols),
+            prepare_dataframe(inner_rows, inner_cols).astype(object),
+        ]
 
+    if layout == "multi_table":
+        half_rows = max(n_rows // 2, 1)
+        return [
+            prepare_dataframe(n_rows, n_cols),
+            prepare_dataframe(half_rows, n_cols),
+            prepare_multi_index_dataframe(half_rows, n_cols),
+        ]
 
-class XlsxCallBackFuncXlsxWriter:
-    def __init__(self, df):
-        self.df = df
+    raise ValueError("Unknown layout: {}".format(layout))
 
-    def data_value_func(self, i, c):
-        return self.df.loc[i, c]
 
-    def data_style_func(self, i, c):
-        return XlsxWriterStyleHelper.get_style(number_format=NUMBER_FORMAT)
+def build_layout(layout, n_rows, n_cols, engine="openpyxl", frames=None):
+    """
+    Build the layout (a list of presentation models) used by the benchmarks.
 
-    def data_style_func_column_level(self, c):
-        return XlsxWriterStyleHelper.get_style(
-            number_format=NUMBER_FORMAT,
-            border=XlsxWriterStyleHelper.CustomBorders.thin_black_border,
-        )
+    Args:
+        layout: one of `LAYOUTS`. `nested` nests a quarter sized table in the first cell of a quarter sized outer table, `multi_table` renders one full size table next to two half sized tables
+        engine: 'openpyxl', 'xlsxwriter' or 'html'
+        frames: the frames of the tables, as returned by `prepare_frames`. Generated if not provided
+    """
+    if frames is None:
+        frames = prepare_frames(layout, n_rows, n_cols)
 
-    def header_style_func(self, node):
-        color = "FFFF00"
-        return XlsxWriterStyleHelper.get_style(bg_color=color)
+    if layout in ("flat", "multi_index"):
+        return [_build_presentation_model(frames[0], engine)]
 
-    def header_value_func(self, node):
-        return node.value
+    if layout == "nested":
+        inner_df, outer_df = frames
+        inner = _build_presentation_model(inner_df, engine)
+        outer = _build_presentation_model(outer_df, engine)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            outer.data.values.iloc[0, 0] = inner
+        return [outer]
 
-    def index_value_func(self, node):
-        return node.value
+    if layout == "multi_table":
+        df, half_df, half_multi_index_df = frames
+        return [
+            _build_presentation_model(df, engine),
+            [
+                _build_presentation_model(half_df, engine),
+                _build_presentation_model(half_multi_index_df, engine),
+            ],
+        ]
 
-    def index_style_func(self, node):
-        color = "FFFF00"
-        return XlsxWriterStyleHelper.get_style(bg_color=color)
+    raise ValueError("Unknown layout: {}".format(layout))
 
-    def index_name_style_func(self, node):
-        color = "9BC2E6"
-        return XlsxWriterStyleHelper.get_style(bg_color=color)
 
-    def index_name_value_func(self, value):
-        return value
+def data_cells(layout, n_rows, n_cols):
+    """
+    Return the number of data cells in all the tables of the layout built by `build_layout`
+    """
+    if layout == "nested":
+        return 2 * max(n_rows // 4, 1) * max(n_cols // 4, 1)
+    if layout == "multi_table":
+        return (n_rows + 2 * max(n_rows // 2, 1)) * n_cols
+    return n_rows * n_cols
 
 
-def prepare_dataframe(n_rows, n_cols):
-    columns = ["col_" + str(i) for i in range(0, n_cols)]
-    data = np.random.rand(n_rows, n_cols)
-    df = pd.DataFrame(data, columns=columns, index=range(0, n_rows))
-    return df
+def _flatten(layout):
+    for item in layout:
+        if isinstance(item, list):
+            yield from _flatten(item)
+        else:
+            yield item
 
 
-def _create_presentation_model(df, callback_func_cls, slow=0):
-    call_back_func_inst = callback_func_cls(df)
-    if slow == 0:
-        presentation_model = tbc.build_presentation_model(
-            df=df,
-            data_value_func=None,
-            data_style_func=None,
-            column_style_func=call_back_func_inst.data_style_func_column_level,
-            header_value_func=call_back_func_inst.header_value_func,
-            header_style_func=call_back_func_inst.header_style_func,
-            index_value_func=call_back_func_inst.index_value_func,
-            index_style_func=call_back_func_inst.index_style_func,
-            index_name_func=call_back_func_inst.index_name_value_func,
-            index_name_style_func=call_back_func_inst.index_name_style_func,
-        )
-    elif slow == 1:
-        presentation_model = tbc.build_presentation_model(
-            df=df,
-            data_value_func=None,
-            column_style_func=call_back_func_inst.data_style_func_column_level,
-            header_value_func=call_back_func_inst.header_value_func,
-            header_style_func=call_back_func_inst.header_style_func,
-            index_value_func=call_back_func_inst.index_value_func,
-            index_style_func=call_back_func_inst.index_style_func,
-            index_name_func=call_back_func_inst.index_name_value_func,
-            index_name_style_func=call_back_func_inst.index_name_style_func,
-        )
-    elif slow == 2:
-        presentation_model = tbc.build_presentation_model(
-            df=df,
-            data_value_func=call_back_func_inst.data_value_func,
-            data_style_func=call_back_func_inst.data_style_func,
-            header_value_func=call_back_func_inst.header_value_func,
-            header_style_func=call_back_func_inst.header_style_func,
-            index_value_func=call_back_func_inst.index_value_func,
-            index_style_func=call_back_func_inst.index_style_func,
-            index_name_func=call_back_func_inst.index_name_value_func,
-            index_name_style_func=call_back_func_inst.index_name_style_func,
-        )
+def clear_caches():
+    """
+    Clear the caches of index trees, resolved offsets and nested layouts, and the style registry, so that each run of a stage renders from scratch rather than measuring cache hits of the runs before it
+    """
+    IndexNode.cache_clear()
+    StyleRegistry.clear()
 
-    return [presentation_model]
 
+def _output_fp(name):
+    return os.path.join(tempfile.gettempdir(), "table_compositor_" + name + ".xlsx")
 
-def create_presentation_model_for_xlsx_writer(df, slow=0):
-    pm = _create_presentation_model(df, XlsxCallBackFuncXlsxWriter, slow=slow)
-    return pm
 
+# Stages
 
-def create_presentation_model_for_openpyxl_writer(df, slow=0):
-    pm = _create_presentation_model(df, XlsxCallBackFuncOpenPyxl, slow)
-    return pm
 
+def build_presentation_model(layout, n_rows, n_cols):
+    frames = prepare_frames(layout, n_rows, n_cols)
+    return lambda: build_layout(layout, n_rows, n_cols, frames=frames)
 
-def write_using_openpyxl(pm_openpyxl):
-    output_fp = os.path.join(tempfile.gettempdir(), "openpyxl_test.xlsx")
-    print("file://" + output_fp)
-    tcew.XLSXWriter.to_xlsx(
-        pm_openpyxl, output_fp, engine=tcew.SupportedEngines.openpyxl
-    )
 
+def resolve_loc(layout, n_rows, n_cols):
+    pms = list(_flatten(build_layout(layout, n_rows, n_cols)))
+    return lambda: [PresentationLayoutManager.resolve_loc(pm) for pm in pms]
 
-def write_using_xlsxwriter(pm_xlsxwriter):
-    output_fp = os.path.join(tempfile.gettempdir(), "xlsxwriter_test.xlsx")
-    print("file://" + output_fp)
-    tcew.XLSXWriter.to_xlsx(
-        pm_xlsxwriter, output_fp, engine=tcew.SupportedEngines.xlsxwriter
-    )
 
+def shift_loc(layout, n_rows, n_cols):
+    pm_and_locs = resolve_loc(layout, n_rows, n_cols)()
+    return lambda: [
+        PresentationLayoutManager.shift_loc(pl, rows=1, cols=1) for pl in pm_and_locs
+    ]
 
-def time_xlsx_writing(scenarios: tp.Iterable[tp.Tuple[int, int]]):
-    results = pd.DataFrame(index=scenarios)
-    for n_row, n_col in scenarios:
-        df = prepare_dataframe(n_row, n_col)
-        pm_openpyxl = create_presentation_model_for_openpyxl_writer(df, slow=0)
-        pm_xlsxwriter = create_presentation_model_for_xlsx_writer(df, slow=0)
 
-        start_time = time.time()
-        write_using_openpyxl(pm_openpyxl)
-        end_time = time.time() - start_time
-        results.loc[(n_row, n_col), "openpyxl"] = end_time
+def to_row_col_dict_(layout, n_rows, n_cols):
+    # the writers collect the cells in a cell store rather than a row_col_dict
+    pm_and_locs = resolve_loc(layout, n_rows, n_cols)()
+    return lambda: [
+        CompiledLayout.from_presentation_and_loc(pl, convert=True) for pl in pm_and_locs
+    ]
 
-        start_time = time.time()
-        write_using_xlsxwriter(pm_xlsxwriter)
-        end_time = time.time() - start_time
-        results.loc[(n_row, n_col), "xlsxwriter"] = end_time
 
-    results["(xlsxwriter/openpyxl) (%)"] = (
-        results["xlsxwriter"] / results["openpyxl"]
-    ) * 100
+def _compiled_layout(layout, n_rows, n_cols, engine):
+    # the layout is resolved before the write is timed
+    return CompiledLayout.from_layout(build_layout(layout, n_rows, n_cols, engine))
 
-    print(results)
-    return results
+
+def openpyxl_write(layout, n_rows, n_cols):
+    compiled_layout = _compiled_layout(layout, n_rows, n_cols, "openpyxl")
+    output_fp = _output_fp("openpyxl")
+    return lambda: OpenPyxlCompositor.to_xlsx(
+        layout=compiled_layout, output_fp=output_fp
+    )
 
 
-def time_presentation_model(scenarios: tp.Iterable[tp.Tuple[int, int]]):
+def xlsxwriter_write(layout, n_rows, n_cols):
+    compiled_layout = _compiled_layout(layout, n_rows, n_cols, "xlsxwriter")
+    output_fp = _output_fp("xlsxwriter")
+    return lambda: XlsxWriterCompositor.to_xlsx(
+        layout=compiled_layout, output_fp=output_fp
+    )
 
-    results = pd.DataFrame(index=row_col)
-    for n_row, n_col in scenarios:
-        df = prepare_dataframe(n_row, n_col)
 
-        start_time = time.time()
-        create_presentation_model_for_openpyxl_writer(df, slow=0)
-        end_time = time.time() - start_time
-        results.loc[(n_row, n_col), "new"] = end_time
+def to_html(layout, n_rows, n_cols):
+    pms = build_layout(layout, n_rows, n_cols, engine="html")
+    return lambda: HTMLWriter.to_html(pms)
+
+
+STAGES: tp.Dict[str, StageT] = {
+    "build_presentation_model": build_presentation_model,
+    "resolve_loc": resolve_loc,
+    "shift_loc": shift_loc,
+    "to_row_col_dict": to_row_col_dict_,
+    "openpyxl_write": openpyxl_write,
+    "xlsxwriter_write": xlsxwriter_write,
+    "to_html": to_html,
+}
+
+
+def scenarios(
+    stages=tuple(STAGES), layouts=LAYOUTS, scales=SCALES
+) -> tp.Iterator[tp.Tuple[str, str, int, int]]:
+    for stage in stages:
+        for layout in layouts:
+            for n_rows, n_cols in scales:
+                yield stage, layout, n_rows, n_cols
+
+
+def time_stage(stage, layout, n_rows, n_cols, repeat=3) -> tp.Dict[str, tp.Any]:
+    """
+    Run the stage `repeat` times and return a dict with the scenario and the min and median time in seconds. The caches are cleared before each run, see `clear_caches`
+    """
+    func = STAGES[stage](layout, n_rows, n_cols)
+    times = []
+    for _ in range(repeat):
+        clear_caches()
+        start_time = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start_time)
+    return dict(
+        stage=stage,
+        layout=layout,
+        n_rows=n_rows,
+        n_cols=n_cols,
+        repeat=repeat,
+        min=min(times),
+        median=statistics.median(times),
+    )
 
-        start_time = time.time()
-        create_presentation_model_for_openpyxl_writer(df, slow=2)
-        end_time = time.time() - start_time
-        results.loc[(n_row, n_col), "old"] = end_time
 
-    results["(column_level/cell_level) (%)"] = (
-        results["column_level"] / results["cell_level"]
-    ) * 100
+def memory_stage(stage, layout, n_rows, n_cols) -> tp.Dict[str, tp.Any]:
+    """
+    Run the stage once under `tracemalloc` and return a dict with the scenario, the peak bytes allocated while the stage ran and the bytes still held by the result of the stage, in total and per data cell. Allocations made by the setup of the stage, including its input frames (see `prepare_frames`), are made before the baseline is taken, so that the retained bytes only count what the result of the stage holds. The stage is run once before it is traced, so that one-off allocations (lazy imports) are not counted either, and the caches are cleared before the traced run (see `clear_caches`), so that the bytes the stage adds to them are counted.
+    """
+    func = STAGES[stage](layout, n_rows, n_cols)
+    func()
+    clear_caches()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+        result = func()
+        gc.collect()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+
+    cells = data_cells(layout, n_rows, n_cols)
+    return dict(
+        stage=stage,
+        layout=layout,
+        n_rows=n_rows,
+        n_cols=n_cols,
+        cells=cells,
+        peak=peak - baseline,
+        retained=current - baseline,
+        peak_per_cell=(peak - baseline) / cells,
+        retained_per_cell=(current - baseline) / cells,
+    )
 
-    print(results)
+
+def scaling_table(results) -> str:
+    """
+    Return a table with the peak bytes per cell of each stage and layout (rows) at each scale (columns). The bytes per cell should stay flat as the tables grow, a growing value points to allocations that are not linear in the number of cells
+    """
+    scales = sorted({(r["n_rows"], r["n_cols"]) for r in results})
+    peaks = {
+        (r["stage"], r["layout"], r["n_rows"], r["n_cols"]): r["peak_per_cell"]
+        for r in results
+    }
+    lines = [
+        "{:<26} {:<12}".format("stage", "layout")
+        + "".join("{:>14}".format("{}x{}".format(*scale)) for scale in scales)
+    ]
+    keys = dict.fromkeys((r["stage"], r["layout"]) for r in results)
+    for stage, layout in keys:
+        row = "".join(
+            (
+                "{:>14.1f}".format(peaks[(stage, layout, *scale)])
+                if (stage, layout, *scale) in peaks
+                else "{:>14}".format("-")
+            )
+            for scale in scales
+        )
+        lines.append("{:<26} {:<12}".format(stage, layout) + row)
+    return "\n".join(lines)
+
+
+def run(
+    output_fp=None, repeat=3, memory=False, **kwargs
+) -> tp.List[tp.Dict[str, tp.Any]]:
+    """
+    Time every scenario (see `scenarios` for the kwargs), print the results and write them as JSON to `output_fp` if given. If `memory` is True, then the memory used by each scenario is reported instead, see `memory_stage`
+    """
+    results = []
+    for scenario in scenarios(**kwargs):
+        if memory:
+            result = memory_stage(*scenario)
+            line = "{stage:<26} {layout:<12} {n_rows:>7} x {n_cols:<4} peak: {peak:>12,} B ({peak_per_cell:8.1f} B/cell) retained: {retained:>12,} B"
+        else:
+            result = time_stage(*scenario, repeat=repeat)
+            line = "{stage:<26} {layout:<12} {n_rows:>7} x {n_cols:<4} {median:10.4f}s"
+        print(line.format(**result))
+        results.append(result)
+
+    if memory:
+        print()
+        print("Peak bytes per cell")
+        print(scaling_table(results))
+
+    if output_fp:
+        with open(output_fp, "w") as f:
+            json.dump(results, f, indent=2)
     return results
 
 
 if __name__ == "__main__":
-    row_col = [(100, 10), (1000, 50), (10000, 100), (10000, 500)]
-    results = time_xlsx_writing(row_col)
-    results.to_csv("/tmp/writer_results_test_final.txt", sep="\t")
-    results = time_presentation_model(row_col)
-    results.to_csv("/tmp/pm_results_test_final.txt", sep="\t")
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("output_fp", nargs="?", help="JSON file for the results")
+    parser.add_argument(
+        "--memory",
+        action="store_true",
+        help="report the peak and retained memory of each stage instead of its time",
+    )
+    parser.add_argument("--stages", nargs="+", default=tuple(STAGES))
+    parser.add_argument("--layouts", nargs="+", default=LAYOUTS)
+    parser.add_argument(
+        "--scales",
+        nargs="+",
+        default=["{}x{}".format(*scale) for scale in SCALES],
+        help="table sizes as ROWSxCOLS",
+    )
+    args = parser.parse_args()
+    run(
+        args.output_fp,
+        memory=args.memory,
+        stages=args.stages,
+        layouts=args.layouts,
+        scales=[tuple(map(int, scale.split("x"))) for scale in args.scales],
+    )
@@ -0,0 +1,60 @@
+"""
+Module that benchmarks the time taken to import the table compositor modules in a fresh interpreter, and lists the engine specific libraries loaded by each import. Only the libraries needed by the engine or input type in use should be imported.
+"""
+
+import json
+import statistics
+import subprocess
+import sys
+import typing as tp
+
+MODULES = (
+    "table_compositor.table_compositor",
+    "table_compositor.html_writer",
+    "table_compositor.xlsx_writer",
+)
+
+# libraries that should only be imported when the engine or input type is used
+LAZY_LIBRARIES = ("openpyxl", "xlsxwriter", "static_frame", "polars")
+
+_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+loaded = sorted({{m.split(".")[0] for m in sys.modules}} & set({libraries!r}))
+print(json.dumps(dict(elapsed=elapsed, loaded=loaded)))
+"""
+
+
+def time_import(module: str, repeat: int = 5) -> tp.Dict[str, tp.Any]:
+    """
+    Import `module` in `repeat` fresh interpreters and return the median import time (in seconds) and the lazy libraries that were loaded
+    """
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                _SCRIPT.format(module=module, libraries=LAZY_LIBRARIES),
+            ],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        runs.append(json.loads(output))
+    return dict(
+        module=module,
+        median=statistics.median(r["elapsed"] for r in runs),
+        loaded=runs[0]["loaded"],
+    )
+
+
+if __name__ == "__main__":
+    results = [time_import(m) for m in MODULES]
+    for r in results:
+        print("{module:<40} {median:8.3f}s  loaded: {loaded}".format(**r))
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], "w") as f:
+            json.dump(results, f, indent=2)
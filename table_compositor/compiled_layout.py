@@ -0,0 +1,813 @@
+"""
+Module that supports a compiled layout, that is the cells of a worksheet after the layout has been resolved, stored in a compact cell store. The writers render layouts from the cell store, and a compiled layout can be saved in a format that can be loaded (memory mapped) by another process and written without rebuilding the presentation models.
+"""
+
+import json
+import numbers
+import struct
+import zipfile
+from array import array
+
+import numpy as np
+
+from table_compositor.conditional_formats import _RULE_TYPES, data_ranges
+from table_compositor.grid import GridLayoutManager
+from table_compositor.presentation_model import (
+    IndexNode,
+    InternalFrame,
+    PresentationAndLoc,
+    StyleRegistry,
+    ValueAndStyleAttributes,
+    _data_cell_positions,
+    _data_value_columns,
+    _nested_models,
+)
+from table_compositor.util import df_type_to_str, instrument_stage
+
+# kinds of the values in the value column store
+_BOOL, _INT, _FLOAT, _STR = range(4)
+
+# one record for each cell: the offsets of the cell, the kind of its value and the position of the value in the store of that kind, the position of its style in the style palette and its nesting level
+CELL_DTYPE = np.dtype(
+    [
+        ("r1", np.int32),
+        ("c1", np.int32),
+        ("r2", np.int32),
+        ("c2", np.int32),
+        ("value_kind", np.int8),
+        ("value_ref", np.int32),
+        ("style_id", np.int32),
+        ("nesting_level", np.int16),
+    ]
+)
+
+_OFFSET_FIELDS = ["r1", "c1", "r2", "c2"]
+
+# number of cells whose python objects are built at a time while iterating
+_ITER_CHUNK_SIZE = 65536
+
+# number of cells collected in the scratch arrays of `_CellStoreBuilder` before
+# they are copied to the cell store, which grows by half when it is full
+_BUILD_CHUNK_SIZE = 65536
+
+_INT64_MIN, _INT64_MAX = -(2**63), 2**63 - 1
+
+# size of the fixed part of a zip local file header
+_ZIP_LOCAL_HEADER_SIZE = 30
+
+# the openpyxl style objects that can be saved, they are saved as their xml
+_OPENPYXL_STYLE_TYPES = (
+    "Alignment",
+    "Border",
+    "Color",
+    "Font",
+    "GradientFill",
+    "PatternFill",
+    "Protection",
+    "Side",
+)
+
+# the conditional formatting rules that can be saved, by name
+_RULES_BY_NAME = {rule_type.__name__: rule_type for rule_type in _RULE_TYPES}
+
+
+def _value_kind(value):
+    """
+    Return the kind of the value, and the value converted to the python type stored for that kind. Values are expected to be converted by `df_type_to_str` already, like the xlsx compositors do before writing them
+    """
+    if isinstance(value, (bool, np.bool_)):
+        return _BOOL, bool(value)
+    if isinstance(value, numbers.Integral) and _INT64_MIN <= value <= _INT64_MAX:
+        return _INT, int(value)
+    if isinstance(value, numbers.Real) and not isinstance(value, numbers.Integral):
+        return _FLOAT, float(value)
+    return _STR, str(value)
+
+
+def _page_ranges(size, page_size, repeat):
+    """
+    Return the (first, last) offsets of the rows (or columns) of each page, where the first `repeat` rows are repeated on each page and are not part of the ranges
+    """
+    step = page_size - repeat
+    return [
+        (lo, min(lo + step, size) - 1)
+        for lo in range(repeat, max(size, repeat + 1), step)
+    ]
+
+
+def _clip_to_page(start, end, lo, hi, repeat):
+    """
+    Return a mask of the cells that are on the page with the rows (or columns) `lo` to `hi` and the `repeat` repeated rows, and the start and end offsets of the cells on the page. Cells that span the boundary of the page are clipped.
+
+    Args:
+        start, end: arrays of the first and last row (or column) of the cells
+    """
+    mask = (start <= hi) & ((end >= lo) | (start < repeat))
+    page_start = np.where(start < repeat, start, repeat + np.maximum(start, lo) - lo)
+    page_end = np.where(
+        end < repeat,
+        end,
+        np.where(end < lo, repeat - 1, repeat + np.minimum(end, hi) - lo),
+    )
+    return mask, page_start, page_end
+
+
+def _to_json(value):
+    """
+    Return the value as an object that can be written as JSON. Tuples, dicts, conditional formatting rules and openpyxl styles are tagged, so that `_from_json` can restore them without unpickling anything.
+
+    Raises:
+        ValueError: if the value, or a value it holds, is not one of None, bool, int, float, str, a list, tuple or dict of them, a conditional formatting rule or an openpyxl style
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, np.generic):
+        return _to_json(value.item())
+    if isinstance(value, list):
+        return [_to_json(v) for v in value]
+    if isinstance(value, _RULE_TYPES):
+        return dict(rule=type(value).__name__, fields=[_to_json(v) for v in value])
+    if isinstance(value, tuple):
+        return dict(tuple=[_to_json(v) for v in value])
+    if isinstance(value, dict):
+        return dict(dict=[[_to_json(k), _to_json(v)] for k, v in value.items()])
+    value_type = type(value)
+    if (
+        value_type.__module__.startswith("openpyxl.")
+        and value_type.__name__ in _OPENPYXL_STYLE_TYPES
+    ):
+        from openpyxl.xml.functions import tostring
+
+        xml = tostring(value.to_tree(tagname="value")).decode("UTF-8")
+        return dict(openpyxl=value_type.__name__, xml=xml)
+    raise ValueError(
+        "Values of type {} can not be saved in a compiled layout".format(value_type)
+    )
+
+
+def _from_json(value):
+    """
+    Return the value encoded by `_to_json`
+    """
+    if isinstance(value, list):
+        return [_from_json(v) for v in value]
+    if not isinstance(value, dict):
+        return value
+    if "tuple" in value:
+        return tuple(_from_json(v) for v in value["tuple"])
+    if "dict" in value:
+        return {_from_json(k): _from_json(v) for k, v in value["dict"]}
+    if "rule" in value:
+        return _RULES_BY_NAME[value["rule"]](*(_from_json(v) for v in value["fields"]))
+    if value.get("openpyxl") in _OPENPYXL_STYLE_TYPES:
+        from openpyxl import styles
+        from openpyxl.xml.functions import fromstring
+
+        return getattr(styles, value["openpyxl"]).from_tree(fromstring(value["xml"]))
+    raise ValueError("Unknown value in a compiled layout: {}".format(value))
+
+
+def _json_array(value):
+    return np.frombuffer(json.dumps(_to_json(value)).encode("UTF-8"), dtype=np.uint8)
+
+
+def _from_json_array(array):
+    return _from_json(json.loads(array.tobytes().decode("UTF-8")))
+
+
+def _load_npz(path, mmap_mode):
+    """
+    Return a dict of the arrays saved (uncompressed) in the npz file at `path`, each array is memory mapped from the file
+    """
+    with zipfile.ZipFile(path) as zf:
+        infos = zf.infolist()
+
+    arrays = {}
+    with open(path, "rb") as f:
+        for info in infos:
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(
+                    "Only uncompressed npz files can be memory mapped: {}".format(path)
+                )
+            f.seek(info.header_offset)
+            header = f.read(_ZIP_LOCAL_HEADER_SIZE)
+            name_length, extra_length = struct.unpack("<HH", header[26:30])
+            f.seek(
+                info.header_offset + _ZIP_LOCAL_HEADER_SIZE + name_length + extra_length
+            )
+
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+
+            name = info.filename[: -len(".npy")]
+            if not np.prod(shape):
+                # empty arrays can not be memory mapped
+                arrays[name] = np.empty(shape, dtype=dtype)
+                continue
+            arrays[name] = np.memmap(
+                path,
+                dtype=dtype,
+                mode=mmap_mode,
+                offset=f.tell(),
+                shape=shape,
+                order="F" if fortran_order else "C",
+            )
+    return arrays
+
+
+class _CellStoreBuilder:
+    """
+    Collects the cells of resolved presentation models into the arrays of a `CompiledLayout`, without building the `LocOffsets` and `ValueAndStyleAttributes` objects of a row_col_dict. The fields of the cells are collected in scratch arrays of the size of their field in `CELL_DTYPE`, and copied every `_BUILD_CHUNK_SIZE` cells to the cell store, a structured array that is grown in place, so that a cell takes about the 27 bytes of its record while the layout is built.
+
+    Args:
+        value_func: func applied to each value before it is stored, `df_type_to_str` like the xlsx compositors, or `str` for html
+    """
+
+    def __init__(self, value_func=df_type_to_str):
+        self._value_func = value_func
+        self._cells = np.empty(_BUILD_CHUNK_SIZE, dtype=CELL_DTYPE)
+        self._n_cells = 0
+        self._new_chunk()
+        self._ints = array("q")
+        self._floats = array("d")
+        self._strings = []
+        self._style_ids = {}
+        self._styles = []
+        self._conditional_formats = []
+        # the palette position of the style of each worksheet column, -1 for
+        # columns whose models do not agree on one style
+        self._column_styles = {}
+
+    def _new_chunk(self):
+        # the scratch arrays of the fields of the cells of the next chunk
+        self._offsets = array("i")
+        self._value_kinds = array("b")
+        self._value_refs = array("i")
+        self._cell_style_ids = array("i")
+        self._nesting_levels = array("h")
+
+    def _flush(self):
+        """
+        Copy the cells of the scratch arrays to the cell store
+        """
+        start = self._n_cells
+        stop = start + len(self._value_kinds)
+        if stop > len(self._cells):
+            # realloc'ed in place, the store is only referenced by the builder
+            self._cells.resize(max(stop, len(self._cells) * 3 // 2), refcheck=False)
+        cells = self._cells[start:stop]
+        offsets = np.frombuffer(self._offsets, dtype=np.intc).reshape(-1, 4)
+        for position, name in enumerate(_OFFSET_FIELDS):
+            cells[name] = offsets[:, position]
+        cells["value_kind"] = np.frombuffer(self._value_kinds, dtype=np.int8)
+        cells["value_ref"] = np.frombuffer(self._value_refs, dtype=np.intc)
+        cells["style_id"] = np.frombuffer(self._cell_style_ids, dtype=np.intc)
+        cells["nesting_level"] = np.frombuffer(self._nesting_levels, dtype=np.short)
+        del cells, offsets
+        self._n_cells = stop
+        self._new_chunk()
+
+    def _palette_position(self, style):
+        # equal styles share one entry of the palette, see `StyleRegistry`
+        key = style.style_id
+        if key is None:
+            key = StyleRegistry.style_id(style)
+        position = self._style_ids.get(key)
+        if position is None:
+            position = self._style_ids[key] = len(self._styles)
+            self._styles.append(style)
+        return position
+
+    def add(self, offsets, value, style, nesting_level):
+        value = self._value_func(value)
+        value_type = type(value)
+        # fast path for the values converted already, see `array_type_to_str`
+        if value_type is str:
+            kind = _STR
+        elif value_type is float:
+            kind = _FLOAT
+        else:
+            kind, value = _value_kind(value)
+        if kind == _STR:
+            value_ref = len(self._strings)
+            self._strings.append(value)
+        elif kind == _FLOAT:
+            value_ref = len(self._floats)
+            self._floats.append(value)
+        else:
+            value_ref = len(self._ints)
+            self._ints.append(value)
+
+        self._offsets.extend(offsets)
+        self._value_kinds.append(kind)
+        self._value_refs.append(value_ref)
+        self._cell_style_ids.append(self._palette_position(style))
+        self._nesting_levels.append(nesting_level)
+        if len(self._value_kinds) == _BUILD_CHUNK_SIZE:
+            self._flush()
+
+    def add_presentation_and_loc(
+        self, presentation_and_loc, nesting_level=0, convert=False
+    ):
+        """
+        Add the cells of a resolved presentation model, and of the models nested in it, in the same order as `to_row_col_dict`
+        """
+        presentation_model = presentation_and_loc.model
+        locs = presentation_and_loc.locs
+
+        if locs.index_name_loc:
+            self.add(
+                locs.index_name_loc,
+                presentation_model.index_name.values,
+                presentation_model.index_name.style,
+                nesting_level,
+            )
+
+        for loc, elements in (
+            (locs.header_loc, presentation_model.header),
+            (locs.index_loc, presentation_model.index_label),
+        ):
+            if loc:
+                data = IndexNode.gather_data(loc, elements.values, elements.style)
+                for offsets, value, style in data.values():
+                    self.add(offsets, value, style, nesting_level)
+
+        data_locs_array = locs.data_loc.values
+        conditional_formats = presentation_model.kwargs.get("conditional_formats", ())
+        if conditional_formats:
+            # the columns of nested models, which have no single range of values
+            df_view = InternalFrame(presentation_model.data.values)
+            nested_columns = {j for _, j in _nested_models(df_view)}
+        for rule, positions in conditional_formats:
+            nested_positions = nested_columns.intersection(positions)
+            if nested_positions:
+                raise ValueError(
+                    "The conditional format {} applies to the columns {} that hold nested presentation models, conditional formats can only apply to columns of values".format(
+                        rule,
+                        df_view.columns.values[sorted(nested_positions)].tolist(),
+                    )
+                )
+            ranges = data_ranges(positions, data_locs_array)
+            if ranges:
+                self._conditional_formats.append((rule, ranges))
+        column_styles = presentation_model.kwargs.get("column_styles")
+        if column_styles and data_locs_array.shape[0]:
+            for offsets, style in zip(data_locs_array[0], column_styles):
+                if isinstance(offsets, PresentationAndLoc) or offsets[1] != offsets[3]:
+                    continue
+                position = self._palette_position(style)
+                if self._column_styles.setdefault(offsets[1], position) != position:
+                    self._column_styles[offsets[1]] = -1
+        value_columns = _data_value_columns(presentation_model.data.values, convert)
+        style_array = presentation_model.data.style.values
+        for ix, j in _data_cell_positions(presentation_model):
+            offsets = data_locs_array[ix, j]
+            if isinstance(offsets, PresentationAndLoc):
+                self.add_presentation_and_loc(offsets, nesting_level, convert)
+            else:
+                self.add(
+                    offsets, value_columns[j][ix], style_array[ix, j], nesting_level
+                )
+
+    def __len__(self):
+        return self._n_cells + len(self._value_kinds)
+
+    def build(self):
+        """
+        Return the CompiledLayout of the cells added so far. The arrays are handed over to the compiled layout without being copied, so the builder can not be used afterwards
+        """
+        self._flush()
+        cells = self._cells
+        cells.resize(self._n_cells, refcheck=False)
+        self._cells = None
+
+        str_offsets = np.zeros(len(self._strings) + 1, dtype=np.int64)
+        np.cumsum(
+            np.fromiter(
+                map(len, self._strings), dtype=np.int64, count=len(self._strings)
+            ),
+            out=str_offsets[1:],
+        )
+        arrays = dict(
+            cells=cells,
+            ints=np.frombuffer(self._ints, dtype=np.int64),
+            floats=np.frombuffer(self._floats, dtype=np.float64),
+            str_offsets=str_offsets,
+            str_data=np.frombuffer(
+                "".join(self._strings).encode("UTF-8"), dtype=np.uint8
+            ),
+            column_styles=np.array(
+                [(col, p) for col, p in self._column_styles.items() if p >= 0],
+                dtype=np.int64,
+            ).reshape(-1, 2),
+            spans=np.flatnonzero(
+                (cells["r1"] != cells["r2"]) | (cells["c1"] != cells["c2"])
+            ),
+        )
+        return CompiledLayout(
+            arrays,
+            styles=self._styles,
+            conditional_formats=self._conditional_formats,
+        )
+
+
+class CompiledLayout:
+    """
+    The cells of a worksheet, after the layout has been resolved, stored as arrays:
+
+        cells: a structured array with one record of `CELL_DTYPE` for each cell, that is the (r1, c1, r2, c2) offsets, the kind and position (value_ref) of the value in the value store, the style_id and the nesting level of the cell
+        ints, floats, str_offsets, str_data: the value store, one array for each kind of value (bool values are stored in `ints`). Strings are concatenated in `str_data` (utf-8) and sliced by the character offsets in `str_offsets`
+        style_palette: the unique styles, indexed by the style_id of the cells, as utf-8 JSON (see `_to_json`, openpyxl styles are saved as their xml). Only in saved layouts, the palette of a layout that was built is kept as python objects
+        column_styles: (column, style_id) pairs, the style of the data of all models laid out in the worksheet column, for models built with a `column_style_func`
+        conditional_formats: the conditional formatting rules of the presentation models, with the offsets of the data ranges they apply to, as utf-8 JSON like the style palette
+        spans: the positions of the cells that span (are merged over) more than one row or column
+
+    The writers render a layout from its compiled layout, and a compiled layout can be used as the `layout` argument of `OpenPyxlCompositor` and `XlsxWriterCompositor`. It behaves like the row_col_dict built from a layout, that is it iterates over the offsets of the cells and `items()` returns (offsets, ValueAndStyleAttributes) pairs. A cell takes 27 bytes in the cell store, plus 8 bytes for a number or the utf-8 bytes of a string in the value store.
+
+    Nothing is unpickled while loading, the styles and rules are decoded from JSON, so a saved layout holds no code.
+    """
+
+    def __init__(self, arrays, styles=None, conditional_formats=None):
+        self._arrays = arrays
+        self._styles = styles
+        self._conditional_formats = conditional_formats
+        self._strings = None
+
+    @classmethod
+    def from_row_col_dict(cls, row_col_dict, value_func=df_type_to_str):
+        """
+        Build a compiled layout from a dict of {offsets: ValueAndStyleAttributes}, as returned by `GridLayoutManager.get_row_col_dict`
+
+        Args:
+            value_func: func applied to each value before it is stored, see `_CellStoreBuilder`
+        """
+        builder = _CellStoreBuilder(value_func)
+        for offsets, (value, style, nesting_level) in row_col_dict.items():
+            builder.add(offsets, value, style, nesting_level)
+        return builder.build()
+
+    @classmethod
+    def from_presentation_and_loc(
+        cls, presentation_and_loc, convert=False, value_func=df_type_to_str
+    ):
+        """
+        Build a compiled layout from a resolved presentation model, this is the cell store equivalent of `to_row_col_dict`
+
+        Args:
+            convert: see `to_row_col_dict`
+            value_func: func applied to each value before it is stored, see `_CellStoreBuilder`
+        """
+        builder = _CellStoreBuilder(value_func)
+        builder.add_presentation_and_loc(presentation_and_loc, convert=convert)
+        return builder.build()
+
+    @classmethod
+    def from_layout(
+        cls,
+        layout,
+        orientation="vertical",
+        h_shift_by=1,
+        v_shift_by=1,
+        instrument=None,
+    ):
+        """
+        Resolve the layout (a nested list of presentation models) into the cells of a worksheet, the same way as `GridLayoutManager.get_row_col_dict`, and return them as a compiled layout. The cells are added to the cell store directly, no row_col_dict is built.
+
+        Args:
+            instrument: optional func called as instrument(stage, elapsed, **attrs) after each stage, the stages are the same as those of `GridLayoutManager.get_row_col_dict`, where 'to_row_col_dict' is the stage that builds the cell store
+        """
+        with instrument_stage(instrument, "get_row_col_dict") as attrs:
+            shifted_grid, models = GridLayoutManager.get_shifted_grid(
+                layout, orientation, h_shift_by, v_shift_by, instrument=instrument
+            )
+            with instrument_stage(
+                instrument, "to_row_col_dict", models=models
+            ) as build_attrs:
+                builder = _CellStoreBuilder()
+
+                def _add(accum, presentation_and_loc):
+                    builder.add_presentation_and_loc(presentation_and_loc, convert=True)
+                    return accum
+
+                GridLayoutManager.foldl(shifted_grid, _add, None)
+                compiled_layout = builder.build()
+                build_attrs["cells"] = len(compiled_layout)
+            attrs.update(models=models, cells=len(compiled_layout))
+        return compiled_layout
+
+    def save(self, path):
+        """
+        Save the compiled layout as an uncompressed `.npz` file, so that it can be memory mapped by `load`. The file is written at `path` as given, `np.savez` would otherwise append `.npz` to a path without the suffix. The style palette and the conditional formats are saved as JSON, see `_to_json`.
+
+        Raises:
+            ValueError: if a style or conditional formatting rule holds a value that can not be saved
+        """
+        arrays = dict(
+            self._arrays,
+            style_palette=_json_array([s.user_style for s in self.styles]),
+            conditional_formats=_json_array(
+                [[rule, ranges] for rule, ranges in self.conditional_formats]
+            ),
+        )
+        with open(path, "wb") as f:
+            np.savez(f, **arrays)
+
+    @classmethod
+    def load(cls, path, mmap_mode="r"):
+        """
+        Load a compiled layout saved with `save`.
+
+        Args:
+            mmap_mode: mode used to memory map the arrays, see `numpy.memmap`. If None, the arrays are read into memory
+        """
+        if mmap_mode is None:
+            with np.load(path, allow_pickle=False) as npz:
+                return cls({k: npz[k] for k in npz.files})
+        return cls(_load_npz(path, mmap_mode))
+
+    @property
+    def arrays(self):
+        return self._arrays
+
+    @property
+    def cells(self):
+        return self._arrays["cells"]
+
+    @property
+    def offsets(self):
+        """
+        Return the offsets of the cells as an (n, 4) array of (start_row, start_col, end_row, end_col)
+        """
+        cells = self.cells
+        return np.stack([cells[name] for name in _OFFSET_FIELDS], axis=1)
+
+    @property
+    def spans(self):
+        """
+        Return the offsets of the cells that span more than one row or column
+        """
+        return self.offsets[self._arrays["spans"]]
+
+    def merge_plan(self):
+        """
+        Return the offsets of the cells that span more than one row or column, as an (n, 4) array, after checking in bulk that no spanning cell overlaps another cell. The writers can then merge the ranges without checking each one against the ranges merged before it.
+
+        Raises:
+            ValueError: if a spanning cell overlaps another cell
+        """
+        spans = self.spans.astype(np.int64)
+        if not len(spans):
+            return spans
+
+        heights = spans[:, 2] - spans[:, 0] + 1
+        widths = spans[:, 3] - spans[:, 1] + 1
+        areas = heights * widths
+        # the positions covered by the spans, one row for each position
+        span_ix = np.repeat(np.arange(len(spans)), areas)
+        local = np.arange(areas.sum()) - np.repeat(np.cumsum(areas) - areas, areas)
+        rows = spans[span_ix, 0] + local // widths[span_ix]
+        cols = spans[span_ix, 1] + local % widths[span_ix]
+
+        cells = self.cells
+        n_cols = int(max(cells["c2"].max(), cells["c1"].max())) + 1
+        covered = rows * n_cols + cols
+        starts = cells["r1"].astype(np.int64) * n_cols + cells["c1"]
+        # each position is covered by one span, and the only cells that start
+        # within the spans are the spanning cells themselves
+        if len(np.unique(covered)) != len(covered) or np.count_nonzero(
+            np.isin(starts, covered)
+        ) != len(spans):
+            raise ValueError(
+                "The layout has cells that overlap the cells spanning more than one row or column"
+            )
+        return spans
+
+    @property
+    def shape(self):
+        """
+        Return the (rows, cols) of the worksheet region covered by the cells
+        """
+        cells = self.cells
+        if not len(cells):
+            return (0, 0)
+        return (int(cells["r2"].max()) + 1, int(cells["c2"].max()) + 1)
+
+    def paginate(self, max_rows, max_cols, repeat_rows=0, repeat_cols=0):
+        """
+        Split the cells into pages of at most `max_rows` rows and `max_cols` columns, for example the size of an Excel worksheet. The first `repeat_rows` rows (the header) and `repeat_cols` columns (the index) are repeated on each page. Cells that span the boundary of a page are clipped to each page they are on, with the value repeated. The pages are computed from the offsets in bulk, the values and styles are shared with this compiled layout.
+
+        Returns:
+            A list of the compiled layouts of the pages, with the cells at their offsets in the page, pages are ordered by their rows first. Pages that only hold repeated cells are skipped
+
+        Raises:
+            ValueError: if the repeated rows or columns do not leave room for the rest of the cells
+        """
+        n_rows, n_cols = self.shape
+        if n_rows <= max_rows and n_cols <= max_cols:
+            return [self]
+        if repeat_rows >= max_rows or repeat_cols >= max_cols:
+            raise ValueError(
+                "The {} repeated rows and {} repeated columns do not fit in pages of {} rows and {} columns".format(
+                    repeat_rows, repeat_cols, max_rows, max_cols
+                )
+            )
+
+        cells = self.cells
+        column_styles = self._arrays.get("column_styles", np.empty((0, 2), np.int64))
+        conditional_formats = self.conditional_formats
+        pages = []
+        for row_lo, row_hi in _page_ranges(n_rows, max_rows, repeat_rows):
+            row_mask, r1, r2 = _clip_to_page(
+                cells["r1"], cells["r2"], row_lo, row_hi, repeat_rows
+            )
+            for col_lo, col_hi in _page_ranges(n_cols, max_cols, repeat_cols):
+                col_mask, c1, c2 = _clip_to_page(
+                    cells["c1"], cells["c2"], col_lo, col_hi, repeat_cols
+                )
+                mask = row_mask & col_mask
+                if not np.any(mask & (r1 >= repeat_rows) & (c1 >= repeat_cols)):
+                    continue
+                page_cells = cells[mask]
+                for name, offsets in zip(_OFFSET_FIELDS, (r1, c1, r2, c2)):
+                    page_cells[name] = offsets[mask]
+
+                style_mask, style_cols, _ = _clip_to_page(
+                    column_styles[:, 0],
+                    column_styles[:, 0],
+                    col_lo,
+                    col_hi,
+                    repeat_cols,
+                )
+                page_formats = []
+                for rule, ranges in conditional_formats:
+                    ranges = np.array(ranges, dtype=np.int64).reshape(-1, 4)
+                    range_rows = _clip_to_page(
+                        ranges[:, 0], ranges[:, 2], row_lo, row_hi, repeat_rows
+                    )
+                    range_cols = _clip_to_page(
+                        ranges[:, 1], ranges[:, 3], col_lo, col_hi, repeat_cols
+                    )
+                    in_page = range_rows[0] & range_cols[0]
+                    if in_page.any():
+                        page_ranges = np.stack(
+                            [
+                                range_rows[1],
+                                range_cols[1],
+                                range_rows[2],
+                                range_cols[2],
+                            ],
+                            axis=1,
+                        )[in_page]
+                        page_formats.append(
+                            (rule, [tuple(r) for r in page_ranges.tolist()])
+                        )
+
+                arrays = dict(
+                    self._arrays,
+                    cells=page_cells,
+                    spans=np.flatnonzero(
+                        (page_cells["r1"] != page_cells["r2"])
+                        | (page_cells["c1"] != page_cells["c2"])
+                    ),
+                    column_styles=np.stack([style_cols, column_styles[:, 1]], axis=1)[
+                        style_mask
+                    ],
+                )
+                pages.append(
+                    CompiledLayout(
+                        arrays,
+                        styles=self._styles,
+                        conditional_formats=page_formats,
+                    )
+                )
+        return pages
+
+    @property
+    def column_styles(self):
+        """
+        Return a dict of {column: StyleWrapper}, the style shared by the data of all models in the worksheet column, see `build_presentation_model` and `column_style_func`
+        """
+        if "column_styles" not in self._arrays:
+            return {}
+        styles = self.styles
+        return {
+            col: styles[position]
+            for col, position in self._arrays["column_styles"].tolist()
+        }
+
+    @property
+    def conditional_formats(self):
+        """
+        Return a list of (rule, ranges), with the (start_row, start_col, end_row, end_col) offsets of the data ranges each rule applies to, see the conditional_formats module
+        """
+        if self._conditional_formats is None:
+            if "conditional_formats" not in self._arrays:
+                return []
+            self._conditional_formats = [
+                (rule, ranges)
+                for rule, ranges in _from_json_array(
+                    self._arrays["conditional_formats"]
+                )
+            ]
+        return self._conditional_formats
+
+    @property
+    def styles(self):
+        """
+        Return the palette of unique styles, as a list of interned StyleWrapper
+        """
+        if self._styles is None:
+            palette = _from_json_array(self._arrays["style_palette"])
+            self._styles = [StyleRegistry.wrap(s) for s in palette]
+        return self._styles
+
+    def values(self):
+        """
+        Return the values of all cells, as a list of python objects
+        """
+        return self._values(0, len(self))
+
+    def _values(self, start, stop):
+        """
+        Return the values of the cells from position `start` to `stop`, as a list of python objects
+        """
+        if self._strings is None:
+            self._strings = self._arrays["str_data"].tobytes().decode("UTF-8")
+        cells = self.cells[start:stop]
+        kinds = cells["value_kind"]
+        refs = cells["value_ref"]
+        values = np.empty(len(cells), dtype=object)
+
+        for kind, store in (
+            (_INT, self._arrays["ints"]),
+            (_FLOAT, self._arrays["floats"]),
+            (_BOOL, self._arrays["ints"]),
+        ):
+            mask = kinds == kind
+            if mask.any():
+                kind_values = store[refs[mask]]
+                if kind == _BOOL:
+                    kind_values = kind_values.astype(bool)
+                values[mask] = kind_values.tolist()
+
+        mask = kinds == _STR
+        if mask.any():
+            strings = self._strings
+            str_offsets = self._arrays["str_offsets"]
+            refs = refs[mask]
+            starts = str_offsets[refs].tolist()
+            ends = str_offsets[refs + 1].tolist()
+            # assigned one at a time, since numpy would otherwise convert the
+            # list of strings to a string array first
+            for ix, str_start, str_end in zip(
+                np.flatnonzero(mask).tolist(), starts, ends
+            ):
+                values[ix] = strings[str_start:str_end]
+        return values.tolist()
+
+    def _offsets(self, start, stop):
+        """
+        Return an iterator of the offsets, as tuples, of the cells from position `start` to `stop`
+        """
+        cells = self.cells[start:stop]
+        return zip(*(cells[name].tolist() for name in _OFFSET_FIELDS))
+
+    def items(self):
+        """
+        Yield the (offsets, ValueAndStyleAttributes) of all cells, like the items of a row_col_dict. The python objects are built for `_ITER_CHUNK_SIZE` cells at a time, so that only one chunk of them is held while iterating
+        """
+        styles = self.styles
+        for start in range(0, len(self), _ITER_CHUNK_SIZE):
+            stop = start + _ITER_CHUNK_SIZE
+            cells = self.cells[start:stop]
+            for offsets, value, style_id, nesting_level in zip(
+                self._offsets(start, stop),
+                self._values(start, stop),
+                cells["style_id"].tolist(),
+                cells["nesting_level"].tolist(),
+            ):
+                yield offsets, ValueAndStyleAttributes(
+                    value, styles[style_id], nesting_level
+                )
+
+    def columns(self):
+        """
+        Return the sorted list of the columns the cells start in, read from the cell array
+        """
+        return np.unique(self.cells["c1"]).tolist()
+
+    def to_row_col_dict(self):
+        """
+        Return the cells as a dict of {offsets: ValueAndStyleAttributes}, like `GridLayoutManager.get_row_col_dict`
+        """
+        return dict(self.items())
+
+    def __iter__(self):
+        for start in range(0, len(self), _ITER_CHUNK_SIZE):
+            yield from self._offsets(start, start + _ITER_CHUNK_SIZE)
+
+    def __len__(self):
+        return len(self.cells)
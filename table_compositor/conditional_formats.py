@@ -0,0 +1,128 @@
+"""
+Module that supports declarative conditional formatting rules. The rules are carried by the presentation model and written by the xlsx compositors as native Excel conditional formats over the resolved data ranges, so that the styles are computed by Excel when the file is viewed rather than for each cell while it is rendered.
+"""
+
+import typing as tp
+
+# the operators of `CellValueRule`, and the name of each operator in the xlsx file
+OPERATORS = {
+    ">": "greaterThan",
+    ">=": "greaterThanOrEqual",
+    "<": "lessThan",
+    "<=": "lessThanOrEqual",
+    "==": "equal",
+    "!=": "notEqual",
+    "between": "between",
+    "not between": "notBetween",
+}
+
+_RANGE_OPERATORS = ("between", "not between")
+
+
+class CellValueRule(tp.NamedTuple):
+    """
+    Apply `style` to the cells whose value compares true with `value`.
+
+    Args:
+        operator: one of '>', '>=', '<', '<=', '==', '!=', 'between' and 'not between'
+        value: the value compared with, or a (low, high) tuple for 'between' and 'not between'
+        style: the style applied, compatible with the engine that writes the file, for example dict(font=Font(color='9C0006'), fill=PatternFill(...)) for openpyxl (only the font, fill and border are used) or dict(font_color='#9C0006', bg_color='#FFC7CE') for XlsxWriter
+        columns: the labels of the data columns the rule applies to, all data columns if None
+    """
+
+    operator: str
+    value: tp.Any
+    style: tp.Dict[str, tp.Any]
+    columns: tp.Optional[tp.Sequence[tp.Hashable]] = None
+
+
+class ColorScale(tp.NamedTuple):
+    """
+    Color the cells on a scale from `min_color`, for the lowest value of the range, to `max_color`, for the highest value, through `mid_color` for the median if provided. Colors are hex strings, for example '#F8696B'.
+    """
+
+    min_color: str
+    max_color: str
+    mid_color: tp.Optional[str] = None
+    columns: tp.Optional[tp.Sequence[tp.Hashable]] = None
+
+
+class DataBar(tp.NamedTuple):
+    """
+    Draw a bar of `color`, a hex string, in each cell with a length proportional to the value of the cell in the range.
+    """
+
+    color: str = "#638EC6"
+    columns: tp.Optional[tp.Sequence[tp.Hashable]] = None
+
+
+_RULE_TYPES = (CellValueRule, ColorScale, DataBar)
+
+
+def resolve_columns(rules, columns):
+    """
+    Return a tuple of (rule, positions) with the positions of the data columns each rule applies to.
+
+    Args:
+        rules: a sequence of `CellValueRule`, `ColorScale` and `DataBar`
+        columns: the labels of the data columns, as an `InternalIndex`
+
+    Raises:
+        ValueError: if a rule is not valid, or refers to a column that is not in the data
+    """
+    positions = {label: ix for ix, label in enumerate(columns.values)}
+    resolved = []
+    for rule in rules:
+        if not isinstance(rule, _RULE_TYPES):
+            raise ValueError(
+                "Conditional formats must be CellValueRule, ColorScale or DataBar, got {}".format(
+                    type(rule)
+                )
+            )
+        if isinstance(rule, CellValueRule):
+            if rule.operator not in OPERATORS:
+                raise ValueError(
+                    "Unknown operator {!r}, expected one of {}".format(
+                        rule.operator, list(OPERATORS)
+                    )
+                )
+            if (rule.operator in _RANGE_OPERATORS) != (
+                isinstance(rule.value, tuple) and len(rule.value) == 2
+            ):
+                raise ValueError(
+                    "A (low, high) value is required by, and only by, the 'between' and 'not between' operators"
+                )
+
+        if rule.columns is None:
+            resolved.append((rule, tuple(range(len(positions)))))
+            continue
+        missing = [label for label in rule.columns if label not in positions]
+        if missing:
+            raise ValueError(
+                "The columns {} of the conditional format are not in the data".format(
+                    missing
+                )
+            )
+        resolved.append((rule, tuple(sorted(positions[c] for c in rule.columns))))
+    return tuple(resolved)
+
+
+def data_ranges(positions, data_locs):
+    """
+    Return the (start_row, start_col, end_row, end_col) offsets of the resolved data columns at `positions`, adjacent columns are merged into one range.
+
+    Args:
+        data_locs: the 2-d array of the resolved offsets of the data cells, the columns at `positions` must not hold nested presentation models
+    """
+    if not data_locs.shape[0] or not positions:
+        return []
+    ranges = []
+    first = last = positions[0]
+    for position in positions[1:] + (None,):
+        if position == last + 1:
+            last = position
+            continue
+        start, end = data_locs[0, first], data_locs[-1, last]
+        ranges.append((start[0], start[1], end[2], end[3]))
+        first = last = position
+    return ranges
@@ -11,6 +11,23 @@ from table_compositor.presentation_model import (
     shift_presentation_model,
     to_row_col_dict,
 )
+from table_compositor.util import instrument_stage
+
+
+def _model_height(model):
+    if isinstance(model, PresentationAndLoc):
+        model = model.model
+    return PresentationLayoutManager.height(
+        model.data.values, model.kwargs["hide_header"]
+    )
+
+
+def _model_width(model):
+    if isinstance(model, PresentationAndLoc):
+        model = model.model
+    return PresentationLayoutManager.width(
+        model.data.values, model.kwargs["hide_index"]
+    )
 
 
 class Cell(tp.NamedTuple):
@@ -127,35 +144,105 @@ class GridLayoutManager:
         )
 
     @staticmethod
-    def get_row_col_dict(layout, orientation="vertical", h_shift_by=1, v_shift_by=1):
+    def estimate_dimensions(layout, orientation="vertical", h_shift_by=1, v_shift_by=1):
         """
-        Transform the grid into a dict of {coord: value_and_style_attribute value}
+        Return the (rows, cols) of the worksheet region the layout is rendered to, computed from the shapes of the presentation models (and of the models nested in them) without resolving the layout or calling any callback func. This is cheap compared to the layout, so layouts that do not fit in a worksheet can be detected up front
         """
-
-        grid = GridLayoutManager.compute_grid(layout, orientation)
-        _, shifted_grid = GridLayoutManager.shift_grid(
+        vertical = orientation.upper() == "VERTICAL"
+        grid = GridLayoutManager.build_cells(layout, vertical)
+        (rows, cols), _ = GridLayoutManager.shift_grid(
             cell=grid,
             i=0,
             j=0,
-            shifter_func=shift_presentation_model,
-            ht_func=get_presentation_model_max_rows,
-            width_func=get_presentation_model_max_cols,
+            shifter_func=lambda model, i, j: model,
+            ht_func=_model_height,
+            width_func=_model_width,
             h_shift_by=h_shift_by,
             v_shift_by=v_shift_by,
         )
+        return rows - v_shift_by, cols - h_shift_by
 
-        f = lambda accum, pm: {**accum, **to_row_col_dict(pm)}
-        return GridLayoutManager.foldl(shifted_grid, f, dict())
+    @staticmethod
+    def count_models(cell):
+        """
+        Return the number of presentation models in the grid, nested presentation models are not counted
+        """
+        return GridLayoutManager.foldl(cell, lambda accum, _: accum + 1, 0)
 
     @staticmethod
-    def compute_grid(layout, orientation="vertical"):
+    def get_shifted_grid(
+        layout, orientation="vertical", h_shift_by=1, v_shift_by=1, instrument=None
+    ):
+        """
+        Return the grid of the layout, with the presentation models resolved and shifted to their location in the worksheet, and the number of presentation models in the grid
+
+        Args:
+            instrument: optional func called as instrument(stage, elapsed, **attrs) after the 'compute_grid' and 'shift_grid' stages, see `util.instrument_stage`
+        """
+        grid = GridLayoutManager.compute_grid(
+            layout, orientation, instrument=instrument
+        )
+        models = GridLayoutManager.count_models(grid)
+        with instrument_stage(instrument, "shift_grid", models=models):
+            _, shifted_grid = GridLayoutManager.shift_grid(
+                cell=grid,
+                i=0,
+                j=0,
+                shifter_func=shift_presentation_model,
+                ht_func=get_presentation_model_max_rows,
+                width_func=get_presentation_model_max_cols,
+                h_shift_by=h_shift_by,
+                v_shift_by=v_shift_by,
+            )
+        return shifted_grid, models
+
+    @staticmethod
+    def get_row_col_dict(
+        layout,
+        orientation="vertical",
+        h_shift_by=1,
+        v_shift_by=1,
+        convert=False,
+        instrument=None,
+    ):
         """
         Transform the grid into a dict of {coord: value_and_style_attribute value}
+
+        Args:
+            convert: if True, data values are converted in bulk to simple python types, see `to_row_col_dict`
+            instrument: optional func called as instrument(stage, elapsed, **attrs) after the 'compute_grid', 'shift_grid', 'to_row_col_dict' and 'get_row_col_dict' stages, see `util.instrument_stage`
         """
+        with instrument_stage(instrument, "get_row_col_dict") as attrs:
+            shifted_grid, models = GridLayoutManager.get_shifted_grid(
+                layout, orientation, h_shift_by, v_shift_by, instrument=instrument
+            )
 
-        vertical = orientation.upper() == "VERTICAL"
-        grid = GridLayoutManager.build_cells(layout, vertical)
-        grid = GridLayoutManager.traverse(grid, PresentationLayoutManager.resolve_loc)
+            with instrument_stage(
+                instrument, "to_row_col_dict", models=models
+            ) as row_col_dict_attrs:
+                f = lambda accum, pm: {**accum, **to_row_col_dict(pm, convert=convert)}
+                row_col_dict = GridLayoutManager.foldl(shifted_grid, f, dict())
+                row_col_dict_attrs["cells"] = len(row_col_dict)
+
+            attrs.update(models=models, cells=len(row_col_dict))
+        return row_col_dict
+
+    @staticmethod
+    def compute_grid(layout, orientation="vertical", instrument=None):
+        """
+        Transform the grid into a dict of {coord: value_and_style_attribute value}
+
+        Args:
+            instrument: optional func called as instrument('compute_grid', elapsed, models=...), see `util.instrument_stage`
+        """
+        with instrument_stage(instrument, "compute_grid") as attrs:
+            vertical = orientation.upper() == "VERTICAL"
+            grid = GridLayoutManager.build_cells(layout, vertical)
+            grid = GridLayoutManager.traverse(
+                grid, PresentationLayoutManager.resolve_loc
+            )
+            if instrument is not None:
+                attrs["models"] = GridLayoutManager.count_models(grid)
         return grid
 
     @staticmethod
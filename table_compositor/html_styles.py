@@ -3,7 +3,7 @@ import typing as tp
 import numpy as np
 
 from table_compositor.html_writer import HTMLWriter
-from table_compositor.util import df_type_to_str
+from table_compositor.util import column_type_to_str, df_type_to_str
 
 
 class td_style(tp.NamedTuple):
@@ -55,6 +55,11 @@ default_td_style = td_style(
 
 default_table_style = dict(border=1, style="border-collapse:collapse;")
 
+_DOLLAR_FORMAT = "${:0,.0f}"
+
+# types that are rendered using the `default_numeric_td_style`
+_NUMERIC_TYPES = (np.int_, float, np.uint)
+
 
 class HTMLWriterDefaults:
     """
@@ -66,7 +71,7 @@ class HTMLWriterDefaults:
     def _to_dollar_format(v):
         if not isinstance(v, (float, int)):
             return v
-        r = "${:0,.0f}".format(v)
+        r = _DOLLAR_FORMAT.format(v)
         return r
 
     @staticmethod
@@ -105,12 +110,74 @@ class HTMLWriterDefaults:
         """
 
         def _style_func(r, c):
-            if isinstance(df.loc[r, c], (np.int_, float, np.uint)):
+            if isinstance(df.loc[r, c], _NUMERIC_TYPES):
                 return td_style_to_str(default_numeric_td_style)
             return td_style_to_str(default_td_style)
 
         return _style_func
 
+    @staticmethod
+    def data_column_value_func(df, dollar_columns=None):
+        """
+        Column level equivalent of `data_value_func`, that can be used as callback for data_column_value_func. Whole columns are converted at once, which is much faster than calling `data_value_func` for every cell.
+
+        Args:
+            df: the dataframe that will be used to build the presentation model
+            dollar_columns: columns whose numeric values are rendered in dollar format
+
+        Returns:
+            A function that takes a column as argument and returns the converted values of that column
+        """
+        dollar_columns = dollar_columns or set()
+
+        def _value_func(c):
+            column = df[c]
+            converted = column_type_to_str(column)
+            if c not in dollar_columns:
+                return converted
+
+            values = column.values
+            if not (isinstance(values, np.ndarray) and values.dtype.kind in "biuf"):
+                return [HTMLWriterDefaults._to_dollar_format(v) for v in converted]
+
+            finite = np.isfinite(values) if values.dtype.kind == "f" else slice(None)
+            converted[finite] = [
+                _DOLLAR_FORMAT.format(v) for v in values[finite].tolist()
+            ]
+            return converted
+
+        return _value_func
+
+    @staticmethod
+    def data_column_style_func(df):
+        """
+        Column level equivalent of `data_style_func`, that can be used as callback for data_column_style_func. The style of columns with a numeric dtype is resolved once for the whole column.
+
+        Args:
+            df: the dataframe that will be used to build the presentation model
+
+        Returns:
+            A function that takes a column as argument and returns the html styles of the cells in that column
+        """
+        numeric_style = td_style_to_str(default_numeric_td_style)
+        style = td_style_to_str(default_td_style)
+
+        def _style_func(c):
+            column = df[c]
+            values = column.values
+            if isinstance(values, np.ndarray) and values.dtype != object:
+                if issubclass(values.dtype.type, _NUMERIC_TYPES):
+                    return np.full(len(values), numeric_style, dtype=object)
+                return np.full(len(values), style, dtype=object)
+            # the values rather than the column are iterated, since iterating
+            # over a static-frame Series yields its index labels
+            return [
+                numeric_style if isinstance(v, _NUMERIC_TYPES) else style
+                for v in values
+            ]
+
+        return _style_func
+
     @staticmethod
     def header_value_func(df):
         """
@@ -179,6 +246,76 @@ class HTMLWriterDefaults:
 
         return _style_func
 
+    @staticmethod
+    def header_level_value_func(df):
+        """
+        Level-wise equivalent of `header_value_func`, that can be used as callback for header_level_value_func
+
+        Args:
+            df: the dataframe that will be used to build the presentation model
+
+        Returns:
+            A function that takes the level, values and keys of the nodes at that level and returns the values
+        """
+
+        def _value_func(level, values, keys):
+            return values
+
+        return _value_func
+
+    @staticmethod
+    def header_level_style_func(df):
+        """
+        Level-wise equivalent of `header_style_func`, that can be used as callback for header_level_style_func
+
+        Args:
+            df: the dataframe that will be used to build the presentation model
+
+        Returns:
+            A function that takes the level, values and keys of the nodes at that level and returns the html styles of the nodes
+        """
+        style = td_style_to_str(default_th_style)
+
+        def _style_func(level, values, keys):
+            return np.full(len(values), style, dtype=object)
+
+        return _style_func
+
+    @staticmethod
+    def index_level_value_func(df):
+        """
+        Level-wise equivalent of `index_value_func`, that can be used as callback for index_level_value_func
+
+        Args:
+            df: the dataframe that will be used to build the presentation model
+
+        Returns:
+            A function that takes the level, values and keys of the nodes at that level and returns the values
+        """
+
+        def _value_func(level, values, keys):
+            return values
+
+        return _value_func
+
+    @staticmethod
+    def index_level_style_func(df):
+        """
+        Level-wise equivalent of `index_style_func`, that can be used as callback for index_level_style_func
+
+        Args:
+            df: the dataframe that will be used to build the presentation model
+
+        Returns:
+            A function that takes the level, values and keys of the nodes at that level and returns the html styles of the nodes
+        """
+        style = td_style_to_str(default_td_style)
+
+        def _style_func(level, values, keys):
+            return np.full(len(values), style, dtype=object)
+
+        return _style_func
+
     @staticmethod
     def index_name_style_func(df):
         """
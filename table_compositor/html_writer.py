@@ -1,5 +1,6 @@
-from itertools import groupby
+import numpy as np
 
+from table_compositor.compiled_layout import CompiledLayout
 from table_compositor.grid import (
     Cell,
     GridLayoutManager,
@@ -9,12 +10,16 @@ from table_compositor.presentation_model import StyleWrapper
 
 class HTMLWriter:
     @staticmethod
-    def _wrap_table_element(element, attrs, value):
+    def _start_tag(element, attrs):
         _attrs = " ".join("{}='{}'".format(k, v) for k, v in sorted(attrs.items()))
         _attrs = _attrs.strip(" ")
         _attrs = " " + _attrs if _attrs else ""
-        s = "<{elem}{elem_attr}>{v}</{elem}>\n".format(
-            elem=element, elem_attr=_attrs, v=value
+        return "<{elem}{elem_attr}>".format(elem=element, elem_attr=_attrs)
+
+    @staticmethod
+    def _wrap_table_element(element, attrs, value):
+        s = "{start}{v}</{elem}>\n".format(
+            start=HTMLWriter._start_tag(element, attrs), v=value, elem=element
         )
         return s
 
@@ -34,39 +39,78 @@ class HTMLWriter:
         return d
 
     @staticmethod
-    def _to_html(row_col_dict, **kwargs):
+    def _to_html(compiled_layout, **kwargs):
         """
+        Render the cells of a presentation model, and of the models nested in it, as one flat table in a single pass over the cells. Nested models are rendered as cells with row and column spans, the same way they are laid out in xlsx. Positions that are not covered by any cell, for example next to a nested model that is smaller than the cell it is nested in, are rendered as empty cells so that the cells after them stay in their column.
+
         Args:
-            row_col_dict: dict with (0, 0, 0, 0) : (Value, Style)
+            compiled_layout: the cells as a `CompiledLayout`, or a dict with (0, 0, 0, 0) : (Value, Style), as returned by `to_row_col_dict`
         """
+        table_attrs = kwargs or dict()
+        if isinstance(compiled_layout, dict):
+            compiled_layout = CompiledLayout.from_row_col_dict(
+                compiled_layout, value_func=str
+            )
+        html = HTMLWriter._rows_to_html(compiled_layout)
+        return HTMLWriter._wrap_table_element("table", table_attrs, "".join(html))
 
-        def wrap_tr(offsets):
-            s = []
-            nesting_level = row_col_dict[offsets[0]].nesting_level
-            for offset in offsets:
-                row_span = offset.end_row - offset.start_row + 1
-                col_span = offset.end_col - offset.start_col + 1
-                value = row_col_dict[offset].value
-                style = row_col_dict[offset].style_wrapper.user_style
-                style = HTMLWriter.style_to_str(style)
-
-                td_attr = dict(rowspan=row_span, colspan=col_span, style=style)
-                if nesting_level > row_col_dict[offset].nesting_level:
-                    # we have encountered a nested table
-                    inner_html = HTMLWriter._to_html(value)
+    @staticmethod
+    def _rows_to_html(compiled_layout):
+        """
+        Return the `tr` elements of the cells of the compiled layout, as a list of strings, see `_to_html`
+        """
+        if not len(compiled_layout):
+            return []
+
+        cells = compiled_layout.cells
+        order = np.lexsort((cells["c1"], cells["r1"]))
+        cells = cells[order]
+        start_rows = cells["r1"].tolist()
+        start_cols = cells["c1"].tolist()
+        end_rows = cells["r2"].tolist()
+        end_cols = cells["c2"].tolist()
+        style_ids = cells["style_id"].tolist()
+        values = compiled_layout.values()
+        values = [values[ix] for ix in order.tolist()]
+        # each unique style is converted once
+        styles = [
+            HTMLWriter.style_to_str(style.user_style)
+            for style in compiled_layout.styles
+        ]
+
+        start_col = min(start_cols)
+        end_col = max(end_cols)
+        # the last row covered by a cell (with a rowspan) in each column
+        covered_until = [-1] * (end_col - start_col + 1)
+
+        html = []
+        ix = 0
+        count = len(start_rows)
+        for row in range(start_rows[0], max(end_rows) + 1):
+            tds = []
+            col = start_col
+            while col <= end_col:
+                if ix < count and start_rows[ix] == row and start_cols[ix] == col:
+                    td_attr = dict(
+                        rowspan=end_rows[ix] - row + 1,
+                        colspan=end_cols[ix] - col + 1,
+                        style=styles[style_ids[ix]],
+                    )
+                    tds.append(
+                        HTMLWriter._wrap_table_element("td", td_attr, values[ix])
+                    )
+                    for c in range(col, end_cols[ix] + 1):
+                        covered_until[c - start_col] = end_rows[ix]
+                    col = end_cols[ix] + 1
+                    ix += 1
+                elif covered_until[col - start_col] >= row:
+                    col += 1
                 else:
-                    inner_html = value
-                td = HTMLWriter._wrap_table_element("td", td_attr, inner_html)
-                s.extend(td)
-            tr = HTMLWriter._wrap_table_element("tr", {}, "".join(s))
-            return tr
-
-        trs = []
-        for _, offsets in groupby(sorted(row_col_dict), key=lambda x: (x[0])):
-            trs.append(wrap_tr(list(offsets)))
-
-        table_attrs = kwargs or dict()
-        return HTMLWriter._wrap_table_element("table", table_attrs, "".join(trs))
+                    tds.append(HTMLWriter._wrap_table_element("td", {}, ""))
+                    col += 1
+            if tds:
+                html.append(HTMLWriter._wrap_table_element("tr", {}, "".join(tds)))
+        return html
 
     @staticmethod
     def _to_html_from_grid(grid, **kwargs):
@@ -95,7 +139,7 @@ class HTMLWriter:
 
     @staticmethod
     def _grid_to_html(cell, **kwargs):
-        if isinstance(cell.children, dict):
+        if isinstance(cell.children, (dict, CompiledLayout)):
             html = HTMLWriter._to_html(cell.children, **kwargs)
             return html
 
@@ -139,6 +183,10 @@ class HTMLWriter:
         if not isinstance(layout, list):
             layout = [layout]
 
-        # grid = GridLayoutManager.compute_grid(layout, orientation)
-        grid = GridLayoutManager.get_non_shifted_row_col_dict(layout, orientation)
+        # the values are stored as the strings they are rendered as
+        grid = GridLayoutManager.compute_grid(layout, orientation)
+        grid = GridLayoutManager.traverse(
+            grid,
+            lambda pm: CompiledLayout.from_presentation_and_loc(pm, value_func=str),
+        )
         return HTMLWriter._grid_to_html(grid, **kwargs)
@@ -9,17 +9,85 @@ and also create Excel files with all fancy formatting.
 # c. HTML Writer (non-nested, and then nested tables)
 # e. Revisit _convert method
 
+import sys
 import typing as tp
 from collections import defaultdict, deque
-from itertools import groupby
+from itertools import count, groupby
 
 import numpy as np
 import pandas as pd
-import static_frame as sf
-from openpyxl.styles.alignment import Alignment
-from openpyxl.styles.borders import Border
-from openpyxl.styles.fills import PatternFill
-from openpyxl.styles.fonts import Font
+
+from table_compositor.arrow_frame import ArrowFrame, is_arrow_like
+from table_compositor.util import (
+    BULK_CONVERTIBLE_KINDS,
+    LRUCache,
+    array_type_to_str,
+    df_type_to_str,
+)
+
+if tp.TYPE_CHECKING:
+    from openpyxl.styles.alignment import Alignment
+    from openpyxl.styles.borders import Border
+    from openpyxl.styles.fills import PatternFill
+    from openpyxl.styles.fonts import Font
+
+
+def _static_frame():
+    """
+    Return the static_frame module if it has been imported, otherwise None. Static-frame is not imported by this module, since an object can only be a static-frame container if the caller already imported it.
+    """
+    return sys.modules.get("static_frame")
+
+
+def _is_static_frame(obj, *names):
+    sf = _static_frame()
+    return sf is not None and isinstance(obj, tuple(getattr(sf, n) for n in names))
+
+
+# index trees, keyed by `InternalIndex.signature`, see `IndexNode.cached_index_to_index_node`
+_INDEX_TREE_CACHE = LRUCache(maxsize=64)
+
+# offsets of the nodes of resolved index trees, see `IndexNode.cached_resolve_loc`
+_RESOLVED_LOC_CACHE = LRUCache(maxsize=256)
+
+# layouts of nested presentation models, keyed by their shape, see `_nested_layout`
+_NESTED_LAYOUT_CACHE = LRUCache(maxsize=256)
+
+# the largest index (in labels) or nested model (in cells) that is cached, the
+# caches are bounded by their number of entries, so larger values would be kept
+# alive long after they are rendered, and building their keys is not cheaper
+# than laying them out again
+_MAX_CACHED_SIZE = 10000
+
+# number of rows of a data column that are converted to python objects at a
+# time, see `_ChunkedColumnValues`
+_CONVERT_CHUNK_ROWS = 1024
+
+# the interned StyleWrapper of the styles registered recently, keyed by
+# `_style_key`, the registry is bounded so that the styles computed for each
+# cell do not pile up over the life of the process
+_MAX_STYLES = 16384
+_STYLE_WRAPPERS = LRUCache(maxsize=_MAX_STYLES)
+
+# the (style, StyleWrapper) of the styles seen recently, keyed by the identity of the style
+_STYLE_WRAPPERS_BY_IDENTITY = {}
+_MAX_STYLES_BY_IDENTITY = 4096
+
+# ids are never reused, so that they stay unique after the registry is cleared
+_STYLE_IDS = count()
+
+# whether the style of each style_id is a default style, see `StyleRegistry.is_default`
+_DEFAULT_STYLES = LRUCache(maxsize=_MAX_STYLES)
+
+
+def _labels_signature(labels):
+    """
+    Return a hashable key of an array of labels. Labels of object arrays are keyed with their type, so that labels that compare equal but are rendered differently (eg. 1, 1.0 and True) have different keys
+    """
+    labels = np.asarray(labels)
+    if labels.dtype.kind == "O":
+        return tuple((type(v), v) for v in labels.tolist())
+    return (labels.dtype.str, labels.shape, labels.tobytes())
 
 
 class IndexNode:
@@ -130,6 +198,36 @@ class IndexNode:
             IndexNode._apply_by_post_pre(f, new_root, order)
         return new_root
 
+    @staticmethod
+    def apply_by_level(f, root):
+        """
+        Level-wise alternative to `apply`, `f` is called once for each level of the tree rather than once for each node.
+
+        Args:
+            f: func that takes the level (0 for the outermost level), an object array of the values and a list of the keys of the nodes at that level, and returns a sequence with one item for each node, that is set as the data of the node
+            root: root of the hierarchical columns/index
+        """
+        new_root = IndexNode.deep_clone(root)
+        levels = defaultdict(list)
+        for node in IndexNode.level_order(new_root):
+            levels[len(node.key) - 1].append(node)
+
+        for level, nodes in sorted(levels.items()):
+            values = np.empty(len(nodes), dtype=object)
+            for ix, node in enumerate(nodes):
+                # assigned one at a time, since labels can be tuples
+                values[ix] = node.value
+            results = f(level, values, [node.key for node in nodes])
+            if len(results) != len(nodes):
+                raise ValueError(
+                    "Expected {} values for level {}, got {}.".format(
+                        len(nodes), level, len(results)
+                    )
+                )
+            for node, result in zip(nodes, results):
+                node.data = result
+        return new_root
+
     @staticmethod
     def index_to_index_node(index):
         """
@@ -146,7 +244,7 @@ class IndexNode:
         # handle frames without an index but only columns
         if len(index) == 0:
             return root
-        if not isinstance(index._index, pd.MultiIndex):
+        if not index.is_hierarchical:
             # not an multi-index
             root.add_children(
                 IndexNode(value=i, parent=root, key=(i,)) for i in index.values
@@ -161,6 +259,25 @@ class IndexNode:
         IndexNode.set_index(root)
         return root
 
+    @staticmethod
+    def cached_index_to_index_node(index):
+        """
+        Same as `index_to_index_node`, but the tree is shared by all indices with the same labels. The returned tree must not be modified, `IndexNode.apply` clones the tree before applying the func
+
+        Args:
+            index: usually df.columns, can all support df.index
+        """
+        if not isinstance(index, InternalIndex):
+            index = InternalIndex(index)
+        key = index.signature() if len(index) <= _MAX_CACHED_SIZE else None
+        if key is None:
+            return IndexNode.index_to_index_node(index)
+        root = _INDEX_TREE_CACHE.get(key)
+        if root is None:
+            root = IndexNode.index_to_index_node(index)
+            _INDEX_TREE_CACHE[key] = root
+        return root
+
     @staticmethod
     def _build_tree(index, indices, level=0):
         """
@@ -272,6 +389,65 @@ class IndexNode:
 
         return IndexNode.apply(_resolve_loc, tree, order="level")
 
+    @staticmethod
+    def level_order(root):
+        """
+        Return the nodes of the tree in the order used by `apply` with order='level'
+        """
+        nodes = []
+        q = deque(root.children if not root.parent else [root])
+        while q:
+            n = q.popleft()
+            nodes.append(n)
+            q.extend(n.children)
+        return nodes
+
+    @staticmethod
+    def cached_resolve_loc(tree, offsets, widths, vertical=False):
+        """
+        Same as `resolve_loc`, or `resolve_loc_vertical` if vertical is True, but the offsets of the nodes are memoized by the keys of the nodes, the offsets and the widths (the row heights if vertical). The offsets only depend on the shape of the tree, so the trees of different presentation models with the same index share the cached offsets.
+
+        Args:
+            widths: the col_widths of `resolve_loc`, or the row_hts of `resolve_loc_vertical`
+        """
+        key, node_offsets = None, None
+        # the offsets of trees with more than `_MAX_CACHED_SIZE` leaves are not cached
+        if len(widths) <= _MAX_CACHED_SIZE:
+            try:
+                key = (
+                    vertical,
+                    tuple(offsets),
+                    tuple(n.key for n in IndexNode.level_order(tree)),
+                    tuple(widths.items()),
+                )
+                node_offsets = _RESOLVED_LOC_CACHE.get(key)
+            except TypeError:
+                # unhashable labels are not cached
+                key = None
+
+        if node_offsets is None:
+            if vertical:
+                loc_tree = IndexNode.resolve_loc_vertical(tree, offsets, widths)
+            else:
+                loc_tree = IndexNode.resolve_loc(tree, offsets, widths)
+            if key is not None:
+                _RESOLVED_LOC_CACHE[key] = tuple(
+                    n.data for n in IndexNode.level_order(loc_tree)
+                )
+            return loc_tree
+
+        node_offsets = iter(node_offsets)
+        return IndexNode.apply(lambda node: next(node_offsets), tree, order="level")
+
+    @staticmethod
+    def cache_clear():
+        """
+        Clear the caches of index trees, resolved offsets and nested layouts
+        """
+        _INDEX_TREE_CACHE.clear()
+        _RESOLVED_LOC_CACHE.clear()
+        _NESTED_LAYOUT_CACHE.clear()
+
     @staticmethod
     def gather_data(*trees):
         """
@@ -300,12 +476,92 @@ class StyleWrapper(tp.NamedTuple):
         str,
         tp.Union[
             str,
-            Border,
-            Alignment,
-            Font,
-            PatternFill,
+            "Border",
+            "Alignment",
+            "Font",
+            "PatternFill",
         ],
     ]
+    style_id: tp.Optional[int] = None
+
+
+def _style_key(style):
+    """
+    Return the key that identifies equal styles, or None if the style is not hashable. Dicts are keyed by their sorted items, so that the order of the keys does not matter
+    """
+    if isinstance(style, dict):
+        key = (dict, tuple(sorted(style.items(), key=lambda item: item[0])))
+    else:
+        key = (type(style), style)
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+class StyleRegistry:
+    """
+    Registry that interns the styles returned by the style funcs, so that equal styles share one StyleWrapper with an integer `style_id`. The ids are shared by all models of a render, and the writers use them to convert each style to their native format once.
+
+    The registry holds the `_MAX_STYLES` styles registered most recently, older styles are evicted. Ids are never reused, so a style that is registered again after it was evicted gets a new id, which is still unique, and equal styles with different ids are only converted once more by the writers.
+
+    The wrappers hold a copy of dict styles, so a style dict that is changed after it is registered is registered again with its new items, and does not change the styles registered before. The values in the dict (for example an openpyxl Font) are not copied and should not be mutated. Styles that are not hashable (for example dicts with list values) are not compared by value, they get an id for each distinct style object.
+    """
+
+    @staticmethod
+    def wrap(style):
+        """
+        Return the interned StyleWrapper of the style
+        """
+        # the entries reference the style, so its id can not have been reused,
+        # and the copy in the wrapper tells whether a dict was changed since
+        entry = _STYLE_WRAPPERS_BY_IDENTITY.get(id(style))
+        if entry is not None and entry[1].user_style == style:
+            return entry[1]
+
+        key = _style_key(style)
+        wrapper = _STYLE_WRAPPERS.get(key) if key is not None else None
+        if wrapper is None:
+            user_style = dict(style) if isinstance(style, dict) else style
+            wrapper = StyleWrapper(user_style=user_style, style_id=next(_STYLE_IDS))
+            if key is not None:
+                _STYLE_WRAPPERS[key] = wrapper
+
+        if len(_STYLE_WRAPPERS_BY_IDENTITY) >= _MAX_STYLES_BY_IDENTITY:
+            _STYLE_WRAPPERS_BY_IDENTITY.clear()
+        _STYLE_WRAPPERS_BY_IDENTITY[id(style)] = (style, wrapper)
+        return wrapper
+
+    @staticmethod
+    def style_id(style_wrapper):
+        """
+        Return the id of the style of the StyleWrapper, the style is registered if the wrapper was not built by the registry
+        """
+        if style_wrapper.style_id is not None:
+            return style_wrapper.style_id
+        return StyleRegistry.wrap(style_wrapper.user_style).style_id
+
+    @staticmethod
+    def is_default(style_wrapper):
+        """
+        Return True if the style of the StyleWrapper leaves a cell as it looks by default, that is each of its values is None, an empty string, the 'General' number format or equal to a default constructed object of its type (for example the `PatternFill()` and `Border()` of `OpenPyxlStyleHelper.get_style()`). The result is computed once for each style_id
+        """
+        style_id = StyleRegistry.style_id(style_wrapper)
+        default = _DEFAULT_STYLES.get(style_id)
+        if default is None:
+            style = style_wrapper.user_style
+            default = _DEFAULT_STYLES[style_id] = style is None or (
+                isinstance(style, dict)
+                and all(_is_default_style_value(v) for v in style.values())
+            )
+        return default
+
+    @staticmethod
+    def clear():
+        _STYLE_WRAPPERS.clear()
+        _STYLE_WRAPPERS_BY_IDENTITY.clear()
+        _DEFAULT_STYLES.clear()
 
 
 class Locs(tp.NamedTuple):
@@ -340,58 +596,182 @@ class PresentationAndLoc(tp.NamedTuple):
     locs: LocOffsets
 
 
+class _NestedLayout(tp.NamedTuple):
+    """
+    Layout of a nested presentation model, resolved at the origin, and its width and height
+    """
+
+    locs: Locs
+    width: int
+    height: int
+
+
 class InternalFrame:
+    """
+    Wraps a pandas DataFrame or a static-frame Frame. Static-frame containers are used natively, that is, their immutable arrays are read without converting the frame to pandas.
+    """
+
     def __init__(self, frame):
+        if isinstance(frame, InternalFrame):
+            frame = frame._frame
+        if is_arrow_like(frame):
+            frame = ArrowFrame(frame)
         self._frame = frame
         self.index = InternalIndex(self._frame.index)
         self.columns = InternalIndex(self._frame.columns)
 
+    @property
+    def is_static_frame(self):
+        return _is_static_frame(self._frame, "Frame")
+
+    def column_values(self, position, box=False):
+        """
+        Return the values of the column at `position` as an array, without copying.
+
+        Args:
+            box: if True, values of pandas columns that are not stored in a numpy array of simple types (eg. datetime64 or categorical columns) are returned as an object array of the values `df.loc` would return, for example pd.Timestamp
+        """
+        if isinstance(self._frame, ArrowFrame):
+            return self._frame.column_values(position)
+
+        column = self._frame.iloc[:, position]
+        values = column.values
+        if (
+            box
+            and isinstance(self._frame, pd.DataFrame)
+            and (not isinstance(values, np.ndarray) or values.dtype.kind in "mM")
+        ):
+            return column.astype(object).values
+        return values
+
     def copy(self):
         if hasattr(self._frame, "copy"):
             return self._frame.copy()
         # for SF we get this for free
-        if isinstance(self._frame, sf.FrameGO):
+        if _is_static_frame(self._frame, "FrameGO"):
             return self._frame.to_frame()
         return self._frame
 
+    def from_values(self, values):
+        """
+        Return a frame of the same type as the wrapped frame, with the same index and columns and the 2D `values` array as data.
+        """
+        if isinstance(self._frame, pd.DataFrame):
+            return pd.DataFrame(
+                values, index=self._frame.index, columns=self._frame.columns
+            )
+        # static-frame indices are immutable, so the arrays are shared
+        return _static_frame().Frame(
+            values, index=self._frame.index, columns=self._frame.columns
+        )
+
 
 class InternalIndex:
+    """
+    Wraps a pandas Index or a static-frame Index and provides the attributes needed to build the `IndexNode` trees. For static-frame, the codes and levels of an `IndexHierarchy` are read from its depth arrays.
+    """
+
     def __init__(self, index):
+        if isinstance(index, InternalIndex):
+            index = index._index
         self._index = index
-        if isinstance(
-            self._index,
-            (
-                sf.IndexHierarchy,
-                sf.IndexGO,
-                sf.Index,
-            ),
-        ):
-            self._index = index.to_pandas()
+        self._pandas_index = None
+
+    @property
+    def is_static_frame(self):
+        return _is_static_frame(self._index, "Index", "IndexHierarchy")
+
+    @property
+    def is_hierarchical(self):
+        return isinstance(self._index, pd.MultiIndex) or _is_static_frame(
+            self._index, "IndexHierarchy"
+        )
+
+    @property
+    def depth(self):
+        if self.is_static_frame:
+            return self._index.depth
+        return self._index.nlevels
 
     @property
     def codes(self):
         if isinstance(self._index, pd.MultiIndex):
             return self._index.codes
+        if _is_static_frame(self._index, "IndexHierarchy"):
+            return [self._index.indexer_at_depth(d) for d in range(self.depth)]
         raise NotImplementedError()
 
+    @property
+    def is_unique(self):
+        """
+        True if the labels are unique. Pandas caches this on the index, static-frame indices are unique by construction
+        """
+        if self.is_static_frame:
+            return True
+        return self._index.is_unique
+
     @property
     def name(self):
         return self._index.name
 
     @property
     def values(self):
+        """
+        The labels of the index, where labels of hierarchical indices are tuples
+        """
+        if _is_static_frame(self._index, "IndexHierarchy"):
+            return self._index.flat().values
         return self._index.values
 
     @property
     def levels(self):
+        if _is_static_frame(self._index, "IndexHierarchy"):
+            return [self._index.index_at_depth(d).values for d in range(self.depth)]
         return self._index.levels
 
+    def to_pandas(self):
+        """
+        Return the index as a pandas Index. Static-frame indices are only converted once, and only when a pandas frame has to be built
+        """
+        if not self.is_static_frame:
+            return self._index
+        if self._pandas_index is None:
+            self._pandas_index = self._index.to_pandas()
+        return self._pandas_index
+
     def __len__(self):
         return len(self._index)
 
     def __iter__(self):
         return iter(self._index)
 
+    def signature(self):
+        """
+        Return a hashable key of the labels of the index, indices with the same key build the same `IndexNode` tree. None if the labels can not be hashed
+        """
+        try:
+            if self.is_hierarchical:
+                return (
+                    self.is_static_frame,
+                    tuple(_labels_signature(level) for level in self.levels),
+                    tuple(_labels_signature(codes) for codes in self.codes),
+                )
+            return (self.is_static_frame, _labels_signature(self.values))
+        except TypeError:
+            return None
+
+    def equals(self, other):
+        """
+        True if the labels of both indices are equal, the indices can be of different types
+        """
+        other = other if isinstance(other, InternalIndex) else InternalIndex(other)
+        if self.is_static_frame == other.is_static_frame:
+            return self._index.equals(other._index)
+        return self.to_pandas().equals(other.to_pandas())
+
+    def __str__(self):
+        return str(self._index)
+
 
 def default_offsets(start_row: int, start_col: int) -> LocOffsets:
     return LocOffsets(
@@ -419,10 +799,189 @@ def get_presentation_model_max_cols(presentation_model_and_loc):
     )
 
 
+def _is_default_style_value(value):
+    if value is None or value == "" or value == "General":
+        return True
+    try:
+        return bool(value == type(value)())
+    except (TypeError, ValueError):
+        return False
+
+
+def _is_empty(value):
+    return value is None or value == "" or bool(pd.isna(value))
+
+
+def _empty_mask(column):
+    """
+    Return a bool array, True for the values of the column that are None, NaN, NaT or empty strings. The mask of a `pd.SparseDtype` column is built from its non-fill values
+    """
+    if isinstance(column, pd.arrays.SparseArray):
+        mask = np.full(len(column), _is_empty(column.fill_value))
+        mask[column.sp_index.indices] = _empty_mask(column.sp_values)
+        return mask
+    mask = np.asarray(pd.isna(column))
+    if column.dtype.kind in "OU":
+        mask |= np.asarray(column == "", dtype=bool)
+    return mask
+
+
+class _SparseColumnValues:
+    """
+    The values of a `pd.SparseDtype` column, read from the positions and values of its non-fill elements so that the column is not densified. Indexed by row like the arrays returned by `_data_value_columns`
+    """
+
+    def __init__(self, values, convert):
+        sp_values = values.sp_values
+        fill_value = values.fill_value
+        if sp_values.dtype.kind in "mM":
+            sp_values = pd.Series(sp_values).astype(object).values
+        elif convert and sp_values.dtype.kind in BULK_CONVERTIBLE_KINDS:
+            sp_values = array_type_to_str(sp_values)
+            fill_value = df_type_to_str(fill_value)
+        self._fill_value = fill_value
+        self._values = dict(zip(values.sp_index.indices.tolist(), sp_values))
+
+    def __getitem__(self, ix):
+        return self._values.get(ix, self._fill_value)
+
+
+class _ChunkedColumnValues:
+    """
+    The values of a column with a bool, numeric or string dtype, converted with `array_type_to_str` `_CONVERT_CHUNK_ROWS` rows at a time as they are read, so that the python objects of only one chunk of the column are held at a time. Indexed by row like the arrays returned by `_data_value_columns`, rows are best read in order
+    """
+
+    def __init__(self, values):
+        self._values = values
+        self._start = self._stop = 0
+        self._chunk = None
+
+    def __getitem__(self, ix):
+        if not self._start <= ix < self._stop:
+            self._start = ix - ix % _CONVERT_CHUNK_ROWS
+            self._stop = self._start + _CONVERT_CHUNK_ROWS
+            self._chunk = array_type_to_str(self._values[self._start : self._stop])
+        return self._chunk[ix - self._start]
+
+
+def _data_value_columns(values_df, convert):
+    """
+    Return the values of the data view as a list of column arrays. If `convert` is True, then columns with a bool, numeric or string dtype are converted in bulk using `array_type_to_str`, one chunk of rows at a time (see `_ChunkedColumnValues`), the remaining values are left to the writers to convert. Columns with a `pd.SparseDtype` are returned as `_SparseColumnValues`.
+    """
+    values_df = InternalFrame(values_df)
+    columns = []
+    for j in range(len(values_df.columns)):
+        column = values_df.column_values(j)
+        if isinstance(column, pd.arrays.SparseArray):
+            columns.append(_SparseColumnValues(column, convert))
+            continue
+        column = values_df.column_values(j, box=True)
+        if convert and column.dtype.kind in BULK_CONVERTIBLE_KINDS:
+            column = _ChunkedColumnValues(column)
+        columns.append(column)
+    return columns
+
+
+def _data_cell_positions(presentation_model):
+    """
+    Return the (row, col) positions of the data cells of the model that are written, in row-major order. All cells are written, unless the model was built with `sparse=True`, in which case cells with an empty value (see `_empty_mask`, the values are checked before they are converted) and a default style (see `StyleRegistry.is_default`) or the default data style of the engine the model was built for are skipped. The mask is built one column at a time, and the styles are checked once for each distinct style of the column.
+    """
+    style_array = presentation_model.data.style.values
+    n_rows, n_cols = style_array.shape
+    if not presentation_model.kwargs.get("sparse"):
+        return ((ix, j) for ix in range(n_rows) for j in range(n_cols))
+
+    values_df = InternalFrame(presentation_model.data.values)
+    column_styles = presentation_model.kwargs.get("column_styles")
+    engine_default_style = presentation_model.kwargs.get("engine_default_style")
+
+    def is_default(style_wrapper):
+        return StyleRegistry.is_default(style_wrapper) or (
+            engine_default_style is not None
+            and style_wrapper.user_style == engine_default_style
+        )
+
+    skip = np.zeros((n_rows, n_cols), dtype=bool)
+    for j in range(n_cols):
+        empty = _empty_mask(values_df.column_values(j))
+        if not empty.any():
+            continue
+        if column_styles:
+            if is_default(column_styles[j]):
+                skip[:, j] = empty
+            continue
+        styles = style_array[:, j]
+        identities = np.fromiter(map(id, styles), dtype=np.int64, count=n_rows)
+        _, first, inverse = np.unique(
+            identities, return_index=True, return_inverse=True
+        )
+        default = np.array([is_default(styles[i]) for i in first])
+        skip[:, j] = empty & default[inverse.reshape(-1)]
+    return zip(*(positions.tolist() for positions in np.nonzero(~skip)))
+
+
+def _nested_models(df_view):
+    """
+    Return a dict of {(row, col): PresentationModel} for the cells of the data view that hold nested presentation models
+    """
+    nested = {}
+    positions = range(len(df_view.columns))
+    if isinstance(df_view._frame, pd.DataFrame):
+        # the dtypes are checked first, since reading a column is slow
+        positions = np.flatnonzero(df_view._frame.dtypes.values == object)
+    for j in positions:
+        values = df_view.column_values(j)
+        # only object arrays can hold nested presentation models
+        if values.dtype != object:
+            continue
+        for ix, v in enumerate(values):
+            if isinstance(v, PresentationModel):
+                nested[(ix, j)] = v
+    return nested
+
+
+def _nested_layout(presentation_model, nesting_level):
+    """
+    Return the `_NestedLayout` of a nested presentation model that does not hold nested models itself. The layout only depends on the shape of the model, that is its index, columns and hide flags, so it is resolved once per shape and translated to the location of each model. None if the model holds nested models, has more than `_MAX_CACHED_SIZE` cells or its labels can not be hashed
+    """
+    df_view = InternalFrame(presentation_model.data.values)
+    if len(df_view.index) * len(df_view.columns) > _MAX_CACHED_SIZE:
+        return None
+    if _nested_models(df_view):
+        return None
+    index_signature = df_view.index.signature()
+    columns_signature = df_view.columns.signature()
+    if index_signature is None or columns_signature is None:
+        return None
+
+    hide_index = presentation_model.kwargs["hide_index"]
+    hide_header = presentation_model.kwargs["hide_header"]
+    key = (index_signature, columns_signature, hide_index, hide_header, nesting_level)
+    layout = _NESTED_LAYOUT_CACHE.get(key)
+    if layout is None:
+        locs = PresentationLayoutManager.resolve_loc(
+            presentation_model, nesting_level=nesting_level
+        ).locs
+        layout = _NestedLayout(
+            locs=locs,
+            width=PresentationLayoutManager.width(df_view, hide_index),
+            height=PresentationLayoutManager.height(df_view, hide_header),
+        )
+        _NESTED_LAYOUT_CACHE[key] = layout
+    return layout
+
+
 def to_row_col_dict(
-    presentation_and_loc, row_col_dict=None, nesting_level=0, nested=False
+    presentation_and_loc,
+    row_col_dict=None,
+    nesting_level=0,
+    nested=False,
+    convert=False,
 ):
-    """ """
+    """
+    Args:
+        convert: if True, data values with a bool, numeric or string dtype are converted to simple python types in bulk, see `util.array_type_to_str`
+    """
     presentation_model = presentation_and_loc.model
     locs = presentation_and_loc.locs
 
@@ -464,30 +1023,29 @@ def to_row_col_dict(
         row_col_dict.update(data)
 
     data_locs_array = data_locs.values
-    pm_data_value_array = presentation_model.data.values.values
+    pm_data_value_columns = _data_value_columns(presentation_model.data.values, convert)
     pm_data_style_array = presentation_model.data.style.values
-    for ix, _ in enumerate(presentation_model.data.values.index):
-        for j, _ in enumerate(presentation_model.data.values.columns):
-            offsets = data_locs_array[ix, j]
-            if isinstance(offsets, PresentationAndLoc):
-                inner_view_and_locs = data_locs_array[ix, j]
-                if nested:
-                    row_col_dict[offsets] = to_row_col_dict(
-                        inner_view_and_locs, None, nesting_level, nested
-                    )
-                else:
-                    row_col_dict.update(
-                        to_row_col_dict(
-                            inner_view_and_locs, None, nesting_level, nested
-                        )
-                    )
+    for ix, j in _data_cell_positions(presentation_model):
+        offsets = data_locs_array[ix, j]
+        if isinstance(offsets, PresentationAndLoc):
+            inner_view_and_locs = data_locs_array[ix, j]
+            if nested:
+                row_col_dict[offsets] = to_row_col_dict(
+                    inner_view_and_locs, None, nesting_level, nested, convert
+                )
             else:
-                loc_offsets = LocOffsets(*offsets)
-                value = pm_data_value_array[ix, j]
-                style = pm_data_style_array[ix, j]
-                row_col_dict[loc_offsets] = ValueAndStyleAttributes(
-                    value, style, nesting_level
+                row_col_dict.update(
+                    to_row_col_dict(
+                        inner_view_and_locs, None, nesting_level, nested, convert
+                    )
                 )
+        else:
+            loc_offsets = LocOffsets(*offsets)
+            value = pm_data_value_columns[j][ix]
+            style = pm_data_style_array[ix, j]
+            row_col_dict[loc_offsets] = ValueAndStyleAttributes(
+                value, style, nesting_level
+            )
 
     return row_col_dict
 
@@ -510,28 +1068,60 @@ class PresentationLayoutManager:
                 return df.copy()
             return df
 
-        df_new = pd.DataFrame(index=df.index._index, columns=df.columns._index)
-        index_length = len(df_new.index)
-        for c in df_new.columns.values:
-            a = np.empty(index_length, dtype=object)
-            for ix, i in enumerate(df_new.index.values):
-                a[ix] = f(i, c)
-            df_new.loc[:, c] = a
-        return df_new
+        # the cell level view is always a pandas frame, so that clients
+        # can update cells, for example to nest presentation models
+        index_labels = df.index.values
+        column_labels = df.columns.values
+        values = np.empty([len(index_labels), len(column_labels)], dtype=object)
+        for j, c in enumerate(column_labels):
+            for ix, i in enumerate(index_labels):
+                values[ix, j] = f(i, c)
+        return pd.DataFrame(
+            values, index=df.index.to_pandas(), columns=df.columns.to_pandas()
+        )
 
     @staticmethod
     def apply_at_column_level(f, df):
         if not isinstance(df, InternalFrame):
             df = InternalFrame(df)
 
-        new_df = pd.DataFrame(index=df.index._index, columns=df.columns._index)
-        index_length = len(df.index)
-        for c in df.columns.values:
-            a = np.empty(index_length, dtype=object)
+        column_labels = df.columns.values
+        values = np.empty([len(df.index), len(column_labels)], dtype=object)
+        for j, c in enumerate(column_labels):
             column_level_value = f(c)
-            a.fill(column_level_value)
-            new_df.loc[:, c] = a
-        return new_df
+            # fill each element with the same object
+            values[:, j].fill(column_level_value)
+        return df.from_values(values)
+
+    @staticmethod
+    def apply_by_column(f, df):
+        """
+        Args:
+            f: func that takes a column label and returns a sequence of values, one for each row in the index
+            df: the frame whose index and columns are used to build the view
+        """
+        if not isinstance(df, InternalFrame):
+            df = InternalFrame(df)
+
+        index_length = len(df.index)
+        columns = df.columns.values
+        values = np.empty([index_length, len(columns)], dtype=object)
+        for j, c in enumerate(columns):
+            column_values = f(c)
+            if len(column_values) != index_length:
+                raise ValueError(
+                    "Expected {} values for column {!r}, got {}.".format(
+                        index_length, c, len(column_values)
+                    )
+                )
+            if isinstance(column_values, np.ndarray):
+                values[:, j] = column_values
+            else:
+                # element-wise assignment, since numpy would otherwise
+                # unpack sequence values (eg. tuples) into a new dimension
+                for ix, v in enumerate(column_values):
+                    values[ix, j] = v
+        return df.from_values(values)
 
     @staticmethod
     def resolve_loc(
@@ -540,19 +1130,29 @@ class PresentationLayoutManager:
         """
         Return a DF View with cell populated with ((r,c),(r,c)) range.
         """
+        if isinstance(presentation_model, PresentationAndLoc):
+            # already resolved, for example by `refresh_presentation_model`
+            if tuple(offsets) == (0, 0, 0, 0):
+                return presentation_model
+            return PresentationLayoutManager.shift_loc(
+                presentation_model, rows=offsets[0], cols=offsets[1]
+            )
 
-        df_view = presentation_model.data.values
+        df_view = InternalFrame(presentation_model.data.values)
         header = presentation_model.header
         index_label = presentation_model.index_label
 
-        col_widths = PresentationLayoutManager.widths(presentation_model.data.values)
-        row_hts = PresentationLayoutManager.heights(presentation_model.data.values)
-        header_length = (
-            1 if not hasattr(df_view.columns, "levels") else len(df_view.columns.levels)
-        )
-        index_length = (
-            1 if not hasattr(df_view.index, "levels") else len(df_view.index.levels)
-        )
+        nested = _nested_models(df_view)
+        # the layouts of the distinct nested models, None for models that hold
+        # nested models themselves, these are resolved at their location
+        nested_layouts = {}
+        for v in nested.values():
+            if id(v) not in nested_layouts:
+                nested_layouts[id(v)] = _nested_layout(v, nesting_level + 1)
+        col_widths = PresentationLayoutManager.widths(df_view, nested, nested_layouts)
+        row_hts = PresentationLayoutManager.heights(df_view, nested, nested_layouts)
+        header_length = df_view.columns.depth
+        index_length = df_view.index.depth
 
         if presentation_model.kwargs["hide_index"]:
             index_length = 0
@@ -574,7 +1174,7 @@ class PresentationLayoutManager:
             header_offsets = tuple(
                 x + index_length if i % 2 != 0 else x for i, x in enumerate(offsets)
             )
-            header_loc = IndexNode.resolve_loc(
+            header_loc = IndexNode.cached_resolve_loc(
                 header.values, header_offsets, col_widths
             )
 
@@ -584,8 +1184,8 @@ class PresentationLayoutManager:
             index_offsets = tuple(
                 x + header_length if i % 2 == 0 else x for i, x in enumerate(offsets)
             )
-            index_loc = IndexNode.resolve_loc_vertical(
-                index_label.values, index_offsets, row_hts
+            index_loc = IndexNode.cached_resolve_loc(
+                index_label.values, index_offsets, row_hts, vertical=True
             )
 
         # handle the df
@@ -595,33 +1195,41 @@ class PresentationLayoutManager:
         )
 
         start_row, start_col, end_row, end_col = df_offsets
-        df = pd.DataFrame(index=df_view.index, columns=df_view.columns)
-        df_view_array = df_view.values
-        all_offsets = np.empty(
-            [len(df.index.values), len(df.columns.values)], dtype=object
-        )
-        for ix, i in enumerate(df.index.values):
+        index_labels = df_view.index.values
+        column_labels = df_view.columns.values
+        all_offsets = np.empty([len(index_labels), len(column_labels)], dtype=object)
+        for ix, i in enumerate(index_labels):
             end_col, start_col = df_offsets[1], df_offsets[1]
-            for j, c in enumerate(df.columns.values):
+            for j, c in enumerate(column_labels):
                 end_row = start_row + row_hts[i] - 1
                 end_col = start_col + col_widths[c] - 1
                 all_offsets[ix, j] = (start_row, start_col, end_row, end_col)
-                if isinstance(df_view_array[ix, j], PresentationModel):
-                    inner_df = PresentationLayoutManager.resolve_loc(
-                        df_view_array[ix, j],
-                        (start_row, start_col, start_row, start_col),
-                        nesting_level + 1,
-                    )
+                if (ix, j) in nested:
+                    inner_model = nested[(ix, j)]
+                    inner_layout = nested_layouts[id(inner_model)]
+                    if inner_layout is None:
+                        inner_df = PresentationLayoutManager.resolve_loc(
+                            inner_model,
+                            (start_row, start_col, start_row, start_col),
+                            nesting_level + 1,
+                        )
+                    else:
+                        inner_df = PresentationLayoutManager.shift_loc(
+                            PresentationAndLoc(
+                                model=inner_model, locs=inner_layout.locs
+                            ),
+                            rows=start_row,
+                            cols=start_col,
+                        )
                     all_offsets[ix, j] = inner_df
                     # assert all_offsets[ix, j] == inner_df
                 start_col = end_col + 1
             start_row = end_row + 1
-        df.loc[:, df.columns.values] = all_offsets
 
         locs = Locs(
             header_loc=header_loc,
             index_loc=index_loc,
-            data_loc=df,
+            data_loc=df_view.from_values(all_offsets),
             index_name_loc=index_name_loc,
             nesting_level=nesting_level,
         )
@@ -653,12 +1261,12 @@ class PresentationLayoutManager:
                 for i, x in enumerate(presentation_and_loc.locs.index_name_loc)
             )
 
-        data_loc = presentation_and_loc.locs.data_loc
-        data_loc_array = data_loc.values
-        df = pd.DataFrame(index=data_loc.index, columns=data_loc.columns)
-        new_locs = np.empty([len(df.index), len(df.columns)], dtype=object)
-        for ix, _ in enumerate(df.index.values):
-            for j, _ in enumerate(df.columns.values):
+        data_loc = InternalFrame(presentation_and_loc.locs.data_loc)
+        # data locations are always pandas or static-frame frames
+        data_loc_array = data_loc._frame.values
+        new_locs = np.empty(data_loc_array.shape, dtype=object)
+        for ix in range(data_loc_array.shape[0]):
+            for j in range(data_loc_array.shape[1]):
                 try:
                     # usually we are only dealing with non-nested
                     # data frames, If we fail due to Type
@@ -679,14 +1287,13 @@ class PresentationLayoutManager:
                         inner_view_and_loc, rows, cols
                     )
                     new_locs[ix, j] = x
-        df.loc[:, df.columns.values] = new_locs
         # print('Done shifting')
         return PresentationAndLoc(
             model=presentation_and_loc.model,
             locs=Locs(
                 header_loc=new_header_loc,
                 index_loc=new_index_loc,
-                data_loc=df,
+                data_loc=data_loc.from_values(new_locs),
                 index_name_loc=new_index_name_loc,
                 nesting_level=presentation_and_loc.locs.nesting_level,
             ),
@@ -695,52 +1302,71 @@ class PresentationLayoutManager:
         # new_index_name_loc)
 
     @staticmethod
-    def widths(df_view):
-        col_widths = {}
-        for col in df_view.columns:
-            s = df_view[col]
-            max_width = 1
-            for v in s.values:
-                if isinstance(v, PresentationModel):
-                    inner_width = PresentationLayoutManager.width(
-                        v.data.values, v.kwargs["hide_index"]
-                    )
-                    max_width = max(max_width, inner_width)
-            col_widths[col] = max_width
+    def widths(df_view, nested=None, nested_layouts=None):
+        """
+        Args:
+            nested: dict of nested presentation models in `df_view`, as returned by `_nested_models`. Computed if not provided
+            nested_layouts: dict of the `_NestedLayout` of nested models by their id, the width of the other models is computed
+        """
+        df_view = InternalFrame(df_view)
+        if nested is None:
+            nested = _nested_models(df_view)
+        nested_layouts = nested_layouts or {}
+        column_labels = df_view.columns.values
+        col_widths = {col: 1 for col in column_labels}
+        for (_, j), v in nested.items():
+            col = column_labels[j]
+            layout = nested_layouts.get(id(v))
+            if layout is not None:
+                inner_width = layout.width
+            else:
+                inner_width = PresentationLayoutManager.width(
+                    v.data.values, v.kwargs["hide_index"]
+                )
+            col_widths[col] = max(col_widths[col], inner_width)
         return col_widths
 
     @staticmethod
-    def heights(df_view):
-        row_hts = {}
-        for i, r in df_view.iterrows():
-            max_ht = 1
-            for v in r.values:
-                if isinstance(v, PresentationModel):
-                    inner_ht = PresentationLayoutManager.height(
-                        v.data.values, v.kwargs["hide_header"]
-                    )
-                    max_ht = max(max_ht, inner_ht)
-            row_hts[i] = max_ht
+    def heights(df_view, nested=None, nested_layouts=None):
+        """
+        Args:
+            nested: dict of nested presentation models in `df_view`, as returned by `_nested_models`. Computed if not provided
+            nested_layouts: dict of the `_NestedLayout` of nested models by their id, the height of the other models is computed
+        """
+        df_view = InternalFrame(df_view)
+        if nested is None:
+            nested = _nested_models(df_view)
+        nested_layouts = nested_layouts or {}
+        index_labels = df_view.index.values
+        row_hts = {i: 1 for i in index_labels}
+        for (ix, _), v in nested.items():
+            i = index_labels[ix]
+            layout = nested_layouts.get(id(v))
+            if layout is not None:
+                inner_ht = layout.height
+            else:
+                inner_ht = PresentationLayoutManager.height(
+                    v.data.values, v.kwargs["hide_header"]
+                )
+            row_hts[i] = max(row_hts[i], inner_ht)
         return row_hts
 
     @staticmethod
     def width(df_view, hide_index):
+        df_view = InternalFrame(df_view)
         widths = PresentationLayoutManager.widths(df_view)
         w = 0
         if not hide_index:
-            w = 1 if not hasattr(df_view.index, "levels") else len(df_view.index.levels)
+            w = df_view.index.depth
         return sum(w for w in widths.values()) + w
 
     @staticmethod
     def height(df_view, hide_header):
+        df_view = InternalFrame(df_view)
         heights = PresentationLayoutManager.heights(df_view)
         col_ht = 0
         if not hide_header:
-            col_ht = (
-                1
-                if not hasattr(df_view.columns, "levels")
-                else len(df_view.columns.levels)
-            )
+            col_ht = df_view.columns.depth
         return sum(w for w in heights.values()) + col_ht
 
 
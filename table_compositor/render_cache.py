@@ -0,0 +1,216 @@
+"""
+Module that supports caching rendered xlsx and html output, keyed by the content of the frames that the layout is built from.
+"""
+
+import hashlib
+import io
+import os
+import typing as tp
+from collections import OrderedDict
+
+import pandas as pd
+
+from table_compositor.html_writer import HTMLWriter
+
+_DEFAULT_MAX_ENTRIES = 128
+
+_SUFFIXES = (".xlsx", ".html")
+
+# writer arguments that do not change the rendered output, they are not part of the key
+_NON_DATA_KWARGS = frozenset(["instrument"])
+
+
+def hash_frame(df, hasher):
+    """
+    Update `hasher` with the content of the pandas DataFrame: its values, index, columns and dtypes
+    """
+    if not isinstance(df, pd.DataFrame):
+        raise ValueError(
+            "Only pandas DataFrames can be used as cache keys, got {}".format(type(df))
+        )
+    hasher.update(repr((df.shape, list(df.columns), list(df.dtypes))).encode())
+    hasher.update(repr(df.index.names).encode())
+    # the hash of each row combines the values and the index label
+    hasher.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+
+
+def _hash_frames(frames, hasher):
+    """
+    Update `hasher` with the nesting of the (nested) list of frames, and with each frame
+    """
+    if isinstance(frames, list):
+        hasher.update(b"[")
+        for f in frames:
+            _hash_frames(f, hasher)
+        hasher.update(b"]")
+    else:
+        hash_frame(frames, hasher)
+
+
+def _kwargs_key(kwargs):
+    """
+    Return the repr of the (name, value) pairs of the writer arguments that are part of the cache key, sorted by name. The arguments in `_NON_DATA_KWARGS` are left out.
+
+    Raises:
+        ValueError: if an argument is a callable, the repr of a callable holds its address, which differs for each call and process, so its effect on the output should be captured by the version instead
+    """
+    items = []
+    for name in sorted(kwargs):
+        if name in _NON_DATA_KWARGS:
+            continue
+        value = kwargs[name]
+        if callable(value):
+            raise ValueError(
+                "The writer argument {} is a callable, which can not be part of the cache key, use the version to tell its outputs apart".format(
+                    name
+                )
+            )
+        items.append((name, value))
+    return repr(items)
+
+
+class RenderCache:
+    """
+    Cache of rendered output, in memory (least recently used entries are evicted first) and optionally on disk (bounded by the total size of the files, least recently used files are evicted first).
+
+    The cache is keyed by the hash of the frames the layout is built from, the nesting of the layout, the writer and its arguments, and a version provided by the caller. The version should be changed whenever the callback functions used to build the presentation models change, since they are not part of the key. Writer arguments that do not change the output, such as `instrument`, are not part of the key either.
+
+    Args:
+        max_entries: the number of rendered outputs kept in memory
+        directory: if provided, rendered outputs are also stored as files in this directory, and can be shared between processes
+        max_bytes: the maximum total size of the files in `directory`
+
+    Example:
+        cache = RenderCache(directory='/tmp/reports')
+        xlsx_bytes = cache.to_xlsx(
+            OpenPyxlCompositor,
+            frames=[df],
+            layout_func=lambda frames: [build_presentation_model(df=frames[0])],
+            version='1',
+        )
+    """
+
+    def __init__(
+        self, max_entries=_DEFAULT_MAX_ENTRIES, directory=None, max_bytes=2**30
+    ):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(frames, writer, version, **kwargs):
+        """
+        Return the hex digest of the cache key
+
+        Raises:
+            ValueError: if a writer argument is a callable, see `_kwargs_key`
+        """
+        hasher = hashlib.blake2b(digest_size=20)
+        hasher.update(repr((writer, str(version), _kwargs_key(kwargs))).encode())
+        _hash_frames(frames, hasher)
+        return hasher.hexdigest()
+
+    def to_xlsx(self, compositor, *, frames, layout_func, version, **kwargs) -> bytes:
+        """
+        Return the xlsx file rendered by `compositor.to_xlsx` as bytes. The layout is only built, by calling `layout_func(frames)`, and written if the result is not cached.
+
+        Args:
+            compositor: OpenPyxlCompositor or XlsxWriterCompositor
+            frames: the (nested) list of pandas DataFrames the layout is built from
+            layout_func: func that takes `frames` and returns the layout
+            version: version of the callback functions used by `layout_func`
+            kwargs: passed to `compositor.to_xlsx`
+        """
+        key = self.key(frames, compositor.__name__, version, **kwargs)
+
+        def render():
+            output = io.BytesIO()
+            compositor.to_xlsx(layout=layout_func(frames), output_fp=output, **kwargs)
+            return output.getvalue()
+
+        return self._get_or_render(key, ".xlsx", render)
+
+    def to_html(self, *, frames, layout_func, version, **kwargs) -> str:
+        """
+        Return the html rendered by `HTMLWriter.to_html`. The layout is only built, by calling `layout_func(frames)`, and rendered if the result is not cached. See `to_xlsx` for the arguments, kwargs are passed to `HTMLWriter.to_html`
+        """
+        key = self.key(frames, HTMLWriter.__name__, version, **kwargs)
+        html = self._get_or_render(
+            key,
+            ".html",
+            lambda: HTMLWriter.to_html(layout_func(frames), **kwargs).encode("UTF-8"),
+        )
+        return html.decode("UTF-8")
+
+    def _get_or_render(self, key, suffix, render: tp.Callable[[], bytes]) -> bytes:
+        data = self._entries.get(key)
+        if data is not None:
+            self._entries.move_to_end(key)
+            return data
+
+        data = self._read(key + suffix)
+        if data is None:
+            data = render()
+            self._write(key + suffix, data)
+
+        self._entries[key] = data
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return data
+
+    def _read(self, name):
+        if not self.directory:
+            return None
+        path = os.path.join(self.directory, name)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        # the modification time orders the files for eviction
+        os.utime(path)
+        return data
+
+    def _write(self, name, data):
+        if not self.directory:
+            return
+        path = os.path.join(self.directory, name)
+        # write and rename, so that readers never see a partial file
+        tmp_path = "{}.{}.tmp".format(path, os.getpid())
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def _evict(self):
+        """
+        Remove the least recently used files until the directory fits in `max_bytes`
+        """
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith(_SUFFIXES):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                # removed by another process
+                pass
+            total -= size
+
+    def clear(self):
+        """
+        Remove all entries, in memory and on disk
+        """
+        self._entries.clear()
+        if self.directory:
+            for entry in os.scandir(self.directory):
+                if entry.is_file() and entry.name.endswith(_SUFFIXES):
+                    os.remove(entry.path)
@@ -0,0 +1,408 @@
+"""
+Module that supports rendering frames that do not fit in memory as one DataFrame. The frame is provided as an iterator of chunks with the same columns, for example `pd.read_csv(..., chunksize=...)` or the row groups of a parquet file, and the chunks are rendered one after the other as one continuous table, so that only one chunk is held in memory at a time.
+"""
+
+import contextlib
+import heapq
+
+import numpy as np
+
+from table_compositor.compiled_layout import CompiledLayout
+from table_compositor.html_writer import HTMLWriter
+from table_compositor.presentation_model import (
+    _INDEX_TREE_CACHE,
+    _RESOLVED_LOC_CACHE,
+    InternalFrame,
+    PresentationLayoutManager,
+    StyleRegistry,
+    _nested_models,
+    get_presentation_model_max_rows,
+)
+from table_compositor.table_compositor import build_presentation_model
+from table_compositor.util import instrument_stage
+from table_compositor.xlsx_writer import (
+    _DEFAULT_COLUMN_WIDTH,
+    XlsxWriterCompositor,
+    _XLSXCompositor,
+)
+
+
+def _positional_sizes(df_view, axis):
+    """
+    Return the heights of the rows (axis=0) or the widths of the columns (axis=1) of the data view by position, computed from the shapes of the nested models without calling any callback func
+    """
+    labels = df_view.index.values if axis == 0 else df_view.columns.values
+    nested = _nested_models(df_view)
+    if not nested:
+        return np.ones(len(labels), dtype=np.int64)
+    size_func = (
+        PresentationLayoutManager.heights
+        if axis == 0
+        else PresentationLayoutManager.widths
+    )
+    sizes = size_func(df_view, nested)
+    return np.array([sizes[label] for label in labels], dtype=np.int64)
+
+
+class _WorksheetStream:
+    """
+    The state of a worksheet that the chunks are written to by `StreamingCompositor.to_xlsx`, in `constant_memory` mode
+    """
+
+    def __init__(self, worksheet, get_format, column_width):
+        self.worksheet = worksheet
+        # the row the next chunk is resolved at
+        self.row = 0
+        self._get_format = get_format
+        self._column_width = column_width
+        self._column_formats = None
+        self._conditional_formats = []
+        self._last_row = 0
+
+    def write(self, presentation_and_loc, instrument=None):
+        """
+        Write the cells of a resolved chunk, the column formats and conditional formats are taken from the first chunk written to the worksheet
+        """
+        compiled_layout = CompiledLayout.from_presentation_and_loc(
+            presentation_and_loc, convert=True
+        )
+        with instrument_stage(
+            instrument, "xlsxwriter.write", cells=len(compiled_layout)
+        ):
+            if self._column_formats is None:
+                # the columns and their styles are the same for all chunks
+                self._column_formats = {
+                    col: self._get_format(style)
+                    for col, style in compiled_layout.column_styles.items()
+                    if not XlsxWriterCompositor._paints_blank_cells(style.user_style)
+                }
+                for col in compiled_layout.columns():
+                    col_letter = _XLSXCompositor._get_column_letter(col + 1)
+                    self.worksheet.set_column(
+                        col_letter + ":" + col_letter,
+                        self._column_width,
+                        self._column_formats.get(col, (None, None))[1],
+                    )
+                self._conditional_formats = compiled_layout.conditional_formats
+            self._write_rows(
+                compiled_layout,
+                [self._get_format(style) for style in compiled_layout.styles],
+            )
+        if len(compiled_layout):
+            self._last_row = max(self._last_row, int(compiled_layout.cells["r2"].max()))
+        self.row += get_presentation_model_max_rows(presentation_and_loc)
+
+    def _write_rows(self, compiled_layout, palette_formats):
+        """
+        Write the cells of the compiled layout, where rows are written in order and a row can not be written to once a later row has been. Merged ranges are registered without a format, so that `merge_range` does not write the blank cells of the following rows, and their formatted blank cells are written when each row is reached.
+        """
+        ws = self.worksheet
+        cells = compiled_layout.cells
+        order = np.lexsort((cells["c1"], cells["r1"]))
+        values = compiled_layout.values()
+        # (row, col, format) of the blank cells of the merged ranges
+        pending = []
+        for ix, r1, c1, r2, c2, position in zip(
+            order.tolist(),
+            cells["r1"][order].tolist(),
+            cells["c1"][order].tolist(),
+            cells["r2"][order].tolist(),
+            cells["c2"][order].tolist(),
+            cells["style_id"][order].tolist(),
+        ):
+            while pending and pending[0][0] <= r1:
+                row, col, cell_format = heapq.heappop(pending)
+                ws.write_blank(row, col, None, cell_format)
+
+            style_id, cell_format = palette_formats[position]
+            value = values[ix]
+            if r1 != r2 or c1 != c2:
+                ws.merge_range(r1, c1, r2, c2, value)
+                ws.write(r1, c1, value, cell_format)
+                for row in range(r1, r2 + 1):
+                    for col in range(c1, c2 + 1):
+                        if row == r1 and col != c1:
+                            ws.write_blank(row, col, None, cell_format)
+                        elif row != r1:
+                            heapq.heappush(pending, (row, col, cell_format))
+                continue
+
+            column_format = self._column_formats.get(c1)
+            # blank cells without a format are not written by XlsxWriter
+            if (
+                column_format is not None
+                and column_format[0] == style_id
+                and value != ""
+            ):
+                cell_format = None
+            ws.write(r1, c1, value, cell_format)
+
+        for row, col, cell_format in sorted(pending):
+            ws.write_blank(row, col, None, cell_format)
+
+    def close(self, workbook):
+        """
+        Add the conditional formats of the first chunk, extended to the data of all chunks written to the worksheet
+        """
+        XlsxWriterCompositor._add_conditional_formats(
+            self.worksheet,
+            workbook,
+            [
+                (rule, [(r1, c1, self._last_row, c2) for r1, c1, _, c2 in ranges])
+                for rule, ranges in self._conditional_formats
+            ],
+        )
+
+
+class StreamingCompositor:
+    """
+    Renders an iterator of frames with the same columns (chunks) as one table. The first chunk is rendered with the header (and index name), the following chunks with `hide_header=True`, each one below the previous one. The layout of the header is computed once, the index and data of each chunk are laid out, written and released before the next chunk is read, so that the peak memory is bounded by the size of a chunk rather than the size of the table.
+
+    The callback functions passed to `build_presentation_model` are called with the labels of the chunk being rendered, so callbacks that capture the frame in a closure need to look up the values in the current chunk (or only use the labels). Index groups of a hierarchical index are merged within a chunk, a group that is split across two chunks is rendered as two cells.
+
+    Example:
+        chunks = pd.read_csv('large.csv', chunksize=100000, index_col=0)
+        StreamingCompositor.to_xlsx(chunks=chunks, output_fp='large.xlsx', engine='xlsxwriter')
+    """
+
+    @staticmethod
+    def _checked_chunks(chunks):
+        """
+        Yield the (position, chunk) of each chunk, after checking that its columns are the columns of the first chunk
+        """
+        columns_signature = None
+        for position, df in enumerate(chunks):
+            signature = InternalFrame(df).columns.signature()
+            if position == 0:
+                columns_signature = signature
+            elif signature != columns_signature:
+                raise ValueError(
+                    "All chunks need to have the same columns, the columns of chunk {} differ from the columns of the first chunk".format(
+                        position
+                    )
+                )
+            yield position, df
+
+    @staticmethod
+    def _resolve_chunk(df, row, hide_header, cache, output_format, instrument, kwargs):
+        """
+        Return the presentation model of the chunk, resolved at `row`
+
+        Args:
+            cache: if False, the trees and offsets of the index are not cached, since the index of each chunk is laid out once. The first chunk caches the trees of the header
+        """
+        chunk_kwargs = dict(kwargs)
+        if hide_header:
+            chunk_kwargs["hide_header"] = True
+        with contextlib.ExitStack() as stack:
+            if not cache:
+                stack.enter_context(_INDEX_TREE_CACHE.frozen())
+                stack.enter_context(_RESOLVED_LOC_CACHE.frozen())
+            presentation_model = build_presentation_model(
+                df=df,
+                output_format=output_format,
+                instrument=instrument,
+                **chunk_kwargs
+            )
+            return PresentationLayoutManager.resolve_loc(
+                presentation_model, offsets=(row, 0, row, 0)
+            )
+
+    @staticmethod
+    def _column_groups(df, paginate, kwargs):
+        """
+        Return the positions of the columns rendered to each worksheet, more than one group only if the columns (and the index) do not fit in a worksheet and `paginate` is True. The widths are computed from the shape of the chunk, without calling any callback func
+        """
+        df_view = InternalFrame(df)
+        index_width = 0 if kwargs.get("hide_index") else df_view.index.depth
+        widths = _positional_sizes(df_view, axis=1)
+        available = XlsxWriterCompositor.MAX_COLS - index_width
+        if widths.sum() <= available:
+            return [None]
+        if not paginate:
+            raise ValueError(
+                "The chunks have {} columns, more than the {} columns of a worksheet. Use paginate=True to split them across worksheets".format(
+                    widths.sum() + index_width, XlsxWriterCompositor.MAX_COLS
+                )
+            )
+        if widths.max() > available:
+            raise ValueError("A column is wider than a worksheet")
+        groups = []
+        start = 0
+        while start < len(widths):
+            end = start + np.searchsorted(
+                np.cumsum(widths[start:]), available, side="right"
+            )
+            groups.append(np.arange(start, end))
+            start = end
+        return groups
+
+    @staticmethod
+    def _group_kwargs(df, positions, kwargs):
+        """
+        Return the kwargs of the chunks of a group of columns, where the conditional formats only refer to the columns of the group
+        """
+        if positions is None or not kwargs.get("conditional_formats"):
+            return kwargs
+        labels = set(InternalFrame(df).columns.values[positions].tolist())
+        rules = []
+        for rule in kwargs["conditional_formats"]:
+            if rule.columns is None:
+                rules.append(rule)
+                continue
+            columns = [c for c in rule.columns if c in labels]
+            if columns:
+                rules.append(rule._replace(columns=columns))
+        return dict(kwargs, conditional_formats=rules)
+
+    @staticmethod
+    def to_xlsx(
+        *,
+        chunks,
+        output_fp,
+        column_width=_DEFAULT_COLUMN_WIDTH,
+        instrument=None,
+        paginate=False,
+        **kwargs
+    ):
+        """
+        Render the chunks as one table in the first worksheet of a new xlsx file (or its continuation worksheets if `paginate` is True), written by XlsxWriter in `constant_memory` mode.
+
+        Args:
+            chunks: an iterable of frames with the same columns
+            output_fp: the xlsx file name, or a file like object
+            column_width: default=20, the width of all columns in the worksheet
+            instrument: optional func called as instrument(stage, elapsed, **attrs), the stages of `build_presentation_model` are reported for each chunk, the write of each chunk as 'xlsxwriter.write' and the save as 'xlsxwriter.save'
+            paginate: if True, rows and columns that do not fit in a worksheet (1,048,576 rows and 16,384 columns) continue on new worksheets, with the header and index repeated on each worksheet. The chunks are split before they are rendered, from their shapes, so each chunk is still rendered once. Otherwise a ValueError is raised when a chunk does not fit in the worksheet
+            kwargs: passed to `build_presentation_model` for each chunk, the callback funcs need to return styles compatible with XlsxWriter. The engine defaults to 'xlsxwriter', so that the default styles are XlsxWriter styles
+
+        Raises:
+            ValueError: if an engine other than 'xlsxwriter' is passed
+        """
+        engine = kwargs.setdefault("engine", "xlsxwriter")
+        if engine != "xlsxwriter":
+            raise ValueError(
+                "The chunks are written by XlsxWriter, the styles of the {} engine can not be written".format(
+                    engine
+                )
+            )
+        import xlsxwriter
+
+        workbook = xlsxwriter.Workbook(output_fp, {"constant_memory": True})
+        # the format of each style id, see `StyleRegistry`
+        formats = {}
+
+        def _get_format(style):
+            style_id = StyleRegistry.style_id(style)
+            cell_format = formats.get(style_id)
+            if cell_format is None:
+                cell_format = formats[style_id] = workbook.add_format(style.user_style)
+            return style_id, cell_format
+
+        max_rows = XlsxWriterCompositor.MAX_ROWS
+        column_groups = None
+        # the worksheet each group of columns is currently written to
+        streams = []
+        worksheet_streams = []
+        for position, df in StreamingCompositor._checked_chunks(chunks):
+            if column_groups is None:
+                column_groups = StreamingCompositor._column_groups(df, paginate, kwargs)
+                group_kwargs = [
+                    StreamingCompositor._group_kwargs(df, positions, kwargs)
+                    for positions in column_groups
+                ]
+                streams = [None] * len(column_groups)
+                header_height = (
+                    0 if kwargs.get("hide_header") else InternalFrame(df).columns.depth
+                )
+            bottoms = np.cumsum(_positional_sizes(InternalFrame(df), axis=0))
+            for group, positions in enumerate(column_groups):
+                start = 0
+                while start < len(bottoms):
+                    stream = streams[group]
+                    if stream is None:
+                        stream = streams[group] = _WorksheetStream(
+                            workbook.add_worksheet(), _get_format, column_width
+                        )
+                        worksheet_streams.append(stream)
+                    header = header_height if stream.row == 0 else 0
+                    top = bottoms[start - 1] if start else 0
+                    end = np.searchsorted(
+                        bottoms, top + max_rows - stream.row - header, side="right"
+                    )
+                    if end < len(bottoms) and not paginate:
+                        raise ValueError(
+                            "The chunks have more rows than the {} rows of a worksheet. Use paginate=True to split them across worksheets".format(
+                                max_rows
+                            )
+                        )
+                    if end == start:
+                        if stream.row == 0:
+                            raise ValueError("A row is taller than a worksheet")
+                        # the rows continue on a new worksheet
+                        streams[group] = None
+                        continue
+
+                    part = df
+                    if start != 0 or end != len(bottoms) or positions is not None:
+                        part = df.iloc[
+                            start:end, slice(None) if positions is None else positions
+                        ]
+                    presentation_and_loc = StreamingCompositor._resolve_chunk(
+                        part,
+                        stream.row,
+                        hide_header=not header,
+                        cache=position == 0,
+                        output_format="xlsx",
+                        instrument=instrument,
+                        kwargs=group_kwargs[group],
+                    )
+                    stream.write(presentation_and_loc, instrument)
+                    start = end
+
+        for stream in worksheet_streams:
+            stream.close(workbook)
+        with instrument_stage(instrument, "xlsxwriter.save"):
+            workbook.close()
+
+    @staticmethod
+    def to_html(*, chunks, output_fp, table_attrs=None, instrument=None, **kwargs):
+        """
+        Render the chunks as one html table, the rows of each chunk are written to `output_fp` before the next chunk is read.
+
+        Args:
+            chunks: an iterable of frames with the same columns
+            output_fp: the html file name, or a file like object opened for writing text
+            table_attrs: dict of the attributes of the `table` tag, see the kwargs of `HTMLWriter.to_html`
+            instrument: optional func called as instrument(stage, elapsed, **attrs), the stages of `build_presentation_model` are reported for each chunk
+            kwargs: passed to `build_presentation_model` for each chunk
+        """
+        if hasattr(output_fp, "write"):
+            StreamingCompositor._write_html(
+                chunks, output_fp, table_attrs, instrument, kwargs
+            )
+            return
+        with open(output_fp, "w", encoding="utf-8") as f:
+            StreamingCompositor._write_html(chunks, f, table_attrs, instrument, kwargs)
+
+    @staticmethod
+    def _write_html(chunks, f, table_attrs, instrument, kwargs):
+        f.write(HTMLWriter._start_tag("table", table_attrs or {}))
+        row = 0
+        for position, df in StreamingCompositor._checked_chunks(chunks):
+            presentation_and_loc = StreamingCompositor._resolve_chunk(
+                df,
+                row,
+                hide_header=position > 0,
+                cache=position == 0,
+                output_format="html",
+                instrument=instrument,
+                kwargs=kwargs,
+            )
+            row += get_presentation_model_max_rows(presentation_and_loc)
+            # the values are stored as the strings they are rendered as
+            compiled_layout = CompiledLayout.from_presentation_and_loc(
+                presentation_and_loc, value_func=str
+            )
+            f.writelines(HTMLWriter._rows_to_html(compiled_layout))
+        f.write("</table>\n")
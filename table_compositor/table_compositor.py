@@ -3,20 +3,23 @@ Module that supports operations to map a dataframe to an excel worksheet like en
 and also create Excel files with all fancy formatting.
 """
 
-import itertools as it
-
-import pandas as pd
+import numpy as np
 
+from table_compositor.arrow_frame import ArrowFrame, is_arrow_like
+from table_compositor.conditional_formats import resolve_columns
 from table_compositor.html_styles import HTMLWriterDefaults
 from table_compositor.presentation_model import (
     IndexNode,
     InternalFrame,
+    InternalIndex,
+    PresentationAndLoc,
     PresentationElements,
     PresentationLayoutManager,
     PresentationModel,
-    StyleWrapper,
+    StyleRegistry,
+    _nested_models,
 )
-from table_compositor.xlsx_styles import OpenPyxlStyleHelper, XlsxWriterStyleHelper
+from table_compositor.util import column_type_to_str, instrument_stage
 
 
 def build_presentation_model(
@@ -32,13 +35,20 @@ def build_presentation_model(
     index_value_func=None,
     index_name_func=None,
     index_name_style_func=None,
+    data_column_value_func=None,
+    data_column_style_func=None,
+    header_level_value_func=None,
+    header_level_style_func=None,
+    index_level_value_func=None,
+    index_level_style_func=None,
     engine="openpyxl",
+    instrument=None,
     **kwargs,
 ):
     """Construct and return the presentation model that will be used while rendering to html/xlsx formats. The returned object has all the information required to render the tables in the requested format. The details of the object is transparent to the caller. It is only exposed for certain advanced operations.
 
     Args:
-        df: The dataframe representation of the table. The shape of the dataframe closely resembles the table that will be rendered in the requested format.
+        df: The dataframe representation of the table. The shape of the dataframe closely resembles the table that will be rendered in the requested format. A pandas DataFrame, a static-frame Frame, or an Arrow table (pyarrow.Table, polars.DataFrame). Arrow tables are read without converting them to pandas, use `ArrowFrame(table, index_columns=...)` to designate the columns used as the index.
         output_format: 'html' or 'xlsx'
         data_value_func: example: lambda idx, col: df.loc[idx, col], assuming df is in the closure. This can be None, if no data transformation is required to the values already present in the source df
         column_style_func: the function can substitute the data_style_func, if the same style can be applied for the whole column. This argument should be prefered over the `data_style_func` argument. Using this option provides better performance since the fewer objects will be created internally and fewer callbacks are made to this function when compared to data_style_func.This argument only applies to the data contained in the dataframe and not the cell where the headers are rendered. For fine grained control at `cell` level, the `data_style_func` argument can be used. For more information on return values of this function, refer to the documentation for `data_style_func` argument.
@@ -54,13 +64,26 @@ def build_presentation_model(
         index_style_func: func that takes a object of type `IndexNode`. The return value of this function is similar to data_style_func.
         index_name_func: func that returns a string for index name (value to be displayed on top-left corner, above the index column)
         index_name_style: the style value same as data_style_func that will be used to style the cell
+        data_column_value_func: func that takes a column and returns the values of all cells in that column, in the order of the index. This is the vectorized alternative to `data_value_func`, and is the prefered option when the values of a whole column can be computed at once. Example: lambda col: df[col].values * 10.3. See `HTMLWriterDefaults.data_column_value_func`.
+        data_column_style_func: func that takes a column and returns the styles of all cells in that column, in the order of the index. This is the vectorized alternative to `data_style_func`, and is the default used for html rendering. See `HTMLWriterDefaults.data_column_style_func`.
+        header_level_value_func: func that takes the level of the columns (0 for the outermost level), an object array of the values and a list of the keys of the `IndexNode`s at that level, and returns a sequence with the value to display for each node. This is the vectorized alternative to `header_value_func`, and is called once per level rather than once per node. Example: lambda level, values, keys: np.char.upper(values.astype(str)).
+        header_level_style_func: level-wise alternative to `header_style_func`, takes the same arguments as `header_level_value_func` and returns the style of each node.
+        index_level_value_func: level-wise alternative to `index_value_func`, see `header_level_value_func`.
+        index_level_style_func: level-wise alternative to `index_style_func`, see `header_level_style_func`.
         engine: required while building presentation model for xlsx. Argument ignored for HTML rendering. This argument is used to provide the default callback style functions, where the style dictionary returned by the callback functions should be compatible with the engine being used.
+        instrument: optional func called as instrument(stage, elapsed, **attrs) after each stage of the build ('build_presentation_model.index_trees', 'build_presentation_model.value_view', 'build_presentation_model.style_view' and 'build_presentation_model' for the whole build), where elapsed is in seconds and attrs include the `cells` and `models` counts. See `util.instrument_stage`
         kwargs:
                 'hide_index' - if True, then hide the index column, default=False
 
                 'hide_header, - if True, then hide the header, default=False
 
-                'use_convert' - if True, do some conversions from dataframe values to values excel can understand for example np.NaN are converted to NaN strings
+                'use_convert' - if True, do some conversions from dataframe values to values excel can understand for example np.NaN are converted to NaN strings. The values are converted one column at a time while the presentation model is built, see `util.array_type_to_str`
+
+                'validate_index' - if False, skip checking that the index and columns are unique (and contiguous at the first level for hierarchical indices). Useful when the same, already validated, index is rendered repeatedly, default=True
+
+                'sparse' - if True, data cells whose value is empty (None, NaN, NaT or an empty string) and whose style is a default style (see `StyleRegistry.is_default`) or the default data style of the engine (`get_style()` of its style helper, which for XlsxWriter draws white borders) are not written, which keeps the output of frames that are mostly empty small. Columns with a `pd.SparseDtype` are read from their non-fill values, without densifying them. Note that with 'use_convert' NaN values are converted to 'NaN' strings first, and so are written, default=False
+
+                'conditional_formats' - a list of `CellValueRule`, `ColorScale` and `DataBar` rules (see the conditional_formats module), written as native Excel conditional formats over the data cells of the columns they apply to. The styles are then computed by Excel when the file is viewed, rather than by `data_style_func` for each cell. Ignored for HTML rendering, default=()
 
     Return:
         A presentation model, to be used to create layout and provide the layout to the html or xlsx writers.
@@ -83,34 +106,67 @@ def build_presentation_model(
 
     """
 
-    if bool(data_style_func) and bool(column_style_func):
+    if sum(map(bool, (data_style_func, column_style_func, data_column_style_func))) > 1:
         raise ValueError(
-            "Only one of data_style_func and column_style_func needs to be set."
+            "Only one of data_style_func, column_style_func and data_column_style_func needs to be set."
         )
+    if bool(data_value_func) and bool(data_column_value_func):
+        raise ValueError(
+            "Only one of data_value_func and data_column_value_func needs to be set."
+        )
+    for node_func, level_func, name in (
+        (header_value_func, header_level_value_func, "header_value_func"),
+        (header_style_func, header_level_style_func, "header_style_func"),
+        (index_value_func, index_level_value_func, "index_value_func"),
+        (index_style_func, index_level_style_func, "index_style_func"),
+    ):
+        if node_func and level_func:
+            raise ValueError(
+                "Only one of {0} and its level-wise alternative needs to be set.".format(
+                    name
+                )
+            )
+
+    if is_arrow_like(df):
+        df = ArrowFrame(df)
 
     func = _build_presentation_model_for_excel
     if output_format == "html":
         func = _build_presentation_model_for_html
         engine = None
-        if not (data_style_func or column_style_func):
-            # This is for backwards compatibility
-            data_style_func = HTMLWriterDefaults.data_style_func(df)
+        if not (data_style_func or column_style_func or data_column_style_func):
+            # This is for backwards compatibility, the column level
+            # func renders the same styles as HTMLWriterDefaults.data_style_func
+            data_column_style_func = HTMLWriterDefaults.data_column_style_func(df)
 
     internal_frame = InternalFrame(df)
-    return func(
-        df=internal_frame,
-        data_value_func=data_value_func,
-        data_style_func=data_style_func,
-        header_style_func=header_style_func,
-        header_value_func=header_value_func,
-        index_style_func=index_style_func,
-        index_value_func=index_value_func,
-        index_name_func=index_name_func,
-        index_name_style_func=index_name_style_func,
-        column_style_func=column_style_func,
-        engine=engine,
-        **kwargs,
-    )
+    with instrument_stage(
+        instrument,
+        "build_presentation_model",
+        cells=len(internal_frame.index) * len(internal_frame.columns),
+        models=1,
+    ):
+        return func(
+            df=internal_frame,
+            data_value_func=data_value_func,
+            data_style_func=data_style_func,
+            header_style_func=header_style_func,
+            header_value_func=header_value_func,
+            index_style_func=index_style_func,
+            index_value_func=index_value_func,
+            index_name_func=index_name_func,
+            index_name_style_func=index_name_style_func,
+            column_style_func=column_style_func,
+            data_column_value_func=data_column_value_func,
+            data_column_style_func=data_column_style_func,
+            header_level_value_func=header_level_value_func,
+            header_level_style_func=header_level_style_func,
+            index_level_value_func=index_level_value_func,
+            index_level_style_func=index_level_style_func,
+            engine=engine,
+            instrument=instrument,
+            **kwargs,
+        )
 
 
 def _build_presentation_model_for_excel(
@@ -125,26 +181,42 @@ def _build_presentation_model_for_excel(
     index_name_func=None,
     index_name_style_func=None,
     column_style_func=None,
+    data_column_value_func=None,
+    data_column_style_func=None,
+    header_level_value_func=None,
+    header_level_style_func=None,
+    index_level_value_func=None,
+    index_level_style_func=None,
     engine="openpyxl",  # for backward compatibility
     **kwargs,
 ):
+    # the style helpers are imported with the engine they are used for
     if engine == "xlsxwriter":
-        helper_cls = XlsxWriterStyleHelper
+        from table_compositor.xlsx_styles import XlsxWriterStyleHelper as helper_cls
     else:
-        helper_cls = OpenPyxlStyleHelper
+        from table_compositor.xlsx_styles import OpenPyxlStyleHelper as helper_cls
 
-    if not (data_style_func or column_style_func):
+    if not (data_style_func or column_style_func or data_column_style_func):
         column_style_func = lambda _: helper_cls.get_style()
-    header_style_func = header_style_func or (
-        lambda x: helper_cls.default_header_style()
-    )
-    header_value_func = header_value_func or (lambda x: x.value)
-    index_style_func = index_style_func or (lambda x: helper_cls.get_style())
-    index_value_func = index_value_func or (lambda x: x.value)
+    # the defaults are level-wise, so that they are called once per level
+    if not (header_style_func or header_level_style_func):
+        header_level_style_func = lambda level, values, keys: [
+            helper_cls.default_header_style()
+        ] * len(values)
+    if not (header_value_func or header_level_value_func):
+        header_level_value_func = lambda level, values, keys: values
+    if not (index_style_func or index_level_style_func):
+        index_level_style_func = lambda level, values, keys: [
+            helper_cls.get_style()
+        ] * len(values)
+    if not (index_value_func or index_level_value_func):
+        index_level_value_func = lambda level, values, keys: values
     index_name_func = index_name_func or (lambda x: x or "")
     index_name_style_func = index_name_style_func or (
         lambda x: helper_cls.default_header_style()
     )
+    # with sparse=True, empty cells with the default style of the engine are skipped
+    kwargs["engine_default_style"] = helper_cls.get_style()
 
     return _build_presentation_model(
         df=df,
@@ -157,6 +229,12 @@ def _build_presentation_model_for_excel(
         index_name_func=index_name_func,
         index_name_style_func=index_name_style_func,
         column_style_func=column_style_func,
+        data_column_value_func=data_column_value_func,
+        data_column_style_func=data_column_style_func,
+        header_level_value_func=header_level_value_func,
+        header_level_style_func=header_level_style_func,
+        index_level_value_func=index_level_value_func,
+        index_level_style_func=index_level_style_func,
         **kwargs,
     )
 
@@ -173,12 +251,23 @@ def _build_presentation_model_for_html(
     index_name_func=None,
     index_name_style_func=None,
     column_style_func=None,
+    data_column_value_func=None,
+    data_column_style_func=None,
+    header_level_value_func=None,
+    header_level_style_func=None,
+    index_level_value_func=None,
+    index_level_style_func=None,
     **kwargs,
 ):
-    header_style_func = header_style_func or HTMLWriterDefaults.header_style_func(df)
-    header_value_func = header_value_func or HTMLWriterDefaults.header_value_func(df)
-    index_style_func = index_style_func or HTMLWriterDefaults.index_style_func(df)
-    index_value_func = index_value_func or HTMLWriterDefaults.index_value_func(df)
+    # the defaults are level-wise, so that they are called once per level
+    if not (header_style_func or header_level_style_func):
+        header_level_style_func = HTMLWriterDefaults.header_level_style_func(df)
+    if not (header_value_func or header_level_value_func):
+        header_level_value_func = HTMLWriterDefaults.header_level_value_func(df)
+    if not (index_style_func or index_level_style_func):
+        index_level_style_func = HTMLWriterDefaults.index_level_style_func(df)
+    if not (index_value_func or index_level_value_func):
+        index_level_value_func = HTMLWriterDefaults.index_level_value_func(df)
     index_name_func = index_name_func or HTMLWriterDefaults.index_name_value_func(df)
     index_name_style_func = (
         index_name_style_func or HTMLWriterDefaults.index_name_style_func(df)
@@ -195,6 +284,12 @@ def _build_presentation_model_for_html(
         index_name_func=index_name_func,
         index_name_style_func=index_name_style_func,
         column_style_func=column_style_func,
+        data_column_value_func=data_column_value_func,
+        data_column_style_func=data_column_style_func,
+        header_level_value_func=header_level_value_func,
+        header_level_style_func=header_level_style_func,
+        index_level_value_func=index_level_value_func,
+        index_level_style_func=index_level_style_func,
         **kwargs,
     )
 
@@ -208,15 +303,16 @@ def _raise_on_invalid_index(index, label: str):
 
     detailed_msg = """\nFor presentation model to process index and columns, the index and columns should be unique. For multi-heirarchical indices, the values should becontiguous at the first level. For example in : \t\n df.columns = pd.MultiIndex.from_tuples([('a', 1), ('a', 2), ('b', 1), ('a', 3)]) \n the first level of values turns out to be ['a', 'a', 'b', 'a']. \n Note that 'a' is not contiguous and therefore the index/column is not a valid value."""
 
-    if not isinstance(index, (pd.MultiIndex, pd.Index)):
-        # probably a static-frame
-        return
+    if not isinstance(index, InternalIndex):
+        index = InternalIndex(index)
 
-    if isinstance(index, pd.MultiIndex):
-        values = index.tolist()
-        values_at_first_level, *_ = zip(*values)
-        by_group = tuple((k for k, _ in it.groupby(values_at_first_level)))
-        if len(set(values_at_first_level)) != len(by_group):
+    if index.is_hierarchical:
+        # the first level is contiguous if the code that starts each run of
+        # equal codes is not repeated by a later run
+        codes = np.asarray(index.codes[0])
+        run_starts = np.flatnonzero(codes[1:] != codes[:-1]) + 1
+        first_codes = codes[np.concatenate(([0], run_starts))] if len(codes) else codes
+        if len(np.unique(first_codes)) != len(first_codes):
             msg = "".join(
                 (
                     label,
@@ -230,13 +326,62 @@ def _raise_on_invalid_index(index, label: str):
         return
 
     # if single hierarchical
-    if len(set(index)) != len(index):
+    if not index.is_unique:
         msg = "".join(
             (label, " not unique.", detailed_msg, "\n Value Passed: ", str(index))
         )
         raise ValueError(msg)
 
 
+def _to_style_wrappers(styles):
+    """
+    Wrap each style returned by a column level style func in its interned StyleWrapper, see `StyleRegistry`
+    """
+    wrappers = {}
+    result = np.empty(len(styles), dtype=object)
+    for ix, style in enumerate(styles):
+        # styles are usually dicts (unhashable) that are shared between
+        # cells, so the identity of the style is used to find repeats
+        key = id(style)
+        wrapper = wrappers.get(key)
+        if wrapper is None:
+            wrapper = wrappers[key] = StyleRegistry.wrap(style)
+        result[ix] = wrapper
+    return result
+
+
+def _build_index_view(tree, node_func, level_func, style=False):
+    """
+    Apply the level-wise func if provided, else the node func, to the index tree. Styles are wrapped in their interned StyleWrapper
+    """
+    if level_func:
+        if style:
+            return IndexNode.apply_by_level(
+                lambda *args: _to_style_wrappers(level_func(*args)), tree
+            )
+        return IndexNode.apply_by_level(level_func, tree)
+    if style:
+        return IndexNode.apply(
+            f=lambda node: StyleRegistry.wrap(node_func(node)), root=tree
+        )
+    return IndexNode.apply(f=node_func, root=tree)
+
+
+def _build_value_view(df, data_value_func, data_column_value_func, use_convert):
+    if data_column_value_func:
+        value_view = PresentationLayoutManager.apply_by_column(
+            data_column_value_func, df
+        )
+    else:
+        value_view = PresentationLayoutManager.apply(data_value_func, df)
+    if use_convert:
+        values_to_convert = value_view
+        value_view = PresentationLayoutManager.apply_by_column(
+            lambda c: column_type_to_str(values_to_convert[c]), values_to_convert
+        )
+    return value_view
+
+
 def _build_presentation_model(
     *,
     df,
@@ -249,6 +394,13 @@ def _build_presentation_model(
     index_name_func,
     index_name_style_func,
     column_style_func=None,
+    data_column_value_func=None,
+    data_column_style_func=None,
+    header_level_value_func=None,
+    header_level_style_func=None,
+    index_level_value_func=None,
+    index_level_style_func=None,
+    instrument=None,
     **kwargs,
 ):
     """
@@ -270,44 +422,84 @@ def _build_presentation_model(
     kwargs = kwargs or {}
     kwargs["hide_index"] = kwargs.get("hide_index", False)
     kwargs["hide_header"] = kwargs.get("hide_header", False)
-    # FIXME: covert method revisit
     kwargs["use_convert"] = kwargs.get("use_convert", False)
+    kwargs["validate_index"] = kwargs.get("validate_index", True)
+    kwargs["sparse"] = kwargs.get("sparse", False)
+    kwargs["column_styles"] = None
+    # the rules are kept with the positions of the columns they apply to
+    kwargs["conditional_formats"] = resolve_columns(
+        kwargs.get("conditional_formats", ()), df.columns
+    )
 
     # table compositor needs indices/column names to be unique.
-    if not kwargs["hide_index"]:
+    if kwargs["validate_index"] and not kwargs["hide_index"]:
         _raise_on_invalid_index(df.index, "index")
-    if not kwargs["hide_header"]:
+    if kwargs["validate_index"] and not kwargs["hide_header"]:
         _raise_on_invalid_index(df.columns, "columns")
 
-    column_index_tree = IndexNode.index_to_index_node(df.columns)
-    header_value_view = IndexNode.apply(f=header_value_func, root=column_index_tree)
-    header_style_view = IndexNode.apply(
-        f=lambda node: StyleWrapper(user_style=header_style_func(node)),
-        root=column_index_tree,
-    )
-    # index
-    style_index_view = IndexNode.apply(
-        f=lambda node: StyleWrapper(user_style=index_style_func(node)),
-        root=IndexNode.index_to_index_node(df.index),
-    )
-    index_value_view = IndexNode.apply(
-        f=index_value_func, root=IndexNode.index_to_index_node(df.index)
-    )
+    n_rows, n_cols = len(df.index), len(df.columns)
+    with instrument_stage(
+        instrument,
+        "build_presentation_model.index_trees",
+        cells=n_rows + n_cols,
+        models=1,
+    ):
+        # the trees are shared by frames with the same index or columns
+        column_index_tree = IndexNode.cached_index_to_index_node(df.columns)
+        header_value_view = _build_index_view(
+            column_index_tree, header_value_func, header_level_value_func
+        )
+        header_style_view = _build_index_view(
+            column_index_tree, header_style_func, header_level_style_func, style=True
+        )
+        # index
+        index_tree = IndexNode.cached_index_to_index_node(df.index)
+        style_index_view = _build_index_view(
+            index_tree, index_style_func, index_level_style_func, style=True
+        )
+        index_value_view = _build_index_view(
+            index_tree, index_value_func, index_level_value_func
+        )
 
     # process df
-    value_view = PresentationLayoutManager.apply(data_value_func, df)
-    if column_style_func:
-        style_view = PresentationLayoutManager.apply_at_column_level(
-            lambda c: StyleWrapper(user_style=column_style_func(c)), df
-        )
-    else:
-        style_view = PresentationLayoutManager.apply(
-            lambda i, c: StyleWrapper(user_style=data_style_func(i, c)), df
+    with instrument_stage(
+        instrument,
+        "build_presentation_model.value_view",
+        cells=n_rows * n_cols,
+        models=1,
+    ):
+        value_view = _build_value_view(
+            df, data_value_func, data_column_value_func, kwargs["use_convert"]
         )
 
+    with instrument_stage(
+        instrument,
+        "build_presentation_model.style_view",
+        cells=n_rows * n_cols,
+        models=1,
+    ):
+        if column_style_func:
+            # the style of each column is carried to the writers, which apply
+            # it once for the whole column
+            column_styles = {
+                c: StyleRegistry.wrap(column_style_func(c)) for c in df.columns.values
+            }
+            kwargs["column_styles"] = tuple(column_styles[c] for c in df.columns.values)
+            style_view = PresentationLayoutManager.apply_at_column_level(
+                column_styles.__getitem__, df
+            )
+        elif data_column_style_func:
+            style_view = PresentationLayoutManager.apply_by_column(
+                lambda c: _to_style_wrappers(data_column_style_func(c)), df
+            )
+        else:
+            style_view = PresentationLayoutManager.apply(
+                lambda i, c: StyleRegistry.wrap(data_style_func(i, c)), df
+            )
+
     # index name style
     index_name_values = index_name_func(df.index.name)
-    index_name_style = StyleWrapper(user_style=index_name_style_func(df.index.name))
+    index_name_style = StyleRegistry.wrap(index_name_style_func(df.index.name))
 
     header = PresentationElements(values=header_value_view, style=header_style_view)
     df_view = PresentationElements(values=value_view, style=style_view)
@@ -321,3 +513,66 @@ def _build_presentation_model(
         index_name=index_name,
         kwargs=kwargs,
     )
+
+
+def refresh_presentation_model(
+    presentation_model, df, data_value_func=None, data_column_value_func=None
+):
+    """Return the presentation model with the values of `df` in place of its data values. This is useful to re-render a table when only its values change (for example a live dashboard), since the index and header trees, the styles and, for a resolved model, the locations of all cells are reused as they are. Only `data_value_func` (or `data_column_value_func`) is called again.
+
+    Args:
+        presentation_model: a PresentationModel returned by `build_presentation_model`, or a PresentationAndLoc returned by `PresentationLayoutManager.resolve_loc`. Both can be used in the layout passed to the writers
+        df: frame with the same index and columns as the frame the presentation model was built from
+        data_value_func: same as the argument of `build_presentation_model`
+        data_column_value_func: same as the argument of `build_presentation_model`
+
+    Returns:
+        A presentation model of the same type as `presentation_model`. Cells holding nested presentation models keep rendering the nested models
+
+    Raises:
+        ValueError: if the index or columns of `df` differ from those of the presentation model
+    """
+    if bool(data_value_func) and bool(data_column_value_func):
+        raise ValueError(
+            "Only one of data_value_func and data_column_value_func needs to be set."
+        )
+
+    locs = None
+    if isinstance(presentation_model, PresentationAndLoc):
+        presentation_model, locs = presentation_model.model, presentation_model.locs
+
+    if is_arrow_like(df):
+        df = ArrowFrame(df)
+    df = InternalFrame(df)
+    # the styles are built with the same index and columns as the values
+    previous = InternalFrame(presentation_model.data.style)
+    if not df.index.equals(previous.index):
+        raise ValueError("The index of df differs from the presentation model.")
+    if not df.columns.equals(previous.columns):
+        raise ValueError("The columns of df differ from the presentation model.")
+
+    value_view = _build_value_view(
+        df,
+        data_value_func,
+        data_column_value_func,
+        presentation_model.kwargs["use_convert"],
+    )
+    if locs is None:
+        # the locations of resolved models already point to the nested
+        # models, unresolved models need them in their values
+        nested = _nested_models(InternalFrame(presentation_model.data.values))
+        if nested:
+            value_view = InternalFrame(value_view)
+            values = np.empty((len(df.index), len(df.columns)), dtype=object)
+            for j in range(len(df.columns)):
+                values[:, j] = value_view.column_values(j, box=True)
+            for (ix, j), inner in nested.items():
+                values[ix, j] = inner
+            value_view = value_view.from_values(values)
+
+    model = presentation_model._replace(
+        data=presentation_model.data._replace(values=value_view)
+    )
+    if locs is None:
+        return model
+    return PresentationAndLoc(model=model, locs=locs)
@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+from pytest import importorskip, raises
+
+from table_compositor.arrow_frame import ArrowFrame, is_arrow_like
+from table_compositor.grid import GridLayoutManager
+from table_compositor.presentation_model import PresentationLayoutManager
+from table_compositor.table_compositor import build_presentation_model
+
+pa = importorskip("pyarrow")
+
+
+def _get_df() -> pd.DataFrame:
+    return pd.DataFrame(
+        dict(
+            a=["x", "x", "y", "y"],
+            b=["p", "q", "p", "q"],
+            c=np.arange(4, dtype=np.int64),
+            d=[1.5, np.nan, 2.5, 3.5],
+            e=["s", "t", "u", "v"],
+        )
+    )
+
+
+def _row_col_dict(df):
+    pm = build_presentation_model(df=df, engine="openpyxl")
+    layout = [pm]
+    return GridLayoutManager.get_row_col_dict(layout, convert=True)
+
+
+def _values(row_col_dict):
+    return {k: v.value for k, v in row_col_dict.items()}
+
+
+def test_is_arrow_like() -> None:
+    assert is_arrow_like(pa.table(dict(a=[1])))
+    assert not is_arrow_like(_get_df())
+    # other pyarrow and polars objects are rejected before they are read
+    with raises(TypeError):
+        is_arrow_like(pa.record_batch([pa.array([1])], names=["a"]))
+
+
+def test_polars_lazy_frame_raises() -> None:
+    pl = importorskip("polars")
+    with raises(TypeError):
+        build_presentation_model(df=pl.DataFrame(dict(a=[1])).lazy())
+
+
+def test_numeric_columns_are_not_copied() -> None:
+    table = pa.Table.from_pandas(_get_df(), preserve_index=False)
+    frame = ArrowFrame(table)
+    values = frame.column_values(list(frame.columns).index("c"))
+    buffer_address = table.column("c").chunk(0).buffers()[1].address
+    assert values.ctypes.data == buffer_address
+    assert not values.flags.writeable
+
+
+def test_arrow_table_matches_pandas() -> None:
+    df = _get_df().set_index("e")
+    table = pa.Table.from_pandas(df.reset_index(), preserve_index=False)
+    expected = _values(_row_col_dict(df))
+    actual = _values(_row_col_dict(ArrowFrame(table, index_columns="e")))
+    assert actual == expected
+
+
+def test_arrow_table_hierarchical_index_matches_pandas() -> None:
+    df = _get_df().set_index(["a", "b"])
+    table = pa.Table.from_pandas(df.reset_index(), preserve_index=False)
+    frame = ArrowFrame(table, index_columns=["a", "b"])
+    assert frame.index.depth == 2
+
+    expected = _values(_row_col_dict(df))
+    actual = _values(_row_col_dict(frame))
+    assert actual == expected
+
+
+def test_arrow_table_without_index_matches_pandas() -> None:
+    df = _get_df()
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    # the table is wrapped with a positional index when passed directly
+    assert _values(_row_col_dict(table)) == _values(_row_col_dict(df))
+
+
+def test_polars_frame_matches_pandas() -> None:
+    pl = importorskip("polars")
+    df = _get_df().set_index(["a", "b"])
+    frame = ArrowFrame(pl.from_pandas(df.reset_index()), index_columns=["a", "b"])
+    assert _values(_row_col_dict(frame)) == _values(_row_col_dict(df))
+
+
+def test_resolve_loc_arrow_table() -> None:
+    table = pa.table(dict(a=["x", "y"], c=[1, 2]))
+    pm = build_presentation_model(df=ArrowFrame(table, index_columns="a"))
+    pl = PresentationLayoutManager.resolve_loc(pm)
+    assert pl.locs.data_loc.shape == (2, 1)
+
+
+def test_index_column_with_nulls_raises() -> None:
+    table = pa.table(dict(a=["x", None], b=["p", "q"], c=[1, 2]))
+    with raises(ValueError):
+        ArrowFrame(table, index_columns=["a", "b"])
+
+
+def test_missing_index_column_raises() -> None:
+    with raises(ValueError):
+        ArrowFrame(pa.table(dict(a=[1])), index_columns="z")
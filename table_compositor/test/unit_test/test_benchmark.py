@@ -0,0 +1,99 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from pytest import mark
+
+import table_compositor.benchmarks.benchmark as bm
+import table_compositor.presentation_model as ptm
+from table_compositor.benchmarks.benchmark import (
+    LAYOUTS,
+    STAGES,
+    memory_stage,
+    run,
+    time_stage,
+)
+
+
+@mark.parametrize("stage", STAGES)
+@mark.parametrize("layout", LAYOUTS)
+def test_time_stage(stage: str, layout: str) -> None:
+    result = time_stage(stage, layout, 4, 4, repeat=2)
+    assert result["stage"] == stage
+    assert result["repeat"] == 2
+    assert 0 <= result["min"] <= result["median"]
+
+
+def test_stages_clear_caches(monkeypatch) -> None:
+    calls = []
+    monkeypatch.setattr(bm, "clear_caches", lambda: calls.append(None))
+    time_stage("resolve_loc", "flat", 4, 4, repeat=3)
+    assert len(calls) == 3
+    memory_stage("resolve_loc", "flat", 4, 4)
+    assert len(calls) == 4
+    # the largest scale is not cached, so the uncached path is measured too
+    assert max(n_rows for n_rows, _ in bm.SCALES) > ptm._MAX_CACHED_SIZE
+
+
+@mark.parametrize("stage", STAGES)
+@mark.parametrize("layout", LAYOUTS)
+def test_memory_stage(stage: str, layout: str) -> None:
+    result = memory_stage(stage, layout, 4, 4)
+    assert result["stage"] == stage
+    assert result["peak"] >= result["retained"]
+    assert result["peak_per_cell"] == result["peak"] / result["cells"]
+
+
+def test_run_memory(capsys) -> None:
+    results = run(
+        memory=True,
+        stages=["build_presentation_model"],
+        layouts=["flat"],
+        scales=[(4, 3), (8, 3)],
+    )
+    assert [(r["n_rows"], r["n_cols"]) for r in results] == [(4, 3), (8, 3)]
+    assert "Peak bytes per cell" in capsys.readouterr().out
+
+
+@mark.parametrize("stage", STAGES)
+def test_stages_are_isolated(stage: str, monkeypatch) -> None:
+    func = STAGES[stage]("multi_table", 4, 4)
+
+    def _raise(*args, **kwargs):
+        raise AssertionError("called by the timed function")
+
+    # the frames, and the models of the stages after the build, are made in the setup
+    monkeypatch.setattr(bm, "prepare_frames", _raise)
+    if stage != "build_presentation_model":
+        monkeypatch.setattr(bm.tbc, "build_presentation_model", _raise)
+    func()
+
+
+def test_benchmark_cli() -> None:
+    with tempfile.TemporaryDirectory() as dir_name:
+        output_fp = os.path.join(dir_name, "results.json")
+        subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "table_compositor.benchmarks.benchmark",
+                output_fp,
+                "--stages",
+                "build_presentation_model",
+                "openpyxl_write",
+                "--layouts",
+                "flat",
+                "--scales",
+                "4x3",
+            ],
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+        with open(output_fp) as f:
+            results = json.load(f)
+    assert [(r["stage"], r["n_rows"], r["n_cols"]) for r in results] == [
+        ("build_presentation_model", 4, 3),
+        ("openpyxl_write", 4, 3),
+    ]
@@ -0,0 +1,300 @@
+import gc
+import os
+import tempfile
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.styles import Font, PatternFill
+from pytest import mark, raises
+
+from table_compositor.compiled_layout import CELL_DTYPE, CompiledLayout
+from table_compositor.conditional_formats import CellValueRule, ColorScale
+from table_compositor.grid import GridLayoutManager
+from table_compositor.presentation_model import (
+    LocOffsets,
+    PresentationLayoutManager,
+    StyleWrapper,
+    ValueAndStyleAttributes,
+)
+from table_compositor.table_compositor import build_presentation_model
+from table_compositor.xlsx_writer import OpenPyxlCompositor, XlsxWriterCompositor
+
+
+def _get_layout(engine: str = "openpyxl"):
+    df = pd.DataFrame(
+        dict(
+            a=[1, 2, 3],
+            b=[1.5, np.nan, np.inf],
+            c=["x", "ü", "a longer string"],
+            d=[True, False, True],
+        ),
+        index=pd.Index(["r1", "r2", "r3"], name="rows"),
+    )
+    mi_df = df.copy()
+    mi_df.columns = pd.MultiIndex.from_tuples(
+        [("g1", "a"), ("g1", "b"), ("g2", "c"), ("g2", "d")]
+    )
+    return [
+        build_presentation_model(df=df, engine=engine),
+        build_presentation_model(df=mi_df, engine=engine),
+    ]
+
+
+def _values(ws):
+    return [[c.value for c in row] for row in ws.iter_rows()]
+
+
+@mark.parametrize("mmap_mode", ["r", None])
+# a path without the .npz suffix is loaded from the same path it is saved to
+@mark.parametrize("fname", ["layout.npz", "layout"])
+def test_compiled_layout_round_trip(mmap_mode, fname) -> None:
+    layout = _get_layout()
+    expected = GridLayoutManager.get_row_col_dict(layout, convert=True)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        fp = os.path.join(tmp_dir, fname)
+        CompiledLayout.from_layout(layout).save(fp)
+        compiled = CompiledLayout.load(fp, mmap_mode=mmap_mode)
+        if mmap_mode:
+            assert isinstance(compiled.arrays["cells"], np.memmap)
+        actual = compiled.to_row_col_dict()
+
+        assert list(actual) == list(expected)
+        for offsets, (value, style, nesting_level) in expected.items():
+            assert actual[offsets].value == value
+            assert actual[offsets].nesting_level == nesting_level
+            assert actual[offsets].style_wrapper.user_style == style.user_style
+        # the index name and the two groups of the multi index header
+        assert compiled.spans.tolist() == [[5, 0, 6, 0], [5, 1, 5, 2], [5, 3, 5, 4]]
+        del compiled, actual
+
+
+def test_compiled_layout_save_styles_and_rules() -> None:
+    style = dict(font=Font(bold=True, color="9C0006"), fill=PatternFill("solid"))
+    rules = [
+        CellValueRule("between", (1, 2.5), style, columns=["a", "b"]),
+        ColorScale("#F8696B", "#63BE7B"),
+    ]
+    df = _get_layout()[0].data.values
+    compiled = CompiledLayout.from_layout(
+        [build_presentation_model(df=df, conditional_formats=rules)]
+    )
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        fp = os.path.join(tmp_dir, "layout.npz")
+        compiled.save(fp)
+        # the styles and rules are not pickled
+        with np.load(fp, allow_pickle=False) as npz:
+            assert all(npz[name].dtype != object for name in npz.files)
+        loaded = CompiledLayout.load(fp, mmap_mode=None)
+        assert [s.user_style for s in loaded.styles] == [
+            s.user_style for s in compiled.styles
+        ]
+        assert loaded.conditional_formats == compiled.conditional_formats
+
+        rules = [CellValueRule(">", pd.Timestamp("2020-01-01"), style)]
+        compiled = CompiledLayout.from_layout(
+            [build_presentation_model(df=df, conditional_formats=rules)]
+        )
+        with raises(ValueError):
+            compiled.save(fp)
+
+
+def test_compiled_layout_cell_store() -> None:
+    layout = _get_layout()
+    expected = GridLayoutManager.get_row_col_dict(layout, convert=True)
+    compiled = CompiledLayout.from_layout(layout)
+
+    assert list(compiled) == list(expected)
+    assert compiled.values() == [v.value for v in expected.values()]
+    assert compiled.cells.dtype == CELL_DTYPE
+    # cells that share a style share one entry of the style palette
+    assert len(compiled.styles) < len(compiled)
+    for (_, (_, style, _)), style_id in zip(
+        expected.items(), compiled.cells["style_id"]
+    ):
+        assert compiled.styles[style_id].user_style == style.user_style
+
+
+@mark.parametrize(
+    "compositor,engine",
+    [(OpenPyxlCompositor, "openpyxl"), (XlsxWriterCompositor, "xlsxwriter")],
+)
+def test_compiled_layout_to_xlsx(compositor, engine) -> None:
+    layout = _get_layout(engine)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        expected_fp = os.path.join(tmp_dir, "expected.xlsx")
+        compositor.to_xlsx(layout=layout, output_fp=expected_fp)
+
+        layout_fp = os.path.join(tmp_dir, "layout.npz")
+        CompiledLayout.from_layout(layout).save(layout_fp)
+        output_fp = os.path.join(tmp_dir, "output.xlsx")
+        compositor.to_xlsx(layout=CompiledLayout.load(layout_fp), output_fp=output_fp)
+
+        ews = load_workbook(expected_fp).active
+        ows = load_workbook(output_fp).active
+        assert _values(ows) == _values(ews)
+        assert ows.merged_cells.ranges == ews.merged_cells.ranges
+
+
+def test_compiled_layout_merge_plan() -> None:
+    compiled = CompiledLayout.from_layout(_get_layout())
+    assert compiled.merge_plan().tolist() == compiled.spans.tolist()
+
+    style = StyleWrapper(user_style=dict(bold=True))
+    cells = {
+        LocOffsets(0, 0, 1, 1): ValueAndStyleAttributes("a", style, 0),
+        LocOffsets(0, 2, 0, 2): ValueAndStyleAttributes("b", style, 0),
+    }
+    assert CompiledLayout.from_row_col_dict(cells).merge_plan().tolist() == [
+        [0, 0, 1, 1]
+    ]
+    # a cell within the span
+    cells[LocOffsets(1, 1, 1, 1)] = ValueAndStyleAttributes("c", style, 0)
+    with raises(ValueError):
+        CompiledLayout.from_row_col_dict(cells).merge_plan()
+    # two spans that overlap
+    del cells[LocOffsets(1, 1, 1, 1)]
+    cells[LocOffsets(1, 1, 2, 2)] = ValueAndStyleAttributes("c", style, 0)
+    with raises(ValueError):
+        CompiledLayout.from_row_col_dict(cells).merge_plan()
+
+
+@mark.parametrize("sparse_dtype", [False, True])
+def test_compiled_layout_sparse(sparse_dtype) -> None:
+    df = pd.DataFrame(
+        dict(a=[np.nan, 1.0, np.nan], b=["x", "", None], c=[1.5, np.nan, 3.0])
+    )
+    if sparse_dtype:
+        df["a"] = df["a"].astype(pd.SparseDtype("float64", np.nan))
+    layout = [build_presentation_model(df=df, sparse=True)]
+    compiled = CompiledLayout.from_layout(layout)
+    expected = GridLayoutManager.get_row_col_dict(layout, convert=True)
+
+    assert list(compiled) == list(expected)
+    # the empty data cells are not written, the index and header are
+    data = [(o[:2], v.value) for o, v in compiled.items() if o[0] and o[1]]
+    assert data == [
+        ((1, 2), "x"),
+        ((1, 3), 1.5),
+        ((2, 1), 1),
+        ((3, 3), 3),
+    ]
+
+    # cells with a style that is not a default style are kept
+    layout = [
+        build_presentation_model(
+            df=df, sparse=True, column_style_func=lambda c: dict(number_format="0.0")
+        )
+    ]
+    assert len(CompiledLayout.from_layout(layout)) == 16
+
+
+def test_compiled_layout_sparse_xlsxwriter() -> None:
+    # the default data style of XlsxWriter has white borders, it is still skipped
+    df = pd.DataFrame(dict(a=[np.nan] * 10, b=[""] * 9 + ["x"]))
+    layout = [build_presentation_model(df=df, engine="xlsxwriter", sparse=True)]
+    data = [
+        o[:2] for o, _ in CompiledLayout.from_layout(layout).items() if o[0] and o[1]
+    ]
+    assert data == [(10, 2)]
+
+    layout = [build_presentation_model(df=df, engine="xlsxwriter")]
+    assert len(CompiledLayout.from_layout(layout)) == 33
+
+
+def test_compiled_layout_paginate() -> None:
+    layout = _get_layout()
+    compiled = CompiledLayout.from_layout(layout)
+    assert compiled.shape == GridLayoutManager.estimate_dimensions(layout) == (10, 5)
+
+    compiled = CompiledLayout.from_layout(layout[1:])
+    assert compiled.paginate(max_rows=5, max_cols=5) == [compiled]
+    # the header of 2 rows and the index of 1 column are repeated on each page
+    pages = compiled.paginate(max_rows=4, max_cols=4, repeat_rows=2, repeat_cols=1)
+    assert [page.shape for page in pages] == [(4, 4), (4, 2), (3, 4), (3, 2)]
+
+    def _header(page):
+        return [
+            (tuple(int(x) for x in tuple(cell)[:4]), value)
+            for cell, value in zip(page.cells, page.values())
+            if cell["r1"] < 2
+        ]
+
+    # the header g2 spans two pages and is repeated on each
+    assert _header(pages[1]) == [
+        ((0, 0, 1, 0), "rows"),
+        ((1, 1, 1, 1), "d"),
+        ((0, 1, 0, 1), "g2"),
+    ]
+    assert _header(pages[2]) == _header(pages[0])
+    with raises(ValueError):
+        compiled.paginate(max_rows=2, max_cols=4, repeat_rows=2, repeat_cols=1)
+
+
+def test_compiled_layout_items_in_chunks(monkeypatch) -> None:
+    import table_compositor.compiled_layout as compiled_layout_module
+
+    layout = _get_layout()
+    expected = GridLayoutManager.get_row_col_dict(layout, convert=True)
+    compiled = CompiledLayout.from_layout(layout)
+    # the cells are iterated over in chunks of 3 cells
+    monkeypatch.setattr(compiled_layout_module, "_ITER_CHUNK_SIZE", 3)
+
+    assert list(compiled) == list(expected)
+    assert [
+        (offsets, value, nesting_level)
+        for offsets, (value, _, nesting_level) in compiled.items()
+    ] == [
+        (offsets, value, nesting_level)
+        for offsets, (value, _, nesting_level) in expected.items()
+    ]
+    assert compiled.values() == [value for value, _, _ in expected.values()]
+    assert compiled.columns() == sorted({offsets[1] for offsets in expected})
+
+
+def test_compiled_layout_build_in_chunks(monkeypatch) -> None:
+    import table_compositor.compiled_layout as compiled_layout_module
+    import table_compositor.presentation_model as presentation_model_module
+
+    layout = _get_layout()
+    expected = GridLayoutManager.get_row_col_dict(layout, convert=True)
+    # the cells are copied to the cell store 3 at a time, and the values are
+    # converted 2 rows at a time
+    monkeypatch.setattr(compiled_layout_module, "_BUILD_CHUNK_SIZE", 3)
+    monkeypatch.setattr(presentation_model_module, "_CONVERT_CHUNK_ROWS", 2)
+    compiled = CompiledLayout.from_layout(layout)
+
+    assert list(compiled) == list(expected)
+    assert compiled.values() == [value for value, _, _ in expected.values()]
+    assert compiled.cells["nesting_level"].tolist() == [
+        nesting_level for _, _, nesting_level in expected.values()
+    ]
+
+
+def test_compiled_layout_bytes_per_cell() -> None:
+    n_rows, n_cols = 10000, 10
+    df = pd.DataFrame(np.random.default_rng(0).random((n_rows, n_cols)))
+    presentation_and_loc = PresentationLayoutManager.resolve_loc(
+        build_presentation_model(df=df, hide_index=True)
+    )
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        compiled = CompiledLayout.from_presentation_and_loc(
+            presentation_and_loc, convert=True
+        )
+        gc.collect()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    # a 27 byte record and an 8 byte float for each cell, the cell store grows
+    # by half when it is full
+    cells = len(compiled)
+    assert cells > n_rows * n_cols
+    assert retained / cells < 45
+    assert peak / cells < 64
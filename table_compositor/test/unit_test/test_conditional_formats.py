@@ -0,0 +1,137 @@
+import io
+
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.styles import Font
+from pytest import mark, raises
+
+from table_compositor.compiled_layout import CompiledLayout
+from table_compositor.conditional_formats import CellValueRule, ColorScale, DataBar
+from table_compositor.table_compositor import build_presentation_model
+from table_compositor.xlsx_writer import OpenPyxlCompositor, XlsxWriterCompositor
+
+
+def _get_df():
+    return pd.DataFrame(
+        dict(a=[1, -2, 3], b=[0.5, 1.5, -0.5], c=["x", "y", "z"], d=[4, 5, 6]),
+        index=pd.Index(["r1", "r2", "r3"], name="rows"),
+    )
+
+
+def _rules(ws):
+    return {
+        str(cf.sqref): sorted((r.type, r.operator) for r in cf.rules)
+        for cf in ws.conditional_formatting
+    }
+
+
+@mark.parametrize(
+    "compositor,engine,style",
+    [
+        (OpenPyxlCompositor, "openpyxl", dict(font=Font(color="9C0006"))),
+        (XlsxWriterCompositor, "xlsxwriter", dict(font_color="#9C0006")),
+    ],
+)
+def test_conditional_formats_to_xlsx(compositor, engine, style) -> None:
+    conditional_formats = [
+        CellValueRule("<", 0, style, columns=["a", "b"]),
+        CellValueRule("between", (4, 5), style, columns=["d"]),
+        ColorScale("#F8696B", "#63BE7B", mid_color="#FFEB84", columns=["a"]),
+        DataBar(columns=["b", "d"]),
+    ]
+    pm = build_presentation_model(
+        df=_get_df(), engine=engine, conditional_formats=conditional_formats
+    )
+    # the second model is shifted below the first one
+    layout = [pm, pm]
+
+    output = io.BytesIO()
+    compositor.to_xlsx(layout=layout, output_fp=output)
+    ws = load_workbook(output).active
+
+    # the data of the first model is in B2:E4, of the second model in B7:E9
+    assert _rules(ws) == {
+        "B2:C4": [("cellIs", "lessThan")],
+        "B7:C9": [("cellIs", "lessThan")],
+        "E2:E4": [("cellIs", "between")],
+        "E7:E9": [("cellIs", "between")],
+        "B2:B4": [("colorScale", None)],
+        "B7:B9": [("colorScale", None)],
+        "C2:C4 E2:E4": [("dataBar", None)],
+        "C7:C9 E7:E9": [("dataBar", None)],
+    }
+
+
+def test_conditional_formats_formulas() -> None:
+    formulas = []
+    for compositor, engine, style in [
+        (OpenPyxlCompositor, "openpyxl", dict(font=Font(color="9C0006"))),
+        (XlsxWriterCompositor, "xlsxwriter", dict(font_color="#9C0006")),
+    ]:
+        rules = [
+            CellValueRule("==", 'x"y', style, columns=["c"]),
+            CellValueRule("between", (1, 2.5), style, columns=["a"]),
+            CellValueRule("!=", True, style, columns=["d"]),
+        ]
+        pm = build_presentation_model(
+            df=_get_df(), engine=engine, conditional_formats=rules
+        )
+        output = io.BytesIO()
+        compositor.to_xlsx(layout=[pm], output_fp=output)
+        ws = load_workbook(output).active
+        formulas.append(
+            {
+                str(cf.sqref): [f for r in cf.rules for f in r.formula]
+                for cf in ws.conditional_formatting
+            }
+        )
+    # both engines write the same formulas, strings are quoted
+    assert (
+        formulas[0]
+        == formulas[1]
+        == {
+            "D2:D4": ['"x""y"'],
+            "B2:B4": ["1", "2.5"],
+            "E2:E4": ["TRUE"],
+        }
+    )
+
+
+def test_conditional_formats_compiled_layout() -> None:
+    rule = ColorScale("#F8696B", "#63BE7B")
+    pm = build_presentation_model(df=_get_df(), conditional_formats=[rule])
+    compiled = CompiledLayout.from_layout([pm])
+    assert compiled.conditional_formats == [(rule, [(1, 1, 3, 4)])]
+
+
+def test_conditional_formats_invalid() -> None:
+    style = dict(font_color="#9C0006")
+    with raises(ValueError):
+        build_presentation_model(
+            df=_get_df(), conditional_formats=[CellValueRule("<", 0, style, ["e"])]
+        )
+    with raises(ValueError):
+        build_presentation_model(
+            df=_get_df(), conditional_formats=[CellValueRule("~", 0, style)]
+        )
+    with raises(ValueError):
+        build_presentation_model(
+            df=_get_df(), conditional_formats=[CellValueRule("between", 0, style)]
+        )
+
+
+def test_conditional_formats_nested_models() -> None:
+    rule = ColorScale("#F8696B", "#63BE7B", columns=["a"])
+    df = _get_df().astype(object)
+    df.iloc[0, 1] = build_presentation_model(df=_get_df())
+    # the rule only applies to column a, the nested model is in column b
+    pm = build_presentation_model(df=df, conditional_formats=[rule])
+    compiled = CompiledLayout.from_layout([pm])
+    [(_, [(r1, c1, r2, c2)])] = compiled.conditional_formats
+    assert (r1, c1, c2) == (1, 1, 1)
+
+    pm = build_presentation_model(
+        df=df, conditional_formats=[rule._replace(columns=["a", "b"])]
+    )
+    with raises(ValueError):
+        OpenPyxlCompositor.to_xlsx(layout=[pm], output_fp=io.BytesIO())
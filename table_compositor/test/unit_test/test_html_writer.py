@@ -1,11 +1,15 @@
 import os
+import re
 import typing as tp
 
 import numpy as np
-from pytest import mark
+import pandas as pd
+from pytest import mark, raises
 
 import table_compositor.html_writer as htmlw
+from table_compositor.html_styles import HTMLWriterDefaults
 from table_compositor.presentation_model import PresentationModel
+from table_compositor.table_compositor import build_presentation_model
 from table_compositor.test.unit_test.conftest import LayoutT, Scenario, get_scenarios
 from table_compositor.util import df_type_to_str
 
@@ -85,3 +89,118 @@ def test_html_writer(scenario: Scenario) -> None:
     with open(expected_fp) as f:
         expected_str = f.read()
         assert expected_str == actual_html_str
+
+
+def _get_mixed_df() -> pd.DataFrame:
+    return pd.DataFrame(
+        data=dict(
+            a=[0.1, np.nan, np.inf, 1234.5],
+            b=[100, 200, -300, 4000],
+            c=[True, False, True, False],
+            d=["x", 1, 2.5, None],
+            e=pd.to_datetime(["2020-01-01"] * 4),
+        ),
+        index=[1, 2, 3, 4],
+    )
+
+
+def test_data_column_style_func_matches_data_style_func() -> None:
+    df = _get_mixed_df()
+    cell_style_func = HTMLWriterDefaults.data_style_func(df)
+    column_style_func = HTMLWriterDefaults.data_column_style_func(df)
+
+    for c in df.columns:
+        expected = [cell_style_func(r, c) for r in df.index]
+        assert list(column_style_func(c)) == expected
+
+
+@mark.parametrize("dollar_columns", [None, {"a", "b", "c", "d"}])
+def test_data_column_value_func_matches_data_value_func(dollar_columns) -> None:
+    df = _get_mixed_df()
+    cell_value_func = HTMLWriterDefaults.data_value_func(df, dollar_columns)
+    column_value_func = HTMLWriterDefaults.data_column_value_func(df, dollar_columns)
+
+    for c in df.columns:
+        expected = [cell_value_func(r, c) for r in df.index]
+        actual = list(column_value_func(c))
+        assert actual == expected
+        assert [type(v) for v in actual] == [type(v) for v in expected]
+
+
+def test_data_column_funcs_static_frame() -> None:
+    import static_frame as sf
+
+    df = _get_mixed_df()
+    frame = sf.Frame.from_pandas(df)
+    for c in df.columns:
+        # the values of the column are converted, not its index labels
+        assert list(HTMLWriterDefaults.data_column_value_func(frame)(c)) == list(
+            HTMLWriterDefaults.data_column_value_func(df)(c)
+        )
+        assert list(HTMLWriterDefaults.data_column_style_func(frame)(c)) == list(
+            HTMLWriterDefaults.data_column_style_func(df)(c)
+        )
+
+
+def test_html_default_style_is_column_level() -> None:
+    df = _get_mixed_df()
+    pm = build_presentation_model(df=df, output_format="html")
+    cell_style_func = HTMLWriterDefaults.data_style_func(df)
+
+    for c in df.columns:
+        for r in df.index:
+            style = pm.data.style.loc[r, c]
+            assert style.user_style == cell_style_func(r, c)
+
+
+def test_data_column_value_func_with_data_value_func_raises() -> None:
+    df = _get_mixed_df()
+    with raises(ValueError):
+        build_presentation_model(
+            df=df,
+            output_format="html",
+            data_value_func=HTMLWriterDefaults.data_value_func(df),
+            data_column_value_func=HTMLWriterDefaults.data_column_value_func(df),
+        )
+
+
+def _html_columns(html: str) -> tp.Dict[str, int]:
+    """
+    Return the column of the value of each td in the table, taking the row and column spans into account
+    """
+    columns = {}
+    covered: tp.Dict[tp.Tuple[int, int], bool] = {}
+    for row, tr in enumerate(re.findall(r"<tr>(.*?)</tr>", html, flags=re.DOTALL)):
+        col = 0
+        for attrs, value in re.findall(r"<td([^>]*)>(.*?)</td>", tr):
+            while covered.get((row, col)):
+                col += 1
+            spans = dict(re.findall(r"(\w+)='(\d+)'", attrs))
+            for r in range(int(spans.get("rowspan", 1))):
+                for c in range(int(spans.get("colspan", 1))):
+                    covered[(row + r, col + c)] = True
+            columns[value] = col
+            col += int(spans.get("colspan", 1))
+    return columns
+
+
+def test_html_writer_nested_models_of_different_sizes() -> None:
+    large = build_presentation_model(
+        df=pd.DataFrame(dict(a=[1, 2], b=[3, 4])), output_format="html"
+    )
+    small = build_presentation_model(df=pd.DataFrame(dict(a=[5])), output_format="html")
+    outer = build_presentation_model(
+        df=pd.DataFrame(dict(x=[0, 0], y=["y0", "y1"])), output_format="html"
+    )
+    values = outer.data.values.astype(object)
+    values.iloc[0, 0], values.iloc[1, 0] = large, small
+    outer = outer._replace(data=outer.data._replace(values=values))
+
+    html = htmlw.HTMLWriter.to_html([outer])
+    # the nested models are flattened into the outer table
+    assert html.count("<table") == 1
+    columns = _html_columns(html)
+    # the small nested model leaves a gap that is filled, so that the
+    # cells of the y column stay in their column
+    assert columns["y"] == columns["y0"] == columns["y1"] == 4
+    assert columns["b"] == columns["4"] == 3
@@ -0,0 +1,8 @@
+from pytest import mark
+
+from table_compositor.benchmarks.import_time import MODULES, time_import
+
+
+@mark.parametrize("module", MODULES)
+def test_engines_are_imported_lazily(module: str) -> None:
+    assert time_import(module, repeat=1)["loaded"] == []
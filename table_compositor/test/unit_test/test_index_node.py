@@ -2,6 +2,7 @@ import unittest
 
 import pandas as pd
 
+import table_compositor.presentation_model as ptm
 import table_compositor.table_compositor as pdpr
 
 
@@ -260,6 +261,55 @@ class TestUnit(unittest.TestCase):
         self.assertEqual(locs.children[1].children[1].key, ("b", 2))
         self.assertEqual(locs.children[1].children[1].data, (5, 13, 5, 15))  # +3 cols
 
+    def test_index_node_cached_index_to_index_node(self):
+        pdpr.IndexNode.cache_clear()
+        root = pdpr.IndexNode.cached_index_to_index_node(self.multi_df.index)
+        # the same labels share the tree
+        same = pdpr.IndexNode.cached_index_to_index_node(self.multi_df.index.copy())
+        self.assertIs(root, same)
+        # labels that compare equal but have a different type do not
+        ints = pdpr.IndexNode.cached_index_to_index_node(pd.Index([1, 2], dtype=object))
+        bools = pdpr.IndexNode.cached_index_to_index_node(
+            pd.Index([True, 2], dtype=object)
+        )
+        self.assertIsNot(ints, bools)
+        self.assertIs(type(bools.children[0].value), bool)
+
+    def test_index_node_cached_resolve_loc(self):
+        pdpr.IndexNode.cache_clear()
+        col_widths = {("a", 1): 2, ("a", 2): 2, ("b", 1): 2, ("b", 2): 3}
+        for _ in range(2):
+            root = pdpr.IndexNode.cached_index_to_index_node(self.multi_df_1.columns)
+            locs = pdpr.IndexNode.cached_resolve_loc(root, (2, 3, 2, 3), col_widths)
+            self.assert_multi_column_resolve_loc(locs)
+
+        row_hts = {("a", 1): 2, ("a", 2): 2, ("b", 1): 2, ("b", 2): 3}
+        for _ in range(2):
+            root = pdpr.IndexNode.cached_index_to_index_node(self.multi_df.index)
+            locs = pdpr.IndexNode.cached_resolve_loc(
+                root, (2, 3, 2, 3), row_hts, vertical=True
+            )
+            self.assert_multi_index_resolve_loc(locs)
+
+        # different widths are resolved again
+        col_widths = {"a": 2, "b": 2, "c": 3}
+        root = pdpr.IndexNode.cached_index_to_index_node(self.simple_df.columns)
+        pdpr.IndexNode.cached_resolve_loc(root, (2, 3, 2, 3), {"a": 1, "b": 1, "c": 1})
+        locs = pdpr.IndexNode.cached_resolve_loc(root, (2, 3, 2, 3), col_widths)
+        self.assert_simple_column_resolve_loc(locs)
+
+    def test_index_node_large_index_is_not_cached(self):
+        pdpr.IndexNode.cache_clear()
+        size = ptm._MAX_CACHED_SIZE + 1
+        df = pd.DataFrame(dict(a=range(size)))
+        pm = pdpr.build_presentation_model(df=df)
+        ptm.PresentationLayoutManager.resolve_loc(pm)
+        # the tree of the header is cached, but not the tree and offsets of the index
+        self.assertEqual(len(ptm._INDEX_TREE_CACHE), 1)
+        self.assertEqual(len(ptm._RESOLVED_LOC_CACHE), 1)
+        root = pdpr.IndexNode.cached_index_to_index_node(df.index)
+        self.assertIsNot(root, pdpr.IndexNode.cached_index_to_index_node(df.index))
+
 
 if __name__ == "__main__":
     unittest.main()
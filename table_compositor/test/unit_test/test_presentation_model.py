@@ -2,6 +2,7 @@ import unittest
 import warnings
 
 import pandas as pd
+import static_frame as sf
 
 import table_compositor.presentation_model as ptm
 import table_compositor.table_compositor as tc
@@ -464,6 +465,253 @@ class TestUnit(unittest.TestCase):
         self.assertListEqual(df_actual["a"].values.tolist(), [10] * 3)
         self.assertListEqual(df_actual["b"].values.tolist(), [10] * 3)
 
+    def test_presentation_model_static_frame_is_not_converted_to_pandas(self):
+        frame = sf.Frame.from_pandas(self.multi_df)
+        pm = tc.build_presentation_model(df=frame)
+
+        self.assertIs(pm.data.values, frame)
+        self.assertIsInstance(pm.data.style, sf.Frame)
+
+        internal_frame = ptm.InternalFrame(frame)
+        root = ptm.IndexNode.index_to_index_node(internal_frame.columns)
+        self.assertIsNone(internal_frame.columns._pandas_index)
+        self.assertEqual([c.key for c in root.children], [("a",), ("b",)])
+        self.assertEqual(
+            [c.key for c in root.children[0].children], [("a", 1), ("a", 2)]
+        )
+
+    def test_presentation_model_resolve_loc_static_frame(self):
+        expected = ptm.PresentationLayoutManager.resolve_loc(self.multi_pm)
+        frame = sf.Frame.from_pandas(self.multi_df)
+        pm = tc.build_presentation_model(df=frame)
+        actual = ptm.PresentationLayoutManager.resolve_loc(pm)
+
+        self.assertIsInstance(actual.locs.data_loc, sf.Frame)
+        self.assertEqual(
+            actual.locs.data_loc.values.tolist(),
+            expected.locs.data_loc.values.tolist(),
+        )
+        self.assertEqual(
+            ptm.to_row_col_dict(actual).keys(), ptm.to_row_col_dict(expected).keys()
+        )
+
+    def test_build_presentation_model_raises_on_invalid_index(self):
+        df = pd.DataFrame(dict(a=[1, 2, 3]), index=["x", "y", "x"])
+        with self.assertRaisesRegex(ValueError, "index not unique"):
+            tc.build_presentation_model(df=df)
+
+        df = pd.DataFrame(
+            [[1, 2, 3, 4]],
+            columns=pd.MultiIndex.from_tuples([("a", 1), ("a", 2), ("b", 1), ("a", 3)]),
+        )
+        with self.assertRaisesRegex(ValueError, "columns not contiguous"):
+            tc.build_presentation_model(df=df)
+        with self.assertRaisesRegex(ValueError, "columns not contiguous"):
+            tc.build_presentation_model(df=sf.Frame.from_pandas(df))
+
+        # hidden or already validated indices are not checked
+        tc.build_presentation_model(df=df, hide_header=True)
+        tc.build_presentation_model(df=df, validate_index=False)
+
+    def test_build_presentation_model_contiguous_multi_index(self):
+        df = pd.DataFrame(
+            [[1, 2, 3, 4]],
+            columns=pd.MultiIndex.from_tuples([("b", 1), ("b", 2), ("a", 1), ("c", 3)]),
+        )
+        tc.build_presentation_model(df=df)
+        tc.build_presentation_model(df=sf.Frame.from_pandas(df))
+
+    def test_refresh_presentation_model_reuses_locs(self):
+        pm_and_loc = ptm.PresentationLayoutManager.resolve_loc(self.multi_pm)
+        new_df = self.multi_df * 2
+        refreshed = tc.refresh_presentation_model(pm_and_loc, new_df)
+
+        self.assertIs(refreshed.locs, pm_and_loc.locs)
+        self.assertIs(refreshed.model.data.style, pm_and_loc.model.data.style)
+        self.assertIs(refreshed.model.header, pm_and_loc.model.header)
+
+        expected = ptm.to_row_col_dict(
+            ptm.PresentationLayoutManager.resolve_loc(
+                tc.build_presentation_model(df=new_df)
+            )
+        )
+        actual = ptm.to_row_col_dict(refreshed)
+        self.assertEqual(
+            {k: v.value for k, v in actual.items()},
+            {k: v.value for k, v in expected.items()},
+        )
+        # resolved models are not resolved again
+        self.assertIs(ptm.PresentationLayoutManager.resolve_loc(refreshed), refreshed)
+
+    def test_refresh_presentation_model_with_value_funcs(self):
+        df = self.simple_df
+        refreshed = tc.refresh_presentation_model(
+            self.simple_pm, df, data_value_func=lambda i, c: str(df.loc[i, c])
+        )
+        self.assertIsInstance(refreshed, ptm.PresentationModel)
+        self.assertEqual(refreshed.data.values.loc[1, "b"], "100")
+
+        refreshed = tc.refresh_presentation_model(
+            self.simple_pm, df, data_column_value_func=lambda c: df[c].values * 2
+        )
+        self.assertEqual(refreshed.data.values.loc[1, "b"], 200)
+
+        frame = sf.Frame.from_pandas(df)
+        pm = tc.build_presentation_model(df=frame)
+        refreshed = tc.refresh_presentation_model(pm, frame)
+        self.assertIs(refreshed.data.values, frame)
+
+    def test_refresh_presentation_model_keeps_nested_models(self):
+        pm = tc.build_presentation_model(df=self.multi_df_1)
+        inner_pm = tc.build_presentation_model(df=self.multi_df_1)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            pm.data.values.loc[("a", 1), ("a", 1)] = inner_pm
+
+        refreshed = tc.refresh_presentation_model(pm, self.multi_df_1)
+        self.assertIs(refreshed.data.values.loc[("a", 1), ("a", 1)], inner_pm)
+        self.assertEqual(refreshed.data.values.loc[("a", 2), ("a", 1)], 0.2)
+
+    def test_refresh_presentation_model_raises_on_different_labels(self):
+        with self.assertRaises(ValueError):
+            tc.refresh_presentation_model(
+                self.simple_pm, self.simple_df.rename(index={1: 4})
+            )
+        with self.assertRaises(ValueError):
+            tc.refresh_presentation_model(
+                self.simple_pm, self.simple_df.rename(columns=dict(a="d"))
+            )
+
+    def test_build_presentation_model_level_funcs(self):
+        calls = []
+
+        def header_level_value_func(level, values, keys):
+            calls.append((level, list(values), keys))
+            return ["{}-{}".format(level, v) for v in values]
+
+        pm = tc.build_presentation_model(
+            df=self.multi_df,
+            header_level_value_func=header_level_value_func,
+            index_level_style_func=lambda level, values, keys: [dict(level=level)]
+            * len(values),
+        )
+        self.assertEqual(
+            calls,
+            [
+                (0, ["a", "b"], [("a",), ("b",)]),
+                (1, [1, 2, 1], [("a", 1), ("a", 2), ("b", 1)]),
+            ],
+        )
+
+        # same result as the node level funcs
+        expected = tc.build_presentation_model(
+            df=self.multi_df,
+            header_value_func=lambda node: "{}-{}".format(
+                len(node.key) - 1, node.value
+            ),
+            index_style_func=lambda node: dict(level=len(node.key) - 1),
+        )
+        self.assertEqual(
+            ptm.to_row_col_dict(ptm.PresentationLayoutManager.resolve_loc(pm)),
+            ptm.to_row_col_dict(ptm.PresentationLayoutManager.resolve_loc(expected)),
+        )
+
+        with self.assertRaises(ValueError):
+            tc.build_presentation_model(
+                df=self.multi_df, header_level_value_func=lambda *args: ["x"]
+            )
+        with self.assertRaises(ValueError):
+            tc.build_presentation_model(
+                df=self.multi_df,
+                index_value_func=lambda node: node.value,
+                index_level_value_func=lambda level, values, keys: values,
+            )
+
+    def test_presentation_model_resolve_loc_nested_same_shape(self):
+        ptm.IndexNode.cache_clear()
+        df = pd.DataFrame(dict(a=[1, 2], b=[3, 4]))
+        inner = [tc.build_presentation_model(df=df * i) for i in range(1, 4)]
+        inner.append(tc.build_presentation_model(df=df * 4, hide_index=True))
+        outer = tc.build_presentation_model(df=pd.DataFrame(dict(x=[0, 0], y=[0, 0])))
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            values = outer.data.values.astype(object)
+            values.iloc[0, 0], values.iloc[0, 1] = inner[0], inner[1]
+            values.iloc[1, 0], values.iloc[1, 1] = inner[2], inner[3]
+        outer = outer._replace(data=outer.data._replace(values=values))
+
+        locs = ptm.PresentationLayoutManager.resolve_loc(outer)
+        data_loc = locs.locs.data_loc.values
+        self.assertEqual([pm_and_loc.model for pm_and_loc in data_loc.ravel()], inner)
+        # each nested model is 3 rows high and 3 columns wide (2 with the hidden index)
+        starts = [(1, 1), (1, 4), (4, 1), (4, 4)]
+        for pm_and_loc, (row, col) in zip(data_loc.ravel(), starts):
+            # the layout is the same as resolving the nested model alone
+            expected = ptm.to_row_col_dict(
+                ptm.PresentationLayoutManager.resolve_loc(
+                    pm_and_loc.model, (row, col, row, col), 1
+                )
+            )
+            self.assertEqual(ptm.to_row_col_dict(pm_and_loc), expected)
+
+    def test_style_registry(self):
+        # equal styles share one wrapper, whatever the order of their keys
+        wrapper = ptm.StyleRegistry.wrap(dict(bold=True, font_color="red"))
+        self.assertIs(
+            ptm.StyleRegistry.wrap(dict(font_color="red", bold=True)), wrapper
+        )
+        self.assertIsNotNone(wrapper.style_id)
+        self.assertNotEqual(ptm.StyleRegistry.wrap(dict(bold=False)), wrapper)
+
+        # unhashable styles are registered by identity
+        style = dict(borders=[1, 2])
+        self.assertEqual(
+            ptm.StyleRegistry.wrap(style).style_id,
+            ptm.StyleRegistry.wrap(style).style_id,
+        )
+        self.assertNotEqual(
+            ptm.StyleRegistry.wrap(style).style_id,
+            ptm.StyleRegistry.wrap(dict(borders=[1, 2])).style_id,
+        )
+
+        # the ids are stable across models
+        pm1 = tc.build_presentation_model(df=self.simple_df)
+        pm2 = tc.build_presentation_model(df=self.simple_df * 2)
+        self.assertEqual(
+            pm1.data.style.values[0, 0].style_id, pm2.data.style.values[0, 0].style_id
+        )
+        self.assertEqual(
+            ptm.StyleRegistry.style_id(ptm.StyleWrapper(user_style=dict(bold=True))),
+            ptm.StyleRegistry.wrap(dict(bold=True)).style_id,
+        )
+
+    def test_style_registry_style_mutated(self):
+        style = dict(number_format="0.00")
+        wrapper = ptm.StyleRegistry.wrap(style)
+        # a style changed after it is registered does not change the registry
+        style["number_format"] = "0%"
+        self.assertEqual(wrapper.user_style, dict(number_format="0.00"))
+        self.assertIs(ptm.StyleRegistry.wrap(dict(number_format="0.00")), wrapper)
+        self.assertEqual(
+            ptm.StyleRegistry.wrap(style).user_style, dict(number_format="0%")
+        )
+
+    def test_style_registry_is_bounded(self):
+        maxsize = ptm._STYLE_WRAPPERS.maxsize
+        ptm._STYLE_WRAPPERS.maxsize = 4
+        try:
+            # a style computed for each cell
+            wrappers = [
+                ptm.StyleRegistry.wrap(dict(font_color=str(i))) for i in range(10)
+            ]
+            self.assertEqual(len(ptm._STYLE_WRAPPERS), 4)
+            # an evicted style gets a new id, the ids are never reused
+            wrapper = ptm.StyleRegistry.wrap(dict(font_color="0"))
+            ids = [w.style_id for w in wrappers + [wrapper]]
+            self.assertEqual(len(set(ids)), len(ids))
+        finally:
+            ptm._STYLE_WRAPPERS.maxsize = maxsize
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,122 @@
+import os
+import tempfile
+
+import pandas as pd
+from pytest import raises
+
+from table_compositor.html_writer import HTMLWriter
+from table_compositor.render_cache import RenderCache
+from table_compositor.table_compositor import build_presentation_model
+from table_compositor.xlsx_writer import OpenPyxlCompositor, XlsxWriterCompositor
+
+
+class _LayoutFunc:
+    def __init__(self, output_format="xlsx", engine="openpyxl"):
+        self.output_format = output_format
+        self.engine = engine
+        self.calls = 0
+
+    def __call__(self, frames):
+        self.calls += 1
+        return [
+            build_presentation_model(
+                df=df, output_format=self.output_format, engine=self.engine
+            )
+            for df in frames
+        ]
+
+
+def _get_df(**kwargs) -> pd.DataFrame:
+    return pd.DataFrame(dict(a=[1, 2, 3], b=[0.5, 1.5, 2.5]), **kwargs)
+
+
+def test_to_html_is_cached() -> None:
+    cache = RenderCache()
+    layout_func = _LayoutFunc(output_format="html")
+    expected = HTMLWriter.to_html(layout_func([_get_df()]))
+
+    for _ in range(2):
+        html = cache.to_html(frames=[_get_df()], layout_func=layout_func, version=1)
+        assert html == expected
+    assert layout_func.calls == 2
+
+
+def test_key_changes_with_content() -> None:
+    key = RenderCache.key([_get_df()], "writer", 1)
+    assert key == RenderCache.key([_get_df()], "writer", 1)
+
+    df = _get_df()
+    df.iloc[0, 0] = 10
+    assert key != RenderCache.key([df], "writer", 1)
+    assert key != RenderCache.key([_get_df(index=[3, 4, 5])], "writer", 1)
+    assert key != RenderCache.key([_get_df().rename(columns=dict(a="c"))], "writer", 1)
+    assert key != RenderCache.key([[_get_df()]], "writer", 1)
+    assert key != RenderCache.key([_get_df()], "writer", 2)
+    assert key != RenderCache.key([_get_df()], "other", 1)
+    assert key != RenderCache.key([_get_df()], "writer", 1, column_width=10)
+
+
+def test_key_ignores_instrument() -> None:
+    cache = RenderCache()
+    layout_func = _LayoutFunc()
+    stages = []
+    for _ in range(2):
+        # a new callback for each call, as in separate processes
+        cache.to_xlsx(
+            OpenPyxlCompositor,
+            frames=[_get_df()],
+            layout_func=layout_func,
+            version=1,
+            instrument=lambda stage, elapsed, **attrs: stages.append(stage),
+        )
+    assert layout_func.calls == 1
+    assert stages
+
+    # other callables can not be keyed, and mixed types are sorted by name
+    with raises(ValueError):
+        RenderCache.key([_get_df()], "writer", 1, style=lambda x: x)
+    assert RenderCache.key([_get_df()], "writer", 1, a=1, b="x") == RenderCache.key(
+        [_get_df()], "writer", 1, b="x", a=1
+    )
+
+
+def test_to_xlsx_disk_cache_is_shared() -> None:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for compositor, engine in (
+            (OpenPyxlCompositor, "openpyxl"),
+            (XlsxWriterCompositor, "xlsxwriter"),
+        ):
+            layout_func = _LayoutFunc(engine=engine)
+            data = RenderCache(directory=tmp_dir).to_xlsx(
+                compositor, frames=[_get_df()], layout_func=layout_func, version=1
+            )
+            assert data[:2] == b"PK"
+            # a new cache, for example in another process, reads the file
+            cached = RenderCache(directory=tmp_dir).to_xlsx(
+                compositor, frames=[_get_df()], layout_func=layout_func, version=1
+            )
+            assert cached == data
+            assert layout_func.calls == 1
+        assert len(os.listdir(tmp_dir)) == 2
+
+
+def test_eviction() -> None:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = RenderCache(max_entries=1, directory=tmp_dir, max_bytes=1)
+        layout_func = _LayoutFunc(output_format="html")
+        for i in range(3):
+            cache.to_html(
+                frames=[_get_df(index=[i, 4, 5])], layout_func=layout_func, version=1
+            )
+        assert len(cache._entries) == 1
+        # no file fits in one byte
+        assert not os.listdir(tmp_dir)
+
+        cache.clear()
+        assert not cache._entries
+        assert not os.listdir(tmp_dir)
+
+
+def test_only_pandas_frames_are_hashed() -> None:
+    with raises(ValueError):
+        RenderCache.key([[1, 2]], "writer", 1)
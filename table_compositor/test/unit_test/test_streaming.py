@@ -0,0 +1,123 @@
+import io
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+from pytest import raises
+
+from table_compositor.conditional_formats import ColorScale
+from table_compositor.html_writer import HTMLWriter
+from table_compositor.streaming import StreamingCompositor
+from table_compositor.table_compositor import build_presentation_model
+from table_compositor.xlsx_writer import XlsxWriterCompositor
+
+
+def _get_df() -> pd.DataFrame:
+    df = pd.DataFrame(
+        dict(a=np.arange(10), b=np.arange(10) * 1.5, c=list("abcdefghij")),
+        index=pd.Index(["r{}".format(i) for i in range(10)], name="rows"),
+    )
+    df.columns = pd.MultiIndex.from_tuples([("g1", "a"), ("g1", "b"), ("g2", "c")])
+    return df
+
+
+def _chunks(df, size=4):
+    for start in range(0, len(df), size):
+        yield df.iloc[start : start + size]
+
+
+def _cells(ws):
+    return [
+        (c.coordinate, c.value, repr(c.font), repr(c.fill), repr(c.border))
+        for row in ws.iter_rows()
+        for c in row
+    ]
+
+
+def test_streaming_to_xlsx() -> None:
+    df = _get_df()
+    kwargs = dict(
+        engine="xlsxwriter", conditional_formats=[ColorScale("#F8696B", "#63BE7B")]
+    )
+    expected = io.BytesIO()
+    XlsxWriterCompositor.to_xlsx(
+        layout=[build_presentation_model(df=df, **kwargs)], output_fp=expected
+    )
+    output = io.BytesIO()
+    StreamingCompositor.to_xlsx(chunks=_chunks(df), output_fp=output, **kwargs)
+
+    ews = load_workbook(expected).active
+    ows = load_workbook(output).active
+    assert _cells(ows) == _cells(ews)
+    assert ows.merged_cells.ranges == ews.merged_cells.ranges
+    assert [str(cf.sqref) for cf in ows.conditional_formatting] == ["B3:D12"]
+
+
+def test_streaming_to_xlsx_default_engine() -> None:
+    df = _get_df()
+    expected = io.BytesIO()
+    XlsxWriterCompositor.to_xlsx(
+        layout=[build_presentation_model(df=df, engine="xlsxwriter")],
+        output_fp=expected,
+    )
+    # the chunks are built with the XlsxWriter styles without passing the engine
+    output = io.BytesIO()
+    StreamingCompositor.to_xlsx(chunks=_chunks(df), output_fp=output)
+    assert _cells(load_workbook(output).active) == _cells(
+        load_workbook(expected).active
+    )
+
+    with raises(ValueError):
+        StreamingCompositor.to_xlsx(
+            chunks=_chunks(df), output_fp=io.BytesIO(), engine="openpyxl"
+        )
+
+
+def test_streaming_to_html() -> None:
+    df = _get_df()
+    expected = HTMLWriter.to_html(build_presentation_model(df=df, output_format="html"))
+    output = io.StringIO()
+    StreamingCompositor.to_html(chunks=_chunks(df), output_fp=output)
+    assert output.getvalue() == expected
+
+
+def test_streaming_columns_differ() -> None:
+    df = _get_df()
+    chunks = [df.iloc[:4], df.iloc[4:].droplevel(0, axis=1)]
+    with raises(ValueError):
+        StreamingCompositor.to_html(chunks=chunks, output_fp=io.StringIO())
+
+
+def test_streaming_to_xlsx_paginate(monkeypatch) -> None:
+    # a worksheet of 6 rows and 3 columns holds the header, the index and 4x2 data cells
+    monkeypatch.setattr(XlsxWriterCompositor, "MAX_ROWS", 6)
+    monkeypatch.setattr(XlsxWriterCompositor, "MAX_COLS", 3)
+    df = _get_df()
+    kwargs = dict(
+        engine="xlsxwriter", conditional_formats=[ColorScale("#F8696B", "#63BE7B")]
+    )
+    with raises(ValueError):
+        StreamingCompositor.to_xlsx(
+            chunks=_chunks(df), output_fp=io.BytesIO(), **kwargs
+        )
+
+    expected = io.BytesIO()
+    XlsxWriterCompositor.to_xlsx(
+        layout=[build_presentation_model(df=df, **kwargs)],
+        output_fp=expected,
+        paginate=True,
+    )
+    output = io.BytesIO()
+    # the chunks are split at the end of each worksheet
+    StreamingCompositor.to_xlsx(
+        chunks=_chunks(df, size=3), output_fp=output, paginate=True, **kwargs
+    )
+
+    expected_sheets = load_workbook(expected).worksheets
+    sheets = load_workbook(output).worksheets
+    # 3 worksheets of rows by 2 worksheets of columns
+    assert len(sheets) == len(expected_sheets) == 6
+    for ows, ews in zip(sheets, expected_sheets):
+        assert _cells(ows) == _cells(ews)
+        assert ows.merged_cells.ranges == ews.merged_cells.ranges
+    assert [str(cf.sqref) for cf in sheets[4].conditional_formatting] == ["B3:C4"]
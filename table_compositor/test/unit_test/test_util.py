@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+from pytest import mark
+
+from table_compositor.util import (
+    array_type_to_str,
+    column_type_to_str,
+    df_type_to_str,
+)
+
+
+def _assert_same_as_df_type_to_str(values, actual) -> None:
+    expected = [df_type_to_str(v) for v in values]
+    assert list(actual) == expected
+    assert [type(v) for v in actual] == [type(v) for v in expected]
+
+
+@mark.parametrize(
+    "values",
+    [
+        np.array([True, False]),
+        np.array([1, -2, 3], dtype=np.int64),
+        np.array([1, 2], dtype=np.uint64),
+        np.array([0.1, np.nan, np.inf, -np.inf]),
+        np.array(["a", "bc"]),
+        np.array(["a", 1, 2.5, np.nan, None, (1, 2), pd.NaT], dtype=object),
+    ],
+)
+def test_array_type_to_str(values: np.ndarray) -> None:
+    _assert_same_as_df_type_to_str(values, array_type_to_str(values))
+
+
+def test_array_type_to_str_decodes_bytes() -> None:
+    # the elements of a bytes array are decoded in the same way as python bytes
+    values = np.array([b"a", b"bc"])
+    _assert_same_as_df_type_to_str(values.tolist(), array_type_to_str(values))
+
+
+def test_array_type_to_str_2d() -> None:
+    values = np.array([[0.1, np.nan], [np.inf, 2.0]])
+    actual = array_type_to_str(values)
+
+    assert actual.shape == values.shape
+    assert actual.dtype == object
+    assert actual.tolist() == [[0.1, "NaN"], ["inf", 2.0]]
+
+
+def test_column_type_to_str_boxes_datetimes() -> None:
+    column = pd.Series(pd.to_datetime(["2020-01-01", None]))
+    _assert_same_as_df_type_to_str(list(column), column_type_to_str(column))
+
+
+def test_build_presentation_model_with_use_convert() -> None:
+    import table_compositor.table_compositor as tbc
+
+    df = pd.DataFrame(dict(a=[0.1, np.nan], b=[b"x", b"y"], c=[1, 2]))
+    pm = tbc.build_presentation_model(df=df, use_convert=True)
+
+    assert pm.data.values["a"].tolist() == [0.1, "NaN"]
+    assert pm.data.values["b"].tolist() == ["x", "y"]
+    assert [type(v) for v in pm.data.values["c"]] == [int, int]
+
+
+def test_column_type_to_str_static_frame() -> None:
+    import static_frame as sf
+
+    df = pd.DataFrame(
+        dict(a=["x", None], b=pd.to_datetime(["2020-01-01", None]), c=[1, 2]),
+        index=["r1", "r2"],
+    )
+    frame = sf.Frame.from_pandas(df)
+    for c in df.columns:
+        # the values of the column are converted, not its index labels
+        assert list(column_type_to_str(frame[c])) == list(column_type_to_str(df[c]))
+
+    import table_compositor.table_compositor as tbc
+
+    pm = tbc.build_presentation_model(df=frame, use_convert=True)
+    assert pm.data.values["a"].values.tolist() == ["x", "None"]
@@ -0,0 +1,94 @@
+import io
+import zipfile
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+from pytest import mark, raises
+
+from table_compositor.table_compositor import build_presentation_model
+from table_compositor.xlsx_template import XlsxTemplate
+from table_compositor.xlsx_writer import OpenPyxlCompositor, XlsxWriterCompositor
+
+
+def _get_df(seed: int):
+    rs = np.random.RandomState(seed)
+    df = pd.DataFrame(
+        dict(
+            a=rs.randint(0, 100, 4),
+            b=rs.rand(4),
+            c=["x", " y", "<&>", "ü{}".format(seed)],
+            d=rs.rand(4) > 0.5,
+        ),
+        index=pd.Index(["r{}".format(i + seed) for i in range(4)], name="rows"),
+    )
+    df.columns = pd.MultiIndex.from_tuples(
+        [("g1", "a"), ("g1", "b"), ("g2", "c"), ("g2", "d")]
+    )
+    df.iloc[1, 1] = np.nan
+    return df
+
+
+def _get_layout(df, engine):
+    nested = build_presentation_model(df=df.iloc[:2, :2], engine=engine)
+    return [build_presentation_model(df=df, engine=engine), [nested, nested]]
+
+
+def _cells(data):
+    ws = load_workbook(io.BytesIO(data)).active
+    # openpyxl writes floats with fewer digits than the template
+    return [
+        [
+            (
+                round(c.value, 12) if isinstance(c.value, float) else c.value,
+                c.font.b,
+                c.fill.fgColor.rgb,
+                c.number_format,
+            )
+            for c in row
+        ]
+        for row in ws.iter_rows()
+    ], sorted(str(r) for r in ws.merged_cells.ranges)
+
+
+@mark.parametrize(
+    "compositor,engine",
+    [(OpenPyxlCompositor, "openpyxl"), (XlsxWriterCompositor, "xlsxwriter")],
+)
+def test_xlsx_template(compositor, engine) -> None:
+    template = XlsxTemplate.from_layout(
+        _get_layout(_get_df(0), engine), compositor=compositor
+    )
+    for seed in (1, 2):
+        layout = _get_layout(_get_df(seed), engine)
+        expected = io.BytesIO()
+        compositor.to_xlsx(layout=layout, output_fp=expected)
+
+        output = io.BytesIO()
+        template.to_xlsx(layout=layout, output_fp=output)
+        assert _cells(output.getvalue()) == _cells(expected.getvalue())
+
+
+@mark.parametrize(
+    "compositor,engine",
+    [(OpenPyxlCompositor, "openpyxl"), (XlsxWriterCompositor, "xlsxwriter")],
+)
+def test_xlsx_template_drops_template_values(compositor, engine) -> None:
+    df = _get_df(0)
+    df.iloc[:, 2] = "TEMPLATE_SECRET"
+    template = XlsxTemplate.from_layout(_get_layout(df, engine), compositor=compositor)
+    output = template.render(_get_layout(_get_df(1), engine))
+
+    # no text of the cells of the template is left in any part of the output
+    with zipfile.ZipFile(io.BytesIO(output)) as zf:
+        parts = b"".join(zf.read(name) for name in zf.namelist())
+    assert b"TEMPLATE_SECRET" not in parts
+
+
+def test_xlsx_template_shape_mismatch() -> None:
+    df = _get_df(0)
+    template = XlsxTemplate.from_layout(_get_layout(df, "openpyxl"))
+    with raises(ValueError):
+        template.render(_get_layout(df.iloc[:3], "openpyxl"))
+    with raises(ValueError):
+        template.render([build_presentation_model(df=df.T)])
@@ -64,3 +64,141 @@ def test_xlsx_writer(scenario: Scenario) -> None:
         expected_fp = get_expected_output_folder(expected_fname)
 
         _compare(expected_fp, output_fp)
+
+
+@mark.parametrize("compositor", ["OpenPyxlCompositor", "XlsxWriterCompositor"])
+def test_instrument_reports_each_stage(compositor: str) -> None:
+    import pandas as pd
+
+    import table_compositor.xlsx_writer as xlsxw
+    from table_compositor.table_compositor import build_presentation_model
+
+    calls = []
+
+    def instrument(stage, elapsed, **attrs):
+        assert elapsed >= 0
+        calls.append((stage, attrs))
+
+    engine = "openpyxl" if compositor == "OpenPyxlCompositor" else "xlsxwriter"
+    df = pd.DataFrame(dict(a=[1, 2, 3], b=[4, 5, 6]))
+    pm = build_presentation_model(df=df, engine=engine, instrument=instrument)
+    assert "instrument" not in pm.kwargs
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        getattr(xlsxw, compositor).to_xlsx(
+            layout=[pm, pm],
+            output_fp=os.path.join(tmp_dir, "output.xlsx"),
+            instrument=instrument,
+        )
+
+    stages = dict(calls)
+    assert [stage for stage, _ in calls] == [
+        "build_presentation_model.index_trees",
+        "build_presentation_model.value_view",
+        "build_presentation_model.style_view",
+        "build_presentation_model",
+        "compute_grid",
+        "shift_grid",
+        "to_row_col_dict",
+        "get_row_col_dict",
+        engine + ".write",
+        engine + ".save",
+    ]
+    assert stages["build_presentation_model"] == dict(cells=6, models=1)
+    assert stages["compute_grid"] == dict(models=2)
+    # each model has 6 data cells, 2 headers, 3 index labels and the index name
+    assert stages["get_row_col_dict"] == dict(cells=24, models=2)
+    assert stages[engine + ".write"] == dict(cells=24)
+
+
+def test_column_styles_set_once() -> None:
+    import io
+
+    import pandas as pd
+
+    from table_compositor.compiled_layout import CompiledLayout
+    from table_compositor.table_compositor import build_presentation_model
+    from table_compositor.xlsx_writer import XlsxWriterCompositor
+
+    df = pd.DataFrame(dict(a=[0.1, 0.2], b=[1, 2], c=[3, 4]))
+    styles = dict(a=dict(num_format="0.0%"), b=dict(num_format="0.00"))
+    # the background of column c would be visible on all blank cells of the column
+    styles["c"] = dict(num_format="0", bg_color="#FFC7CE")
+    layout = [
+        build_presentation_model(
+            df=df, engine="xlsxwriter", column_style_func=styles.__getitem__
+        )
+    ]
+    # a second model only agrees on the style of column a
+    other_styles = dict(a=styles["a"], b=dict(num_format="0.000"), c=styles["c"])
+    layout.append(
+        build_presentation_model(
+            df=df, engine="xlsxwriter", column_style_func=other_styles.__getitem__
+        )
+    )
+
+    column_styles = CompiledLayout.from_layout(layout).column_styles
+    assert {col: style.user_style for col, style in column_styles.items()} == {
+        1: styles["a"],
+        3: styles["c"],
+    }
+
+    output = io.BytesIO()
+    XlsxWriterCompositor.to_xlsx(layout=layout, output_fp=output)
+    ws = load_workbook(output).active
+    assert ws.column_dimensions["B"].number_format == "0.0%"
+    assert ws.column_dimensions["D"].number_format == "General"
+    # the cells written without a format take the format of the column
+    assert [ws.cell(row=r, column=2).number_format for r in (2, 3, 6, 7)] == [
+        "0.0%"
+    ] * 4
+    assert ws.cell(row=6, column=3).number_format == "0.000"
+    assert ws.cell(row=2, column=4).fill.fgColor.rgb == "FFFFC7CE"
+
+
+@mark.parametrize("compositor", ["OpenPyxlCompositor", "XlsxWriterCompositor"])
+def test_paginate(compositor: str, monkeypatch) -> None:
+    import io
+
+    import numpy as np
+    import pandas as pd
+    from pytest import raises
+
+    import table_compositor.xlsx_writer as xlsx_writer
+    from table_compositor.table_compositor import build_presentation_model
+
+    # a worksheet of 4 rows and 3 columns holds the header, the index and 3x2 data cells
+    monkeypatch.setattr(xlsx_writer._XLSXCompositor, "MAX_ROWS", 4)
+    monkeypatch.setattr(xlsx_writer._XLSXCompositor, "MAX_COLS", 3)
+    df = pd.DataFrame(
+        np.arange(30).reshape(6, 5),
+        columns=list("abcde"),
+        index=pd.Index(["r{}".format(i) for i in range(6)], name="rows"),
+    )
+    engine = "openpyxl" if compositor == "OpenPyxlCompositor" else "xlsxwriter"
+    layout = [build_presentation_model(df=df, engine=engine)]
+    compositor_cls = getattr(xlsx_writer, compositor)
+
+    with raises(ValueError):
+        compositor_cls.to_xlsx(layout=layout, output_fp=io.BytesIO())
+
+    output = io.BytesIO()
+    compositor_cls.to_xlsx(layout=layout, output_fp=output, paginate=True)
+    sheets = [
+        [[c.value for c in row] for row in ws.iter_rows()]
+        for ws in load_workbook(output).worksheets
+    ]
+    assert len(sheets) == 6
+    assert sheets[0] == [
+        ["rows", "a", "b"],
+        ["r0", 0, 1],
+        ["r1", 5, 6],
+        ["r2", 10, 11],
+    ]
+    assert sheets[2] == [["rows", "e"], ["r0", 4], ["r1", 9], ["r2", 14]]
+    assert sheets[4] == [
+        ["rows", "c", "d"],
+        ["r3", 17, 18],
+        ["r4", 22, 23],
+        ["r5", 27, 28],
+    ]
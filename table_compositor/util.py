@@ -1,13 +1,25 @@
+import contextlib
 import numbers
+import time
+from collections import OrderedDict
 
 import numpy as np
 import pandas as pd
 
+# types that df_type_to_str returns unchanged
+_PASS_THROUGH_TYPES = frozenset((str, int, bool))
+
+# dtype kinds that array_type_to_str converts in bulk
+BULK_CONVERTIBLE_KINDS = "biufSU"
+
 
 def df_type_to_str(i):
     """
     Convert into simple datatypes from pandas/numpy types
     """
+    if type(i) in _PASS_THROUGH_TYPES:
+        # fast path for values already converted, see `array_type_to_str`
+        return i
     if isinstance(i, np.bool_):
         return bool(i)
     if isinstance(i, np.int_):
@@ -30,3 +42,117 @@ def df_type_to_str(i):
         return i
 
     return str(i)
+
+
+def array_type_to_str(values):
+    """
+    Array level equivalent of `df_type_to_str`. Arrays of bool, int, float and string dtypes are converted in one pass, other dtypes fall back to calling `df_type_to_str` on each element.
+
+    Args:
+        values: a numpy array of any shape
+
+    Returns:
+        An object array of the same shape with simple python datatypes
+    """
+    kind = values.dtype.kind
+    if kind not in BULK_CONVERTIBLE_KINDS:
+        return np.frompyfunc(df_type_to_str, 1, 1)(values).astype(object)
+
+    if kind == "S":
+        values = np.char.decode(values, "UTF-8")
+
+    result = np.empty(values.shape, dtype=object)
+    result[...] = values.tolist() if values.ndim else values.item()
+    if kind == "f":
+        result[np.isnan(values)] = "NaN"
+        inf = np.isinf(values)
+        result[inf] = np.where(values[inf] > 0, "inf", "-inf")
+    return result
+
+
+def column_type_to_str(column):
+    """
+    Convert the values of a pandas or static-frame Series into simple datatypes.
+
+    Args:
+        column: a pandas or static-frame Series
+
+    Returns:
+        An object array, or a list, with one converted value for each element of the column
+    """
+    values = column.values
+    if isinstance(values, np.ndarray) and values.dtype.kind in BULK_CONVERTIBLE_KINDS:
+        return array_type_to_str(values)
+    if isinstance(values, np.ndarray) and values.dtype.kind in "mM":
+        # box datetime64 and timedelta64 into pd.Timestamp and pd.Timedelta,
+        # in the same way as pandas df.loc
+        values = pd.Series(values)
+    # iterating over a static-frame Series yields its index labels, so the
+    # values are iterated rather than the column
+    return [df_type_to_str(v) for v in values]
+
+
+@contextlib.contextmanager
+def instrument_stage(instrument, stage, **attrs):
+    """
+    Time the body of the `with` statement and report it as `instrument(stage, elapsed, **attrs)`, where elapsed is in seconds. The attrs dict is yielded, so that counts only known at the end of the stage can be added to it. Nothing is timed if `instrument` is None.
+
+    Example:
+        with instrument_stage(instrument, "to_row_col_dict", models=1) as attrs:
+            row_col_dict = ...
+            attrs["cells"] = len(row_col_dict)
+    """
+    if instrument is None:
+        yield attrs
+        return
+
+    start_time = time.perf_counter()
+    yield attrs
+    instrument(stage, time.perf_counter() - start_time, **attrs)
+
+
+class LRUCache:
+    """
+    A dict like cache with at most `maxsize` entries, the least recently used entries are evicted first
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._frozen = 0
+
+    def get(self, key, default=None):
+        try:
+            value = self._entries[key]
+        except KeyError:
+            return default
+        self._entries.move_to_end(key)
+        return value
+
+    def __setitem__(self, key, value):
+        if self._frozen:
+            return
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        self._entries.clear()
+
+    @contextlib.contextmanager
+    def frozen(self):
+        """
+        Within the `with` statement the entries of the cache are looked up, but no entries are added. Useful for values that are only used once, so that they do not evict the entries that are reused
+        """
+        self._frozen += 1
+        try:
+            yield self
+        finally:
+            self._frozen -= 1
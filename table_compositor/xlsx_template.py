@@ -0,0 +1,246 @@
+"""
+Module that supports rendering many identically shaped xlsx files from one styled template. The template is written once by a compositor, and each output is produced by patching the cell values into the sheet xml of the template, the other parts of the xlsx file (styles, merged cells, column widths) are copied as they are, except for the shared strings of the template, which are dropped so that no value of the template is left in the output.
+"""
+
+import io
+import numbers
+import re
+import zipfile
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+
+from table_compositor.compiled_layout import CompiledLayout
+from table_compositor.util import df_type_to_str
+from table_compositor.xlsx_writer import _DEFAULT_COLUMN_WIDTH, OpenPyxlCompositor
+
+# both engines write the first worksheet to this part of the zip
+_SHEET_PATH = "xl/worksheets/sheet1.xml"
+
+_SHARED_STRINGS_PATH = "xl/sharedStrings.xml"
+
+_SPREADSHEET_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+
+# the shared strings part is kept, since the content types and the
+# relationships of the workbook refer to it
+_EMPTY_SHARED_STRINGS = (
+    b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    b'<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"'
+    b' count="0" uniqueCount="0"/>'
+)
+
+# matches the index of a cell that holds a shared string
+_SHARED_STRING_CELL_RE = re.compile(r'\st="s".*?<v>([0-9]+)</v>', flags=re.DOTALL)
+
+# matches the cells of the sheet xml, the attributes are matched without the reference
+_CELL_RE = re.compile(
+    r'<c r="([A-Z]+[0-9]+)"([^>]*?)\s*(?:/>|>.*?</c>)', flags=re.DOTALL
+)
+
+# the type of the cell is replaced along with the value
+_TYPE_ATTR_RE = re.compile(r'\s+t="[^"]*"')
+
+
+def _cell_xml(ref, attrs, value):
+    """
+    Return the xml of the cell with reference `ref`, the other attributes (the style) and the value converted by `df_type_to_str`. Strings are written inline, so that the shared strings of the template do not need to be updated
+    """
+    if value is None:
+        return '<c r="{}"{}/>'.format(ref, attrs)
+    if isinstance(value, bool):
+        return '<c r="{}"{} t="b"><v>{}</v></c>'.format(ref, attrs, int(value))
+    if isinstance(value, numbers.Number):
+        text = repr(value) if isinstance(value, float) else str(value)
+        return '<c r="{}"{}><v>{}</v></c>'.format(ref, attrs, text)
+
+    value = str(value)
+    space = ' xml:space="preserve"' if value != value.strip() else ""
+    return '<c r="{}"{} t="inlineStr"><is><t{}>{}</t></is></c>'.format(
+        ref, attrs, space, escape(value)
+    )
+
+
+def _shared_strings(data):
+    """
+    Return the list of the shared strings in the xml of the shared strings part, the text of rich text strings is joined
+    """
+    if data is None:
+        return []
+    return [
+        "".join(t.text or "" for t in si.iter(_SPREADSHEET_NS + "t"))
+        for si in ElementTree.fromstring(data).iter(_SPREADSHEET_NS + "si")
+    ]
+
+
+class XlsxTemplate:
+    """
+    A styled xlsx file, rendered once from a layout, that is used to write layouts of the same shape by replacing only the values of the cells.
+
+    The layouts written with the template must resolve to the same cells as the layout the template was rendered from, that is the same number of rows and columns in the frames, the same nesting and the same hide flags. The styles of the template are kept, styles returned by the callback functions of the new layout are ignored. The values are replaced in all cells, including the headers and the index.
+
+    Args:
+        template: the xlsx file, as bytes, written by the compositor
+        offsets: the offsets of the cells of the layout the template was written from
+
+    Example:
+        template = XlsxTemplate.from_layout([build_presentation_model(df=df)])
+        for df in statements:
+            template.to_xlsx(
+                layout=[build_presentation_model(df=df)],
+                output_fp='statement.xlsx',
+            )
+    """
+
+    def __init__(
+        self,
+        template,
+        offsets,
+        *,
+        compositor=OpenPyxlCompositor,
+        orientation="vertical",
+        h_shift_by=1,
+        v_shift_by=1
+    ):
+        self.template = template
+        self.compositor = compositor
+        self.orientation = orientation
+        self.h_shift_by = h_shift_by
+        self.v_shift_by = v_shift_by
+
+        with zipfile.ZipFile(io.BytesIO(template)) as zf:
+            self._parts = [(info, zf.read(info)) for info in zf.infolist()]
+        parts = dict((info.filename, data) for info, data in self._parts)
+        sheet = parts.get(_SHEET_PATH)
+        if sheet is None:
+            raise ValueError("The template has no worksheet at {}".format(_SHEET_PATH))
+
+        # the xml between the cells with values is kept as it is, the cells are
+        # placeholders in `_pieces` that are replaced with the new values
+        self._pieces = []
+        self._cells = {}
+        xml = sheet.decode("UTF-8")
+        pos = 0
+        for match in _CELL_RE.finditer(xml):
+            self._pieces.append(xml[pos : match.start()])
+            ref, attrs = match.groups()
+            self._cells[ref] = (len(self._pieces), _TYPE_ATTR_RE.sub("", attrs))
+            self._pieces.append(match.group(0))
+            pos = match.end()
+        self._pieces.append(xml[pos:])
+
+        # the reference of the cell where the value at each offsets is written
+        self._refs = {}
+        for cell_offsets in offsets:
+            row, col = cell_offsets[0], cell_offsets[1]
+            ref = "{}{}".format(compositor._get_column_letter(col + 1), row + 1)
+            if ref not in self._cells:
+                raise ValueError("The cell {} is not in the template".format(ref))
+            self._refs[tuple(cell_offsets)] = ref
+
+        # the values of the cells that are not replaced, if any, are written
+        # inline, so that the shared strings of the template can be dropped
+        shared_strings = _shared_strings(parts.get(_SHARED_STRINGS_PATH))
+        layout_refs = set(self._refs.values())
+        for ref, (position, attrs) in self._cells.items():
+            match = _SHARED_STRING_CELL_RE.search(self._pieces[position])
+            if ref not in layout_refs and match is not None:
+                value = shared_strings[int(match.group(1))]
+                self._pieces[position] = _cell_xml(ref, attrs, value)
+        self._parts = [
+            (
+                info,
+                (
+                    _EMPTY_SHARED_STRINGS
+                    if info.filename == _SHARED_STRINGS_PATH
+                    else data
+                ),
+            )
+            for info, data in self._parts
+        ]
+
+    @classmethod
+    def from_layout(
+        cls,
+        layout,
+        *,
+        compositor=OpenPyxlCompositor,
+        orientation="vertical",
+        column_width=_DEFAULT_COLUMN_WIDTH,
+        h_shift_by=1,
+        v_shift_by=1
+    ):
+        """
+        Render the template from the layout with `compositor.to_xlsx`.
+
+        Args:
+            layout: a nested list of presentation models, or a `CompiledLayout`
+            compositor: OpenPyxlCompositor or XlsxWriterCompositor
+
+        See `OpenPyxlCompositor.to_xlsx` for the other arguments
+        """
+        compiled_layout = compositor._build_row_col_dict(
+            layout, orientation, h_shift_by, v_shift_by
+        )
+        if not isinstance(compiled_layout, CompiledLayout):
+            compiled_layout = CompiledLayout.from_row_col_dict(compiled_layout)
+
+        output = io.BytesIO()
+        compositor.to_xlsx(
+            layout=compiled_layout,
+            output_fp=output,
+            orientation=orientation,
+            column_width=column_width,
+            h_shift_by=h_shift_by,
+            v_shift_by=v_shift_by,
+        )
+        return cls(
+            output.getvalue(),
+            list(compiled_layout),
+            compositor=compositor,
+            orientation=orientation,
+            h_shift_by=h_shift_by,
+            v_shift_by=v_shift_by,
+        )
+
+    def render(self, layout) -> bytes:
+        """
+        Return the xlsx file, as bytes, of the template with the values of the cells replaced by the values of the layout
+        """
+        row_col_dict = self.compositor._build_row_col_dict(
+            layout, self.orientation, self.h_shift_by, self.v_shift_by
+        )
+        if len(row_col_dict) != len(self._refs):
+            raise ValueError(
+                "The layout has {} cells, the template has {}".format(
+                    len(row_col_dict), len(self._refs)
+                )
+            )
+
+        pieces = list(self._pieces)
+        for offsets, (value, _, _) in row_col_dict.items():
+            ref = self._refs.get(offsets)
+            if ref is None:
+                raise ValueError(
+                    "The layout does not have the shape of the template, the cell at {} is not in the template".format(
+                        offsets
+                    )
+                )
+            position, attrs = self._cells[ref]
+            pieces[position] = _cell_xml(ref, attrs, df_type_to_str(value))
+        sheet = "".join(pieces).encode("UTF-8")
+
+        output = io.BytesIO()
+        with zipfile.ZipFile(output, "w") as zf:
+            for info, data in self._parts:
+                zf.writestr(info, sheet if info.filename == _SHEET_PATH else data)
+        return output.getvalue()
+
+    def to_xlsx(self, *, layout, output_fp):
+        """
+        Write the xlsx file of the template with the values of the layout to `output_fp`, a file name or a binary file object
+        """
+        data = self.render(layout)
+        if isinstance(output_fp, (str, bytes)) or hasattr(output_fp, "__fspath__"):
+            with open(output_fp, "wb") as f:
+                f.write(data)
+        else:
+            output_fp.write(data)
@@ -1,36 +1,152 @@
 import functools
+import typing as tp
 import warnings
+from copy import copy
 from itertools import chain
 
-import xlsxwriter
-from openpyxl import Workbook
-from openpyxl.utils import get_column_letter
-
+from table_compositor.compiled_layout import CompiledLayout
+from table_compositor.conditional_formats import OPERATORS, CellValueRule, ColorScale
 from table_compositor.grid import GridLayoutManager
-from table_compositor.util import df_type_to_str
+from table_compositor.presentation_model import (
+    InternalFrame,
+    PresentationAndLoc,
+    StyleRegistry,
+)
+from table_compositor.util import df_type_to_str, instrument_stage
 
 _DEFAULT_COLUMN_WIDTH = 20
 
 
+def _formula(value):
+    """
+    Return the value as an Excel formula, strings are quoted
+    """
+    if isinstance(value, str):
+        return '"{}"'.format(value.replace('"', '""'))
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    return str(value)
+
+
+def _argb(color):
+    """
+    Return the hex color ('#F8696B') in the format used by openpyxl ('F8696B')
+    """
+    return color.lstrip("#")
+
+
+# the keys of an XlsxWriter format that are visible on blank cells
+_XLSXWRITER_BLANK_CELL_KEYS = (
+    "pattern",
+    "bg_color",
+    "fg_color",
+    "border",
+    "top",
+    "bottom",
+    "left",
+    "right",
+    "diag_type",
+)
+
+# the attributes of an openpyxl cell that are stored in its style array
+_OPENPYXL_STYLE_ATTRS = frozenset(
+    ("font", "fill", "border", "alignment", "number_format", "protection", "style")
+)
+
+# the engines are imported by the compositors that use them
+if tp.TYPE_CHECKING:
+    from openpyxl import Workbook
+
+
+def _repeated_rows_and_cols(layout):
+    """
+    Return the number of rows of the header and of columns of the index of the first presentation model of the layout, which are repeated on each page of a paginated layout. Compiled layouts do not repeat any rows or columns
+    """
+    if isinstance(layout, CompiledLayout):
+        return 0, 0
+    model = layout
+    while isinstance(model, list):
+        model = model[0]
+    if isinstance(model, PresentationAndLoc):
+        model = model.model
+    df_view = InternalFrame(model.data.values)
+    return (
+        0 if model.kwargs["hide_header"] else df_view.columns.depth,
+        0 if model.kwargs["hide_index"] else df_view.index.depth,
+    )
+
+
 class _XLSXCompositor:
     """
     Base class that can be customized for different xlsx writer engines
     """
 
+    # the size of an Excel worksheet
+    MAX_ROWS = 1048576
+    MAX_COLS = 16384
+
     @staticmethod
     @functools.lru_cache(maxsize=None)
     def _get_column_letter(col):
-        return get_column_letter(col)
+        """
+        Return the letters of the 1-based column, same as `openpyxl.utils.get_column_letter`, without requiring openpyxl for the XlsxWriter engine
+        """
+        letters = []
+        while col > 0:
+            col, remainder = divmod(col - 1, 26)
+            letters.append(chr(65 + remainder))
+        return "".join(reversed(letters))
 
     @classmethod
-    def _build_row_col_dict(cls, layout, orientation, h_shift_by, v_shift_by):
-        row_col_dict = GridLayoutManager.get_row_col_dict(
+    def _build_row_col_dict(
+        cls, layout, orientation, h_shift_by, v_shift_by, instrument=None
+    ):
+        if isinstance(layout, CompiledLayout):
+            # the layout has been resolved already
+            return layout
+        # the cells are collected in a cell store, which behaves like the
+        # row_col_dict of the layout but keeps the cells in a few arrays
+        return CompiledLayout.from_layout(
             layout,
             orientation=orientation,
             h_shift_by=h_shift_by,
             v_shift_by=v_shift_by,
+            instrument=instrument,
+        )
+
+    @classmethod
+    def _build_pages(
+        cls, layout, orientation, h_shift_by, v_shift_by, paginate, instrument=None
+    ):
+        """
+        Return the compiled layouts of the worksheets the layout is rendered to. The dimensions of the layout are estimated before it is resolved, see `GridLayoutManager.estimate_dimensions`, so that a layout that does not fit in a worksheet fails up front. If `paginate` is True, such a layout is split into pages the size of a worksheet instead, with the header and index of the first presentation model repeated on each page, see `CompiledLayout.paginate`
+
+        Raises:
+            ValueError: if the layout does not fit in a worksheet and `paginate` is False
+        """
+        if isinstance(layout, CompiledLayout):
+            rows, cols = layout.shape
+        else:
+            rows, cols = GridLayoutManager.estimate_dimensions(
+                layout, orientation, h_shift_by, v_shift_by
+            )
+        fits = rows <= cls.MAX_ROWS and cols <= cls.MAX_COLS
+        if not fits and not paginate:
+            raise ValueError(
+                "The layout has {} rows and {} columns, more than the {} rows and {} columns of a worksheet. Use paginate=True to split it across worksheets".format(
+                    rows, cols, cls.MAX_ROWS, cls.MAX_COLS
+                )
+            )
+
+        row_col_dict = cls._build_row_col_dict(
+            layout, orientation, h_shift_by, v_shift_by, instrument=instrument
+        )
+        if fits:
+            return [row_col_dict]
+        repeat_rows, repeat_cols = _repeated_rows_and_cols(layout)
+        return row_col_dict.paginate(
+            cls.MAX_ROWS, cls.MAX_COLS, repeat_rows, repeat_cols
         )
-        return row_col_dict
 
     @classmethod
     def to_xlsx_worksheet(self, *args, **kwargs):
@@ -62,38 +178,161 @@ class OpenPyxlCompositor(_XLSXCompositor):
         )
         return range_string
 
+    @classmethod
+    def _merge_cells(cls, ws, merge_plan):
+        """
+        Merge the ranges of the merge plan, see `CompiledLayout.merge_plan`. The ranges have been checked for overlaps already, so they are added without the check that `ws.merge_cells` makes against every range merged before, and without creating a `MergedCell` for each cell in the range
+        """
+        from openpyxl.worksheet.merge import MergedCellRange
+
+        ranges = ws.merged_cells.ranges
+        # the ranges are a set in recent versions of openpyxl, a list before
+        add = ranges.add if isinstance(ranges, set) else ranges.append
+        for offsets in merge_plan.tolist():
+            range_string = cls._get_range_string(tuple(i + 1 for i in offsets))
+            add(MergedCellRange(ws, range_string))
+
+    @staticmethod
+    def _merged_edge_cells(ws, offsets):
+        """
+        Return the cells at the edges of the merged range at the (1-based) offsets, except the top left cell
+        """
+        from openpyxl.cell.cell import MergedCell
+
+        r1, c1, r2, c2 = offsets
+        cells = []
+        for row in range(r1, r2 + 1):
+            cols = range(c1, c2 + 1) if row in (r1, r2) else sorted({c1, c2})
+            for col in cols:
+                if row == r1 and col == c1:
+                    continue
+                cell = ws._cells.get((row, col))
+                if cell is None:
+                    cell = ws._cells[row, col] = MergedCell(ws, row=row, column=col)
+                cells.append(cell)
+        return cells
+
+    @staticmethod
+    def _paints_blank_cells(user_style):
+        """
+        True if the style is visible on blank cells, such styles are not set on whole columns
+        """
+        from openpyxl.styles import Border, PatternFill
+
+        fill = user_style.get("fill")
+        border = user_style.get("border")
+        return (fill is not None and fill != PatternFill()) or (
+            border is not None and border != Border()
+        )
+
+    @classmethod
+    def _add_conditional_formats(cls, ws, compiled_layout):
+        """
+        Add the conditional formatting rules of the layout to the worksheet
+        """
+        from openpyxl.formatting import rule as openpyxl_rule
+
+        for rule, ranges in getattr(compiled_layout, "conditional_formats", ()):
+            sqref = " ".join(
+                cls._get_range_string(tuple(i + 1 for i in offsets))
+                for offsets in ranges
+            )
+            if isinstance(rule, CellValueRule):
+                values = rule.value if isinstance(rule.value, tuple) else (rule.value,)
+                native_rule = openpyxl_rule.CellIsRule(
+                    operator=OPERATORS[rule.operator],
+                    formula=[_formula(v) for v in values],
+                    font=rule.style.get("font"),
+                    border=rule.style.get("border"),
+                    fill=rule.style.get("fill"),
+                )
+            elif isinstance(rule, ColorScale):
+                colors = dict(start_color=_argb(rule.min_color))
+                if rule.mid_color:
+                    colors.update(
+                        mid_type="percentile",
+                        mid_value=50,
+                        mid_color=_argb(rule.mid_color),
+                    )
+                native_rule = openpyxl_rule.ColorScaleRule(
+                    start_type="min",
+                    end_type="max",
+                    end_color=_argb(rule.max_color),
+                    **colors,
+                )
+            else:
+                native_rule = openpyxl_rule.DataBarRule(
+                    start_type="min", end_type="max", color=_argb(rule.color)
+                )
+            ws.conditional_formatting.add(sqref, native_rule)
+
     @classmethod
     def _to_xlsx_worksheet(cls, row_col_dict, ws, column_width, post_process_ws_func):
         """
         creates the excel sheet using openpyxl
         """
+        from openpyxl.styles import Border
+
+        if not isinstance(row_col_dict, CompiledLayout):
+            row_col_dict = CompiledLayout.from_row_col_dict(row_col_dict)
+        cls._merge_cells(ws, row_col_dict.merge_plan())
+
+        # the style array and the attributes that are not part of it, for
+        # each style id, see `StyleRegistry`
+        native_styles = {}
         for offsets, (value, style, _) in row_col_dict.items():
             offsets = tuple(i + 1 for i in offsets)  # bump needed for openpyxl
             cell = ws.cell(
                 row=offsets[0], column=offsets[1], value=df_type_to_str(value)
             )
+            cells = (cell,)
             if offsets[0] != offsets[2] or offsets[1] != offsets[3]:
-                ws.merge_cells(
-                    start_row=offsets[0],
-                    start_column=offsets[1],
-                    end_row=offsets[2],
-                    end_column=offsets[3],
-                )
-
-            rows = ws[cls._get_range_string(offsets)]
-            # we do this since some formatting (fill, border) for merged cells still need to be set for each individual cell. we assume setting the same formatting (eg. border) for each cell in merged range will mask the values such that it feels like the merged cell is being formatted as one cell. for example the left border  is derived from leftmost cell and right border is derived from right most cell, even though same border attributes are set for each cell in the merged range. for any in-between cells the border formatting will be voided.
-            for cell in chain(*rows):
-                for attr, style_value in style.user_style.items():
+                # the borders of a merged cell are drawn from the cells at the edges of the range, so the style is also set on the edge cells. all other formatting is taken from the top left cell
+                border = style.user_style.get("border")
+                if border is not None and border != Border():
+                    cells = chain(cells, cls._merged_edge_cells(ws, offsets))
+
+            style_id = StyleRegistry.style_id(style)
+            native_style = native_styles.get(style_id)
+            for cell in cells:
+                if native_style is not None:
+                    # the style has been converted already, the ids of its
+                    # font, fill etc. in the workbook are copied to the cell
+                    cell._style = copy(native_style[0])
+                    attrs = native_style[1]
+                else:
+                    attrs = style.user_style.items()
+                for attr, style_value in attrs:
                     try:
                         setattr(cell, attr, style_value)
                     except AttributeError:
                         # we do not set the attr
                         pass
+                if native_style is None:
+                    native_style = native_styles[style_id] = (
+                        copy(cell._style),
+                        [
+                            (attr, style_value)
+                            for attr, style_value in style.user_style.items()
+                            if attr not in _OPENPYXL_STYLE_ATTRS
+                        ],
+                    )
         # we loop around all columns so that we do this
         # column level work only once for each column
-        for offsets in row_col_dict:
-            col_letter = OpenPyxlCompositor._get_column_letter(offsets[1] + 1)
+        for col in row_col_dict.columns():
+            col_letter = OpenPyxlCompositor._get_column_letter(col + 1)
             ws.column_dimensions[col_letter].width = column_width
+        # the style of the data in the column is also set on the column, so
+        # that cells added later in Excel get it. openpyxl only writes the
+        # styles of the cells themselves, so the cells keep their own style
+        for col, style in getattr(row_col_dict, "column_styles", {}).items():
+            native_style = native_styles.get(StyleRegistry.style_id(style))
+            if native_style is not None and not cls._paints_blank_cells(
+                style.user_style
+            ):
+                col_letter = OpenPyxlCompositor._get_column_letter(col + 1)
+                ws.column_dimensions[col_letter]._style = copy(native_style[0])
+        cls._add_conditional_formats(ws, row_col_dict)
         # print("before callback function")
         if post_process_ws_func:
             post_process_ws_func(ws)
@@ -109,13 +348,14 @@ class OpenPyxlCompositor(_XLSXCompositor):
         h_shift_by=1,
         v_shift_by=1,
         post_process_worksheet_func=None,
+        instrument=None,
     ):
 
         """
         take a layout which contains a list of presentation models builts using the build_presentation_model function. this method is useful to control where the file is created and to add more attributes to the worksheet before it is being saved. updates the ws argument in place.
 
         args:
-            layout: an nested list of presentation_models, examples: [presentation_model] or [presentation_model1, presentation_mode2] etc
+            layout: an nested list of presentation_models, examples: [presentation_model] or [presentation_model1, presentation_mode2] etc, or a `CompiledLayout` saved earlier
             ws: openpyxl worksheet is which the presentation model will be rendered.
             orientation: if vertical, the top level presentation model elements are rendered vertically, and for every nested level the orientation is flipped.
                          if horizontal, then the behavior is inverse
@@ -123,6 +363,7 @@ class OpenPyxlCompositor(_XLSXCompositor):
             h_shift_by: defaulf=1, the no of horizontal rows that will be used while laying out the presentation model horizontally
             v_shift_by: defaulf=1, the no of vertical rows that will be used while laying out the presentation model vertically
             post_process_ws_func: a function that will be called back with the worksheet, for final processing. for example, if special formatting needs to be performed at the column level (freezing columns, hiding columns. etc.)
+            instrument: optional func called as instrument(stage, elapsed, **attrs) after each stage, see `GridLayoutManager.get_row_col_dict` for the layout stages. the write to the worksheet is reported as 'openpyxl.write'
         """
 
         row_col_dict = cls._build_row_col_dict(
@@ -130,10 +371,12 @@ class OpenPyxlCompositor(_XLSXCompositor):
             orientation=orientation,
             h_shift_by=h_shift_by,
             v_shift_by=v_shift_by,
+            instrument=instrument,
         )
-        cls._to_xlsx_worksheet(
-            row_col_dict, worksheet, column_width, post_process_worksheet_func
-        )
+        with instrument_stage(instrument, "openpyxl.write", cells=len(row_col_dict)):
+            cls._to_xlsx_worksheet(
+                row_col_dict, worksheet, column_width, post_process_worksheet_func
+            )
 
     @classmethod
     def to_xlsx(
@@ -145,46 +388,117 @@ class OpenPyxlCompositor(_XLSXCompositor):
         column_width=_DEFAULT_COLUMN_WIDTH,
         h_shift_by=1,
         v_shift_by=1,
+        instrument=None,
+        paginate=False,
     ):
         """
         uses a layout which contains a list of presentation models built using the build_presentation_model function.
 
         args:
-            layout: an nested list of presentation_models, examples: [presentation_model] or [presentation_model1, presentation_mode2] etc
+            layout: an nested list of presentation_models, examples: [presentation_model] or [presentation_model1, presentation_mode2] etc, or a `CompiledLayout` saved earlier
             output_fp: the xlsx file name
             orientation: if vertical, the top level presentation model elements are rendered vertically, and for every nested level the orientation is flipped.
                          if horizontal, then the behavior is inverse
             column-width: default=20, the default column width of all columns in the worksheet. individual column width cannot be set currently
             h_shift_by: applied when `layout` has multiple presentation models. the value (default 1) is used to space the presentation models that are horizontal to each other
             v_shift_by: applied when `layout` has multiple presentation models. the value (default 1) is used to space the presentation models that are vertical to each other
+            instrument: optional func called as instrument(stage, elapsed, **attrs) after each stage, see `GridLayoutManager.get_row_col_dict` for the layout stages. the write to the worksheet and the save are reported as 'openpyxl.write' and 'openpyxl.save'
+            paginate: if True, a layout that does not fit in a worksheet (1,048,576 rows and 16,384 columns) is split across continuation worksheets, with the header and index of the first presentation model repeated on each worksheet. Otherwise such a layout raises a ValueError before it is resolved
         """
 
-        row_col_dict = cls._build_row_col_dict(
-            layout, orientation, h_shift_by, v_shift_by
+        pages = cls._build_pages(
+            layout, orientation, h_shift_by, v_shift_by, paginate, instrument
         )
+        from openpyxl import Workbook
+
         workbook = Workbook()
-        worksheet = workbook.active
-        cls._to_xlsx_worksheet(
-            row_col_dict,
-            worksheet,
-            column_width=column_width,
-            post_process_ws_func=None,
-        )
+        for page, row_col_dict in enumerate(pages):
+            worksheet = workbook.active if page == 0 else workbook.create_sheet()
+            with instrument_stage(
+                instrument, "openpyxl.write", cells=len(row_col_dict)
+            ):
+                cls._to_xlsx_worksheet(
+                    row_col_dict,
+                    worksheet,
+                    column_width=column_width,
+                    post_process_ws_func=None,
+                )
 
-        workbook.save(output_fp)
+        cells = sum(len(row_col_dict) for row_col_dict in pages)
+        with instrument_stage(instrument, "openpyxl.save", cells=cells):
+            workbook.save(output_fp)
 
 
 class XlsxWriterCompositor(_XLSXCompositor):
+    @staticmethod
+    def _paints_blank_cells(user_style):
+        """
+        True if the format is visible on blank cells, such formats are not set on whole columns
+        """
+        return any(user_style.get(key) for key in _XLSXWRITER_BLANK_CELL_KEYS)
+
+    @staticmethod
+    def _add_conditional_formats(ws, wb, conditional_formats):
+        """
+        Add the conditional formatting rules, the (rule, ranges) pairs of a compiled layout, to the worksheet
+        """
+        for rule, ranges in conditional_formats:
+            if isinstance(rule, CellValueRule):
+                options = dict(type="cell", criteria=rule.operator)
+                # the values are written as formulas, the same as openpyxl
+                if isinstance(rule.value, tuple):
+                    options.update(
+                        minimum=_formula(rule.value[0]), maximum=_formula(rule.value[1])
+                    )
+                else:
+                    options.update(value=_formula(rule.value))
+                options["format"] = wb.add_format(rule.style)
+            elif isinstance(rule, ColorScale):
+                options = dict(
+                    type="2_color_scale",
+                    min_color=rule.min_color,
+                    max_color=rule.max_color,
+                )
+                if rule.mid_color:
+                    options.update(type="3_color_scale", mid_color=rule.mid_color)
+            else:
+                options = dict(type="data_bar", bar_color=rule.color)
+
+            if len(ranges) > 1:
+                options["multi_range"] = " ".join(
+                    OpenPyxlCompositor._get_range_string(tuple(i + 1 for i in offsets))
+                    for offsets in ranges
+                )
+            ws.conditional_format(*ranges[0], options)
+
     @staticmethod
     def _to_xlsx_worksheet(row_col_dict, ws, wb, column_width, post_process_ws_func):
         """
         Args:
             ws: worksheet to use for rendering
         """
+        # the format of each style id, see `StyleRegistry`
+        formats = {}
+
+        def _get_format(style):
+            style_id = StyleRegistry.style_id(style)
+            cell_format = formats.get(style_id)
+            if cell_format is None:
+                cell_format = formats[style_id] = wb.add_format(style.user_style)
+            return style_id, cell_format
+
+        # the (style id, format) of the columns whose data shares one style,
+        # the cells with that style take the format of the column
+        column_formats = {
+            col: _get_format(style)
+            for col, style in getattr(row_col_dict, "column_styles", {}).items()
+            if not XlsxWriterCompositor._paints_blank_cells(style.user_style)
+        }
+
         for offsets, (value, style, _) in row_col_dict.items():
             offsets = tuple(i + 1 for i in offsets)  # bump needed for openpyxl
 
-            cell_format = wb.add_format(style.user_style)
+            style_id, cell_format = _get_format(style)
             # the -1 is needed since XlsxWriter uses zero-based indexing
             if offsets[0] != offsets[2] or offsets[1] != offsets[3]:
                 ws.merge_range(
@@ -196,15 +510,26 @@ class XlsxWriterCompositor(_XLSXCompositor):
                     cell_format=cell_format,
                 )
             else:
-                ws.write(
-                    offsets[0] - 1, offsets[1] - 1, df_type_to_str(value), cell_format
-                )
+                value = df_type_to_str(value)
+                column_format = column_formats.get(offsets[1] - 1)
+                # blank cells without a format are not written by XlsxWriter
+                if (
+                    column_format is not None
+                    and column_format[0] == style_id
+                    and value != ""
+                ):
+                    cell_format = None
+                ws.write(offsets[0] - 1, offsets[1] - 1, value, cell_format)
 
         # we loop around all columns so that we do this
         # column level work only once for each column
-        for offsets in row_col_dict:
-            col_letter = _XLSXCompositor._get_column_letter(offsets[1] + 1)
-            ws.set_column(col_letter + ":" + col_letter, column_width)
+        for col in row_col_dict.columns():
+            col_letter = _XLSXCompositor._get_column_letter(col + 1)
+            column_format = column_formats.get(col, (None, None))[1]
+            ws.set_column(col_letter + ":" + col_letter, column_width, column_format)
+        XlsxWriterCompositor._add_conditional_formats(
+            ws, wb, getattr(row_col_dict, "conditional_formats", ())
+        )
         if post_process_ws_func:
             post_process_ws_func(ws)
 
@@ -220,6 +545,7 @@ class XlsxWriterCompositor(_XLSXCompositor):
         h_shift_by=1,
         v_shift_by=1,
         post_process_worksheet_func=None,
+        instrument=None,
     ):
 
         """
@@ -227,7 +553,7 @@ class XlsxWriterCompositor(_XLSXCompositor):
 
         Args:
             workbook: Workbook object needed for XlsxWriter to create format objects. Note that this parameter is not required for the equivalent OpenPyxlCompositor.
-            layout: An nested list of presentation_models, examples: [presentation_model] or [presentation_model1, presentation_mode2] etc
+            layout: An nested list of presentation_models, examples: [presentation_model] or [presentation_model1, presentation_mode2] etc, or a `CompiledLayout` saved earlier
             worksheet: openpyxl Worksheet is which the presentation model will be rendered.
             orientation: if vertical, the top level presentation model elements are rendered vertically, and for every nested level the orientation is flipped.
                          if horizontal, then the behavior is inverse
@@ -235,6 +561,7 @@ class XlsxWriterCompositor(_XLSXCompositor):
             h_shift_by: defaulf=1, the no of horizontal rows that will be used while laying out the presentation model horizontally
             v_shift_by: defaulf=1, the no of vertical rows that will be used while laying out the presentation model vertically
             post_process_ws_func: a function that will be called back with the worksheet, for final processing. For example, if special formatting needs to be performed at the column level (freezing columns, hiding columns. etc.)
+            instrument: optional func called as instrument(stage, elapsed, **attrs) after each stage, see `GridLayoutManager.get_row_col_dict` for the layout stages. The write to the worksheet is reported as 'xlsxwriter.write'
             kwargs: for future to options. currently not used
         """
         row_col_dict = cls._build_row_col_dict(
@@ -242,10 +569,16 @@ class XlsxWriterCompositor(_XLSXCompositor):
             orientation=orientation,
             h_shift_by=h_shift_by,
             v_shift_by=v_shift_by,
+            instrument=instrument,
         )
-        cls._to_xlsx_worksheet(
-            row_col_dict, worksheet, workbook, column_width, post_process_worksheet_func
-        )
+        with instrument_stage(instrument, "xlsxwriter.write", cells=len(row_col_dict)):
+            cls._to_xlsx_worksheet(
+                row_col_dict,
+                worksheet,
+                workbook,
+                column_width,
+                post_process_worksheet_func,
+            )
 
     @classmethod
     def to_xlsx(
@@ -257,36 +590,48 @@ class XlsxWriterCompositor(_XLSXCompositor):
         column_width=_DEFAULT_COLUMN_WIDTH,
         h_shift_by=1,
         v_shift_by=1,
+        instrument=None,
+        paginate=False,
     ):
         """
         Uses a layout which contains a list of presentation models built using the build_presentation_model function.
 
         Args:
-            layout: An nested list of presentation_models, examples: [presentation_model] or [presentation_model1, presentation_mode2] etc
+            layout: An nested list of presentation_models, examples: [presentation_model] or [presentation_model1, presentation_mode2] etc, or a `CompiledLayout` saved earlier
             output_fp: the xlsx file name
             orientation: if vertical, the top level presentation model elements are rendered vertically, and for every nested level the orientation is flipped.
                          if horizontal, then the behavior is inverse
             column-width: default=20, the default column width of all columns in the worksheet. Individual column width cannot be set currently
              h_shift_by: applied when `layout` has multiple presentation models. The value (default 1) is used to space the presentation models that are horizontal to each other
              v_shift_by: applied when `layout` has multiple presentation models. The value (default 1) is used to space the presentation models that are vertical to each other
+             instrument: optional func called as instrument(stage, elapsed, **attrs) after each stage, see `GridLayoutManager.get_row_col_dict` for the layout stages. The write to the worksheet and the save are reported as 'xlsxwriter.write' and 'xlsxwriter.save'
+             paginate: if True, a layout that does not fit in a worksheet (1,048,576 rows and 16,384 columns) is split across continuation worksheets, with the header and index of the first presentation model repeated on each worksheet. Otherwise such a layout raises a ValueError before it is resolved
 
 
-        The xlxswriter library seems to have better performance than the OpenPyxl library in some uses that were tested. For more information, run the benchmark/benchmarks.py provided with this library. Based on the desired performance and features needed the `engine` argument can be set accordingly.
+        The xlxswriter library seems to have better performance than the OpenPyxl library in some uses that were tested. For more information, run the benchmarks/benchmark.py provided with this library. Based on the desired performance and features needed the `engine` argument can be set accordingly.
         """
 
-        row_col_dict = cls._build_row_col_dict(
-            layout, orientation, h_shift_by, v_shift_by
+        pages = cls._build_pages(
+            layout, orientation, h_shift_by, v_shift_by, paginate, instrument
         )
+        import xlsxwriter
+
         workbook = xlsxwriter.Workbook(output_fp)
-        worksheet = workbook.add_worksheet()
-        cls._to_xlsx_worksheet(
-            row_col_dict,
-            worksheet,
-            wb=workbook,
-            column_width=column_width,
-            post_process_ws_func=None,
-        )
-        workbook.close()
+        for row_col_dict in pages:
+            worksheet = workbook.add_worksheet()
+            with instrument_stage(
+                instrument, "xlsxwriter.write", cells=len(row_col_dict)
+            ):
+                cls._to_xlsx_worksheet(
+                    row_col_dict,
+                    worksheet,
+                    wb=workbook,
+                    column_width=column_width,
+                    post_process_ws_func=None,
+                )
+        cells = sum(len(row_col_dict) for row_col_dict in pages)
+        with instrument_stage(instrument, "xlsxwriter.save", cells=cells):
+            workbook.close()
 
 
 # For backward compatibility
@@ -296,12 +641,14 @@ class XLSXWriter(OpenPyxlCompositor):
         """
         Helper function to create an empty workbook.
         """
+        from openpyxl import Workbook
+
         wb = Workbook()
         wb.remove(wb.active)
         return wb
 
     @staticmethod
-    def add_sheet(wb: Workbook, sheet_name: str):
+    def add_sheet(wb: "Workbook", sheet_name: str):
         """
         Given a wb and sheet_name, create a new sheet in the workbook
         and make this sheet the active sheet.
@@ -325,7 +672,6 @@ class XLSXWriter(OpenPyxlCompositor):
         post_process_ws_func=None,
         **_,
     ):
-
         """
         Function that is provided for backward compatibility. New clients should call to_xlsx_worksheet on either OpenPyxlCompositor or XlsxWriterCompositor.
         """
@@ -355,7 +701,6 @@ class XLSXWriter(OpenPyxlCompositor):
         v_shift_by=1,
         **_,
     ):
-
         """
         Function that is provided for backward compatibility. New clients should call to_xlsx on either OpenPyxlCompositor or XlsxWriterCompositor.
         """